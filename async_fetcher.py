@@ -0,0 +1,260 @@
+# async_fetcher.py
+import asyncio
+import contextlib
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp가 없으면 동기 엔진만 사용
+    aiohttp = None
+
+from fast_json import decode_async, decode_time_ms, record_cycle
+from fetch_common import (DEADLINE_METRIC, FX_SOURCE_API, FX_SOURCE_UPBIT, UPBIT_USDT_MARKET,
+                          CycleDeadline, PriceTable, aged_symbols, build_results, fill_last_known_good,
+                          morning_target, resolve_endpoints, stage_results)
+from fx_provider import FxRateProvider, get_fx_provider
+from metrics import Metrics
+from rate_limiter import RequestGovernor
+from reference_prices import ReferencePriceProvider, get_reference_provider
+from upbit_markets import UpbitMarketCatalog, chunk_markets, get_upbit_catalog
+
+
+class AsyncPriceFetcher:
+    """
+    asyncio 기반 가격 조회 엔진.
+    환율, 바이낸스 시세/캔들, 업비트 시세 요청을 한꺼번에 시작하고
+    호스트별 동시 요청 수를 제한합니다.
+    """
+
+    def __init__(self, symbols: List[str], max_per_host: int = 8, timeout: float = 10,
+                 endpoints: Optional[Dict[str, str]] = None,
+                 reference_provider: Optional[ReferencePriceProvider] = None,
+                 fx_provider: Optional[FxRateProvider] = None,
+                 fx_source: str = FX_SOURCE_API,
+                 upbit_catalog: Optional[UpbitMarketCatalog] = None,
+                 on_stage: Optional[Callable[[str, Dict[str, tuple]], None]] = None,
+                 deadline: Optional[float] = None, book=None):
+        """
+        Args:
+            symbols: 조회할 바이낸스 심볼 목록
+            max_per_host: 호스트별 최대 동시 요청 수
+            timeout: 요청별 타임아웃(초)
+            endpoints: 업스트림 주소 덮어쓰기 (테스트/벤치마크용)
+            reference_provider: 기준 시가 제공자 (기본값: 바이낸스 주소별 공용 제공자)
+            fx_provider: 환율 제공자 (기본값: 주소별 공용 제공자)
+            fx_source: 환율 출처 ("exchangerate" 또는 업비트 KRW-USDT를 쓰는 "upbit")
+            upbit_catalog: 업비트 상장 마켓 목록 (기본값: 주소별 공용 목록)
+            on_stage: 단계별 중간 결과 콜백 (단계 이름, 결과) - 바이낸스 가격이 오면 "prices",
+                이후 기준 시가가 오면 "reference", 업비트 시세/환율이 오면 "premium"
+            deadline: 조회 1회의 시간 예산(초) - 지나면 남은 요청을 취소하고 받은 결과만 반환
+            book: 결과를 바로 써넣을 QuoteBook - 있으면 단계별로 book을 갱신하고 바뀐 심볼만 on_stage로 보냄
+        """
+        self.symbols = symbols
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.endpoints = resolve_endpoints(endpoints)
+        self.reference_provider = reference_provider or get_reference_provider(self.endpoints['binance'])
+        self.fx_provider = fx_provider or get_fx_provider(self.endpoints['fx'])
+        self.fx_source = fx_source
+        self.upbit_catalog = upbit_catalog or get_upbit_catalog(self.endpoints['upbit'])
+        self.on_stage = on_stage
+        self.deadline = deadline
+        self.book = book
+        # 심볼이 많을 때 쓰는 계산용 배열 (조회기와 함께 유지되고 심볼 목록이 바뀔 때만 다시 만듦)
+        self.price_table = PriceTable()
+        # 조회에 실패해 마지막 정상 값으로 채운 심볼의 {심볼: 값의 나이(초)}
+        self.aged = {}
+
+    @staticmethod
+    def available() -> bool:
+        """aiohttp 설치 여부를 반환합니다."""
+        return aiohttp is not None
+
+    def fetch(self) -> Dict[str, tuple]:
+        """새 이벤트 루프에서 조회를 실행합니다. (QThread 등 워커 스레드에서 호출)"""
+        return asyncio.run(self.fetch_async())
+
+    def create_session(self, **kwargs):
+        """
+        호스트별 동시 요청 제한이 걸린 aiohttp 세션을 만듭니다. (이벤트 루프 안에서 호출)
+        모든 요청은 RequestGovernor의 예산 확인을 거칩니다.
+        """
+        connector = aiohttp.TCPConnector(limit_per_host=self.max_per_host)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        trace_configs = [RequestGovernor().trace_config()] + kwargs.pop("trace_configs", [])
+        return aiohttp.ClientSession(connector=connector, timeout=timeout, trace_configs=trace_configs,
+                                     headers={'User-Agent': 'Mozilla/5.0'}, **kwargs)
+
+    async def fetch_async(self, sess=None) -> Dict[str, tuple]:
+        inputs = await self.fetch_inputs_async(sess)
+        return build_results(self.symbols, **inputs, table=self.price_table)
+
+    async def fetch_inputs_async(self, sess=None) -> Dict[str, Any]:
+        """
+        결과 조합에 필요한 원시 입력(가격/시가/업비트 시세/환율)을 조회합니다.
+
+        Args:
+            sess: 재사용할 aiohttp 세션 (None이면 이번 조회용 세션을 만들고 닫음)
+        """
+        session_ctx = contextlib.nullcontext(sess) if sess else self.create_session()
+        deadline = CycleDeadline(self.deadline)
+        decode_start = decode_time_ms()
+        async with session_ctx as sess:
+            # 바이낸스 가격 요청을 가장 먼저 시작하고, 업비트 마켓 목록/환율은 기준 시가와 함께 그 뒤에 처리
+            price_futures = [asyncio.ensure_future(self.fetch_binance_price(sess, s)) for s in self.symbols]
+            morning_future = asyncio.ensure_future(self.reference_provider.get_opens_async(
+                sess, self.symbols, self.endpoints['binance'], fallback=self.fetch_morning_price))
+            premium_future = asyncio.ensure_future(self._fetch_premium_inputs(sess, deadline))
+            if price_futures:
+                await asyncio.wait(price_futures, timeout=deadline.remaining())
+            binance_map = {s: f.result() if f.done() else None for s, f in zip(self.symbols, price_futures)}
+            # 받지 못한 가격은 마지막 정상 값으로 채움 (lkg_max_age보다 오래된 값은 버림)
+            # book이 있으면 채우지 않음 - book이 이전 값을 원래 시각과 stale 표시 그대로 유지
+            binance_ages = fill_last_known_good(self.endpoints['binance'], binance_map, self.symbols,
+                                                fill=self.book is None)
+
+            inputs = {"binance_map": binance_map, "morning_map": {}, "upbit_symbols": {},
+                      "upbit_price_map": {}, "usd_to_krw": 0.0}
+            # 시가/업비트 시세를 기다리지 않고 가격부터 내보낸 뒤 도착하는 순서대로 채움
+            self._emit_stage("prices", inputs)
+            stages = {morning_future: "reference", premium_future: "premium"}
+            while stages and not deadline.expired():
+                done, _ = await asyncio.wait(stages, timeout=deadline.remaining(),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    stage = stages.pop(future)
+                    if stage == "reference":
+                        inputs["morning_map"] = future.result()
+                    else:
+                        usd_to_krw, inputs["upbit_symbols"], inputs["upbit_price_map"] = future.result()
+                        if usd_to_krw is None:
+                            # KRW-USDT 시세를 받지 못했으면 외부 환율 API로 대체
+                            usd_to_krw = (inputs["upbit_price_map"].get(UPBIT_USDT_MARKET)
+                                          or await self.fetch_usd_krw_rate(None))
+                        inputs["usd_to_krw"] = usd_to_krw
+                    if stages:
+                        self._emit_stage(stage, inputs)
+
+            pending = [f for f in price_futures + list(stages) if not f.done()]
+            if pending:
+                # 시간 예산 초과 - 남은 요청은 취소하고, 받지 못한 항목은 마지막 정상 값으로 채워지거나 None으로 남음
+                for future in pending:
+                    future.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                Metrics().incr(DEADLINE_METRIC)
+                logging.warning(f"조회 시간 예산({self.deadline:.1f}초) 초과 - "
+                                f"요청 {len(pending)}개를 취소하고 받은 결과만 표시합니다")
+
+        # 업비트 시세도 받지 못한 항목은 마지막 정상 값으로 채움 (업비트 단계가 시간 안에 끝나지 않았어도)
+        if not inputs["upbit_symbols"]:
+            inputs["upbit_symbols"] = self._upbit_symbols()
+        upbit_markets = self._upbit_markets(inputs["upbit_symbols"])
+        upbit_ages = fill_last_known_good(self.endpoints['upbit'], inputs["upbit_price_map"], upbit_markets,
+                                          fill=self.book is None)
+        if not inputs["usd_to_krw"] and self.fx_source == FX_SOURCE_UPBIT:
+            inputs["usd_to_krw"] = inputs["upbit_price_map"].get(UPBIT_USDT_MARKET) or 0.0
+        self.aged = aged_symbols(binance_ages, inputs["upbit_symbols"], upbit_ages)
+
+        record_cycle(decode_start)
+        return inputs
+
+    async def _fetch_premium_inputs(self, sess, deadline: CycleDeadline):
+        """
+        김치 프리미엄 계산에 필요한 업비트 마켓 매핑/시세와 환율을 조회합니다.
+
+        Returns:
+            (환율 또는 업비트 KRW-USDT로 계산할 때는 None, {바이낸스 심볼: 업비트 마켓}, {마켓: 가격})
+        """
+        # 업비트 상장 마켓 목록은 하루 한 번만 새로 받음
+        try:
+            await asyncio.wait_for(self.upbit_catalog.refresh_async(sess, self.endpoints['upbit']),
+                                   deadline.remaining())
+        except asyncio.TimeoutError:
+            logging.warning("업비트 마켓 목록 조회가 시간 예산을 넘어 기존 목록으로 조회합니다")
+        upbit_symbols = self._upbit_symbols()
+        if self.fx_source == FX_SOURCE_UPBIT:
+            # 환율도 같은 업비트 일괄 요청의 KRW-USDT 체결가로 계산
+            fx_task = asyncio.sleep(0, result=None)
+        else:
+            fx_task = self.fetch_usd_krw_rate(sess)
+        usd_to_krw, upbit_price_map = await asyncio.gather(
+            fx_task, self.fetch_upbit_prices(sess, self._upbit_markets(upbit_symbols)))
+        return usd_to_krw, upbit_symbols, upbit_price_map
+
+    def _upbit_symbols(self) -> Dict[str, str]:
+        """업비트에 상장된 심볼의 {바이낸스 심볼: 업비트 마켓}"""
+        upbit_symbols = {}
+        for symbol in self.symbols:
+            up_sym = self.upbit_catalog.to_upbit_symbol(symbol)
+            if up_sym:
+                upbit_symbols[symbol] = up_sym
+        return upbit_symbols
+
+    def _upbit_markets(self, upbit_symbols: Dict[str, str]) -> List[str]:
+        """업비트 시세를 받을 마켓 목록 (업비트 환율을 쓰면 KRW-USDT 포함)"""
+        upbit_markets = list(upbit_symbols.values())
+        if self.fx_source == FX_SOURCE_UPBIT:
+            upbit_markets.append(UPBIT_USDT_MARKET)
+        return upbit_markets
+
+    def _emit_stage(self, stage: str, inputs: Dict[str, Any]) -> None:
+        if self.on_stage is not None:
+            self.on_stage(stage, stage_results(self.symbols, inputs, self.book, self.price_table))
+
+    async def fetch_usd_krw_rate(self, sess):
+        # 최초 1회를 제외하면 캐시된 값을 바로 돌려주므로 스레드 풀에서 짧게 끝남
+        return await asyncio.get_running_loop().run_in_executor(None, self.fx_provider.get_rate)
+
+    async def fetch_binance_price(self, sess, symbol):
+        try:
+            async with sess.get(f"{self.endpoints['binance']}/api/v3/ticker/price",
+                                params={"symbol": symbol}) as r:
+                data = await decode_async(r)
+                return float(data["price"])
+        except Exception as e:
+            logging.error(f"{symbol} 바이낸스 가격 조회 실패: {e}")
+            return None
+
+    async def fetch_morning_price(self, sess, symbol):
+        try:
+            target_date, ts = morning_target()
+            # 디스크/메모리에 저장된 기준 시가가 있으면 네트워크 요청 생략
+            cached = self.reference_provider.cached_open(symbol, target_date)
+            if cached is not None:
+                return cached
+
+            async with sess.get(f"{self.endpoints['binance']}/api/v3/klines", params={
+                "symbol": symbol, "interval": "1h",
+                "startTime": ts, "endTime": ts + 3600000, "limit": 1
+            }) as r:
+                data = await decode_async(r)
+            if data and len(data) > 0:
+                price = float(data[0][1])
+                logging.info(f"{symbol} {target_date} 오전 9시 가격: {price}")
+                return price
+        except Exception as e:
+            logging.error(f"{symbol} 아침 가격 조회 실패: {e}")
+        return None
+
+    async def fetch_upbit_prices(self, sess, markets):
+        # 마켓이 많으면 URL 길이 제한에 걸리지 않도록 나눠서 동시에 요청
+        upbit_price_map = {}
+        for chunk_map in await asyncio.gather(*(self.fetch_upbit_chunk(sess, c) for c in chunk_markets(markets))):
+            upbit_price_map.update(chunk_map)
+        return upbit_price_map
+
+    async def fetch_upbit_chunk(self, sess, markets):
+        upbit_price_map = {}
+        try:
+            async with sess.get(f"{self.endpoints['upbit']}/v1/ticker",
+                                params={"markets": ",".join(markets)}) as r:
+                if r.status == 404:
+                    # 없는 마켓이 섞임 - 상장 폐지 등으로 목록이 바뀌었을 수 있으니 다음 조회 때 다시 받음
+                    self.upbit_catalog.invalidate()
+                r.raise_for_status()
+                for item in await decode_async(r):
+                    upbit_price_map[item["market"]] = float(item["trade_price"])
+        except Exception as e:
+            logging.error(f"Upbit 조회 실패: {e}")
+        return upbit_price_map
@@ -0,0 +1,388 @@
+# benchmark.py
+import argparse
+import statistics
+import time
+
+from mock_server import MockExchangeServer, MockHttp2Server, MockStreamServer
+
+
+def _time_calls(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def bench_engines(args):
+    """동기 엔진과 asyncio 엔진의 1회 갱신 시간을 비교합니다."""
+    from price_fetcher import PriceFetcher
+
+    print(f"mock latency={args.latency * 1000:.0f}ms, repeat={args.repeat}")
+    print(f"{'symbols':>8} {'sync(s)':>10} {'async(s)':>10} {'speedup':>8}")
+    with MockExchangeServer(latency=args.latency) as server:
+        for count in args.symbols:
+            symbols = [f"SYM{i}USDT" for i in range(count)]
+            sync_fetcher = PriceFetcher(symbols, engine="sync", endpoints=server.endpoints())
+            async_fetcher = PriceFetcher(symbols, engine="async", endpoints=server.endpoints())
+            sync_t = _time_calls(sync_fetcher.fetch, args.repeat)
+            async_t = _time_calls(async_fetcher.fetch, args.repeat)
+            print(f"{count:>8} {sync_t:>10.3f} {async_t:>10.3f} {sync_t / async_t:>7.1f}x")
+
+
+def bench_stream(args):
+    """스트리밍 모드의 갱신 횟수와 REST 요청 수를 폴링 방식과 비교합니다. (중간에 연결을 한 번 끊음)"""
+    import asyncio
+    import threading
+    from streaming import StreamingPriceFeed
+
+    symbols = [f"SYM{i}USDT" for i in range(args.symbols)]
+    updates = []
+    with MockExchangeServer(latency=args.latency) as rest, MockStreamServer() as ws:
+        feed = StreamingPriceFeed(symbols, lambda r: updates.append(time.perf_counter()),
+                                  refresh_interval=args.refresh_interval,
+                                  endpoints=rest.endpoints(), stream_url=ws.url,
+                                  upbit_stream_url=ws.url if args.upbit else None)
+        feed.stream.policy.initial = 0.2
+        if feed.upbit_stream is not None:
+            feed.upbit_stream.policy.initial = 0.2
+        threading.Timer(args.duration / 2, ws.drop_connections).start()
+        threading.Timer(args.duration, feed.stop).start()
+        asyncio.run(feed.run())
+        rest_requests = sum(rest.request_counts.values())
+
+    polling_requests = int(args.duration / args.refresh_interval) * (2 * len(symbols) + 2)
+    print(f"duration={args.duration}s, symbols={len(symbols)}")
+    print(f"streaming: {len(updates)} updates, {rest_requests} REST requests, "
+          f"{ws.connections} websocket connections")
+    print(f"polling:   {int(args.duration / args.refresh_interval)} updates, "
+          f"~{polling_requests} REST requests")
+
+
+def bench_pooling(args):
+    """새로고침마다 세션을 새로 만드는 방식과 장수 작업자의 연결 풀 방식의 새 연결 수를 비교합니다."""
+    from fetch_worker import make_pooled_session
+    from price_fetcher import PriceFetcher
+
+    symbols = [f"SYM{i}USDT" for i in range(args.symbols)]
+    with MockExchangeServer(latency=args.latency) as server:
+        start = time.perf_counter()
+        for _ in range(args.cycles):
+            PriceFetcher(symbols, endpoints=server.endpoints()).fetch_sync()
+        per_refresh = (server.connections, time.perf_counter() - start)
+
+        server.connections = 0
+        session = make_pooled_session()
+        start = time.perf_counter()
+        for _ in range(args.cycles):
+            PriceFetcher(symbols, endpoints=server.endpoints(), session=session).fetch_sync()
+        pooled = (server.connections, time.perf_counter() - start)
+        session.close()
+
+    print(f"cycles={args.cycles}, symbols={len(symbols)}")
+    print(f"{'mode':>12} {'connections':>12} {'time(s)':>8}")
+    print(f"{'per-refresh':>12} {per_refresh[0]:>12} {per_refresh[1]:>8.3f}")
+    print(f"{'pooled':>12} {pooled[0]:>12} {pooled[1]:>8.3f}")
+
+
+def bench_snapshot(args):
+    """심볼 수에 따라 symbols=[...] 일괄 요청과 전체 시장 시세 1회 요청의 비용을 비교합니다."""
+    from overlay import PriceFetcherThread
+    from rate_limiter import GovernedSession
+
+    print(f"mock latency={args.latency * 1000:.0f}ms, repeat={args.repeat}")
+    print(f"{'symbols':>8} {'mode':>9} {'requests':>9} {'weight':>7} {'KB':>8} {'time(s)':>8}")
+    with MockExchangeServer(latency=args.latency) as server, GovernedSession() as sess:
+        for count in args.symbols:
+            symbols = [f"SYM{i}USDT" for i in range(count)]
+            timings = {}
+            for mode, threshold in (("batch", None), ("snapshot", 1)):
+                fetcher = PriceFetcherThread(symbols, endpoints=server.endpoints(),
+                                             snapshot_threshold=threshold)
+                server.request_counts.clear()
+                server.bytes_sent = 0
+                weight = server.used_weight
+                timings[mode] = _time_calls(lambda: fetcher.fetch_binance_prices(sess, symbols), args.repeat)
+                requests_per_call = sum(server.request_counts.values()) / args.repeat
+                weight_per_call = (server.used_weight - weight) / args.repeat
+                kb_per_call = server.bytes_sent / args.repeat / 1024
+                print(f"{count:>8} {mode:>9} {requests_per_call:>9.0f} {weight_per_call:>7.0f} "
+                      f"{kb_per_call:>8.1f} {timings[mode]:>8.3f}")
+            winner = "snapshot" if timings["snapshot"] < timings["batch"] else "batch"
+            print(f"{'':>8} -> {winner}")
+
+
+def bench_compute(args):
+    """결과 조합(변동률/김치 프리미엄) 1회의 CPU 시간을 심볼별 계산과 numpy 계산으로 비교합니다."""
+    import random
+    import timeit
+    from fetch_common import PriceTable, build_results_scalar, build_results_vectorized, np
+
+    if np is None:
+        print("numpy가 설치되어 있지 않습니다")
+        return
+    rng = random.Random(0)
+    print(f"{'symbols':>8} {'scalar(us)':>11} {'numpy(us)':>10} {'math only(us)':>14}")
+    for count in args.symbols:
+        symbols = [f"SYM{i}USDT" for i in range(count)]
+        # 가격/시가/업비트 시세가 일부 빠진 현실적인 입력
+        binance_map = {s: rng.uniform(1, 1000) if rng.random() > 0.05 else None for s in symbols}
+        morning_map = {s: rng.uniform(1, 1000) if rng.random() > 0.05 else None for s in symbols}
+        upbit_symbols = {s: "KRW-" + s[:-4] for s in symbols if rng.random() > 0.3}
+        upbit_price_map = {m: rng.uniform(1e3, 1e6) for m in upbit_symbols.values()}
+        inputs = (symbols, binance_map, morning_map, upbit_symbols, upbit_price_map, 1380.0)
+        table = PriceTable(symbols, upbit_symbols)
+        table.load(binance_map, morning_map, upbit_price_map)
+
+        timings = []
+        # 조회기처럼 같은 PriceTable을 계속 재사용
+        for fn in (lambda: build_results_scalar(*inputs), lambda: build_results_vectorized(*inputs, table=table),
+                   lambda: table.compute(1380.0)):
+            timings.append(min(timeit.repeat(fn, number=args.number, repeat=5)) / args.number * 1e6)
+        print(f"{count:>8} {timings[0]:>11.1f} {timings[1]:>10.1f} {timings[2]:>14.1f}")
+
+
+def bench_memory(args):
+    """심볼당 시세 표현 메모리 사용량을 비교합니다. (tracemalloc)"""
+    import gc
+    import tracemalloc
+    from quotes import Quote, QuoteBook
+
+    class PlainQuote:
+        # __slots__가 없는 같은 필드의 클래스 (비교용)
+        def __init__(self, symbol, i):
+            for name in Quote.__slots__:
+                setattr(self, name, 0.5 + i)
+            self.symbol = symbol
+            self.stale = 0
+
+    def filled_book(symbols):
+        book = QuoteBook(symbols)
+        book.update({s: (101.5 + i, 1.25 + i, 2.5 + i) for i, s in enumerate(symbols)},
+                    morning_map={s: 100.0 + i for i, s in enumerate(symbols)})
+        return book
+
+    def measure(build):
+        gc.collect()
+        tracemalloc.start()
+        obj = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del obj
+        return size
+
+    print(f"{'symbols':>8} {'tuple dict':>11} {'dict dict':>10} {'plain obj':>10} {'QuoteBook':>10}  (bytes/symbol)")
+    for count in args.symbols:
+        symbols = [f"SYM{i}USDT" for i in range(count)]
+        values = (101.5, 1.25, 2.5)
+        builders = [
+            lambda: {s: tuple(v + i for v in values) for i, s in enumerate(symbols)},
+            lambda: {s: {"price": 101.5 + i, "reference": 100.0 + i, "morning_diff": 1.25 + i,
+                         "kimchi_premium": 2.5 + i, "price_time": 0.5 + i, "reference_time": 0.5 + i,
+                         "premium_time": 0.5 + i, "stale": 0} for i, s in enumerate(symbols)},
+            lambda: {s: PlainQuote(s, i) for i, s in enumerate(symbols)},
+            lambda: filled_book(symbols),
+        ]
+        sizes = [measure(build) / count for build in builders]
+        print(f"{count:>8} {sizes[0]:>11.0f} {sizes[1]:>10.0f} {sizes[2]:>10.0f} {sizes[3]:>10.0f}")
+
+
+def bench_hedge(args):
+    """가끔 느려지는 기본 호스트만 쓸 때와 미러 호스트로 헤지할 때의 응답 시간 분포를 비교합니다."""
+    from hedging import HedgedRequester
+    from metrics import Metrics
+    from rate_limiter import GovernedSession
+
+    def percentiles(samples):
+        samples = sorted(samples)
+        return [samples[min(len(samples) - 1, int(len(samples) * q / 100))] * 1000 for q in (50, 99)]
+
+    print(f"mock latency={args.latency * 1000:.0f}ms, slow={args.slow_ratio:.0%} x "
+          f"{args.slow_latency * 1000:.0f}ms, requests={args.requests}")
+    print(f"{'mode':>8} {'p50(ms)':>8} {'p99(ms)':>8} {'max(ms)':>8} {'hedges':>7}")
+    with MockExchangeServer(latency=args.latency) as primary, \
+            MockExchangeServer(latency=args.latency) as mirror, GovernedSession() as sess:
+        primary.slow_ratio = args.slow_ratio
+        primary.slow_latency = args.slow_latency
+        hedger = HedgedRequester([primary.url, mirror.url], delay_percentile=args.percentile,
+                                 max_ratio=args.max_ratio)
+        modes = (
+            ("single", lambda: sess.get(f"{primary.url}/api/v3/ticker/price", params={"symbol": "BTCUSDT"})),
+            ("hedged", lambda: hedger.get(sess, "/api/v3/ticker/price", params={"symbol": "BTCUSDT"})),
+        )
+        for mode, call in modes:
+            hedges = Metrics().get("hedge.sent", 0)
+            samples = []
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                call()
+                samples.append(time.perf_counter() - start)
+            p50, p99 = percentiles(samples)
+            print(f"{mode:>8} {p50:>8.1f} {p99:>8.1f} {max(samples) * 1000:>8.1f} "
+                  f"{Metrics().get('hedge.sent', 0) - hedges:>7.0f}")
+
+
+def bench_http2(args):
+    """심볼별 요청(가격 + klines)만으로 이뤄진 조회 1회의 시간을 HTTP/1.1과 HTTP/2 전송 계층으로 비교합니다."""
+    from fetch_common import morning_target
+    from overlay import PriceFetcherThread
+    from transport import Http2Transport, RequestsTransport
+
+    if not Http2Transport.available():
+        print("httpx[http2]가 설치되어 있지 않습니다")
+        return
+
+    _, ts = morning_target()
+
+    def per_symbol_cycle(server, transport, symbols):
+        fetcher = PriceFetcherThread(symbols, endpoints=server.endpoints(), transport=transport)
+
+        def fetch_one(symbol):
+            transport.get(f"{server.url}/api/v3/klines", params={
+                "symbol": symbol, "interval": "1h", "startTime": ts, "endTime": ts + 3600000, "limit": 1})
+            return fetcher.fetch_binance_price(transport, symbol)
+
+        return lambda: transport.map(fetch_one, symbols)
+
+    print(f"mock latency={args.latency * 1000:.0f}ms, repeat={args.repeat}")
+    print(f"{'symbols':>8} {'http1(s)':>9} {'conns':>6} {'http2(s)':>9} {'conns':>6} {'speedup':>8}")
+    with MockExchangeServer(latency=args.latency) as http1_server, \
+            MockHttp2Server(latency=args.latency) as http2_server, \
+            RequestsTransport() as http1, Http2Transport(prior_knowledge=True) as http2:
+        for count in args.symbols:
+            symbols = [f"SYM{i}USDT" for i in range(count)]
+            http1_t = _time_calls(per_symbol_cycle(http1_server, http1, symbols), args.repeat)
+            http2_t = _time_calls(per_symbol_cycle(http2_server, http2, symbols), args.repeat)
+            print(f"{count:>8} {http1_t:>9.3f} {http1_server.connections:>6} {http2_t:>9.3f} "
+                  f"{http2_server.connections:>6} {http1_t / http2_t:>7.1f}x")
+
+
+def bench_retry(args):
+    """일시적 오류(5xx)가 섞일 때 재시도 정책 유무에 따른 조회 1회의 누락 가격 수와 시간을 비교합니다."""
+    from price_fetcher import PriceFetcher
+    from retry_policy import RetryPolicy
+
+    symbols = [f"SYM{i}USDT" for i in range(args.symbols)]
+    print(f"symbols={args.symbols}, mock latency={args.latency * 1000:.0f}ms, status={args.status}, "
+          f"deadline={args.deadline}s")
+    print(f"{'errors':>7} {'policy':>8} {'missing':>8} {'requests':>9} {'time(s)':>8}")
+    with MockExchangeServer(latency=args.latency) as server:
+        server.error_status = args.status
+        for ratio in args.error_ratio:
+            for name, policy in (("none", RetryPolicy(max_attempts=1)),
+                                 ("backoff", RetryPolicy(max_attempts=args.attempts))):
+                server.error_ratio = ratio
+                server.request_counts.clear()
+                fetcher = PriceFetcher(symbols, endpoints=server.endpoints(), deadline=args.deadline,
+                                       retry_policy=policy)
+                start = time.perf_counter()
+                results = fetcher.fetch()
+                elapsed = time.perf_counter() - start
+                missing = sum(1 for price, _, _ in results.values() if price is None)
+                requests_sent = server.request_counts.get("/api/v3/ticker/price", 0)
+                print(f"{ratio:>7.0%} {name:>8} {missing:>8} {requests_sent:>9} {elapsed:>8.2f}")
+
+
+def bench_json(args):
+    """전체 시장 시세 응답에서 조회 대상 가격을 얻는 CPU 시간을 디코딩 방식별로 비교합니다."""
+    import json
+    import random
+    import timeit
+    import fast_json
+
+    rng = random.Random(0)
+    items = [{"symbol": f"SYM{i}USDT", "price": f"{rng.uniform(0.001, 1000):.8f}"} for i in range(args.markets)]
+    data = json.dumps(items, separators=(",", ":")).encode()
+    print(f"markets={args.markets} ({len(data) / 1024:.0f}KB), backend={fast_json.BACKEND}")
+    print(f"{'symbols':>8} {'json(ms)':>9} {'orjson(ms)':>11} {'extract(ms)':>12}")
+    for count in args.symbols:
+        watched = set(rng.sample([item["symbol"] for item in items], count))
+
+        def full_decode(loads):
+            return {item["symbol"]: float(item["price"]) for item in loads(data) if item["symbol"] in watched}
+
+        timings = []
+        for fn in (lambda: full_decode(json.loads),
+                   lambda: full_decode(fast_json.orjson.loads) if fast_json.orjson else None,
+                   lambda: fast_json.extract_ticker_prices(data, watched)):
+            timings.append(min(timeit.repeat(fn, number=args.number, repeat=5)) / args.number * 1000)
+        orjson_t = f"{timings[1]:>11.2f}" if fast_json.orjson else f"{'-':>11}"
+        print(f"{count:>8} {timings[0]:>9.2f} {orjson_t} {timings[2]:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="가격 조회 벤치마크 (로컬 목 서버 사용)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    engines = sub.add_parser("engines", help="동기 vs asyncio 조회 엔진 비교")
+    engines.add_argument("--symbols", type=int, nargs="+", default=[1, 5, 20])
+    engines.add_argument("--latency", type=float, default=0.05)
+    engines.add_argument("--repeat", type=int, default=3)
+    engines.set_defaults(func=bench_engines)
+
+    stream = sub.add_parser("stream", help="웹소켓 스트리밍 vs REST 폴링 비교")
+    stream.add_argument("--symbols", type=int, default=5)
+    stream.add_argument("--duration", type=float, default=6)
+    stream.add_argument("--refresh-interval", type=float, default=2)
+    stream.add_argument("--latency", type=float, default=0.05)
+    stream.add_argument("--upbit", action="store_true", help="업비트 웹소켓도 함께 구독")
+    stream.set_defaults(func=bench_stream)
+
+    pooling = sub.add_parser("pooling", help="새로고침별 세션 vs 연결 풀 재사용 비교")
+    pooling.add_argument("--symbols", type=int, default=5)
+    pooling.add_argument("--cycles", type=int, default=10)
+    pooling.add_argument("--latency", type=float, default=0.005)
+    pooling.set_defaults(func=bench_pooling)
+
+    snapshot = sub.add_parser("snapshot", help="일괄 요청 vs 전체 시장 시세 교차점 비교")
+    snapshot.add_argument("--symbols", type=int, nargs="+", default=[10, 50, 100, 150, 200, 400, 800])
+    snapshot.add_argument("--latency", type=float, default=0.05)
+    snapshot.add_argument("--repeat", type=int, default=3)
+    snapshot.set_defaults(func=bench_snapshot)
+
+    compute = sub.add_parser("compute", help="결과 조합 CPU 시간 (심볼별 vs numpy)")
+    compute.add_argument("--symbols", type=int, nargs="+", default=[10, 100, 1000])
+    compute.add_argument("--number", type=int, default=200)
+    compute.set_defaults(func=bench_compute)
+
+    memory = sub.add_parser("memory", help="심볼당 시세 표현 메모리 사용량")
+    memory.add_argument("--symbols", type=int, nargs="+", default=[100, 1000, 10000])
+    memory.set_defaults(func=bench_memory)
+
+    hedge = sub.add_parser("hedge", help="느린 호스트에서 미러 헤지 요청의 꼬리 지연 비교")
+    hedge.add_argument("--requests", type=int, default=300)
+    hedge.add_argument("--latency", type=float, default=0.01)
+    hedge.add_argument("--slow-ratio", type=float, default=0.03)
+    hedge.add_argument("--slow-latency", type=float, default=0.5)
+    hedge.add_argument("--percentile", type=float, default=95)
+    hedge.add_argument("--max-ratio", type=float, default=0.1)
+    hedge.set_defaults(func=bench_hedge)
+
+    http2 = sub.add_parser("http2", help="심볼별 요청의 HTTP/1.1 vs HTTP/2 멀티플렉싱 비교")
+    http2.add_argument("--symbols", type=int, nargs="+", default=[5, 20, 50, 100])
+    http2.add_argument("--latency", type=float, default=0.05)
+    http2.add_argument("--repeat", type=int, default=3)
+    http2.set_defaults(func=bench_http2)
+
+    json_ = sub.add_parser("json", help="전체 시장 시세 응답 디코딩 CPU 시간 (json vs orjson vs 필요한 항목만 추출)")
+    json_.add_argument("--markets", type=int, default=2500)
+    json_.add_argument("--symbols", type=int, nargs="+", default=[10, 100, 500])
+    json_.add_argument("--number", type=int, default=20)
+    json_.set_defaults(func=bench_json)
+
+    retry = sub.add_parser("retry", help="일시적 오류가 섞일 때 재시도 정책 유무 비교")
+    retry.add_argument("--symbols", type=int, default=50)
+    retry.add_argument("--latency", type=float, default=0.005)
+    retry.add_argument("--error-ratio", type=float, nargs="+", default=[0.01, 0.05, 0.2])
+    retry.add_argument("--status", type=int, default=503)
+    retry.add_argument("--attempts", type=int, default=3)
+    retry.add_argument("--deadline", type=float, default=5.0)
+    retry.set_defaults(func=bench_retry)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -32,6 +32,22 @@ class ConfigManager:
             "window_width": 300,
             "window_height": 40,
             "refresh_interval": 2,
+            "fx_ttl": 3600,
+            "fx_source": "exchangerate",
+            "fetch_engine": "sync",
+            "use_streaming": False,
+            "stream_reference_interval": 60,
+            "use_upbit_stream": True,
+            "snapshot_threshold": 150,
+            "lkg_max_age": 300,
+            "hedge_binance": False,
+            "hedge_percentile": 95,
+            "hedge_max_ratio": 0.1,
+            "dns_ttl": 300,
+            "transport": "requests",
+            "retry_max_attempts": 3,
+            "retry_base_delay": 0.2,
+            "retry_max_delay": 2.0,
             "theme": "dark",
             "language": "ko",
             "enable_alerts": False,
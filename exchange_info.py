@@ -0,0 +1,204 @@
+# exchange_info.py
+import decimal
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from fast_json import decode
+from fetch_common import DEFAULT_ENDPOINTS
+from utils import SharedInstances, cache_path, load_json_cache, save_json_cache
+
+TRADING = "TRADING"
+
+
+class SymbolInfo(NamedTuple):
+    """바이낸스 심볼 메타데이터 (tick/step 크기는 정확한 자릿수 계산을 위해 문자열로 보관)"""
+    base_asset: str
+    quote_asset: str
+    status: str
+    tick_size: str
+    step_size: str
+
+
+def _decimals(size: str) -> int:
+    """'0.01000000' 같은 tick/step 크기의 소수점 자릿수"""
+    exponent = decimal.Decimal(size).normalize().as_tuple().exponent
+    return max(0, -exponent)
+
+
+class ExchangeInfoIndex:
+    """
+    바이낸스 exchangeInfo에서 필요한 값만 뽑은 심볼 색인.
+    수 MB짜리 exchangeInfo 응답 대신 {심볼: [기준자산, 견적자산, 상태, tick, step]} 형태로
+    디스크에 저장하고, 처음 조회할 때 읽어 들입니다. 조회는 딕셔너리 한 번이므로
+    설정 창에서 입력한 티커를 네트워크 요청 없이 바로 검증할 수 있습니다.
+    색인은 백그라운드에서 하루에 한 번만 새로 받습니다.
+    """
+
+    def __init__(self, url: str = DEFAULT_ENDPOINTS["binance"], path: Optional[str] = None,
+                 ttl: float = 86400, retry_interval: float = 600):
+        """
+        Args:
+            url: 바이낸스 API 주소
+            path: 색인을 저장할 파일 경로 (None이면 저장하지 않음)
+            ttl: 색인을 새로 받지 않고 재사용할 시간(초)
+            retry_interval: 받기에 실패한 뒤 다시 시도하기까지 기다릴 시간(초) - 가중치 20짜리 요청이라
+                새로고침마다 다시 보내지 않음
+        """
+        self.url = url
+        self.path = path
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self.fetched_at = 0.0
+        self.failed_at = 0.0
+        self._symbols: Optional[Dict[str, SymbolInfo]] = None
+        self._loaded = False
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            loaded = load_json_cache(self.path, "exchangeInfo 색인", lambda data: (
+                {symbol: SymbolInfo(*fields) for symbol, fields in data["symbols"].items()},
+                float(data["fetched_at"])))
+            if loaded is not None:
+                self._symbols, self.fetched_at = loaded
+
+    def _save(self) -> None:
+        save_json_cache(self.path, {"fetched_at": self.fetched_at,
+                                    "symbols": {s: list(info) for s, info in self._symbols.items()}},
+                        "exchangeInfo 색인", separators=(",", ":"))
+
+    def available(self) -> bool:
+        """색인을 사용할 수 있는지 (한 번이라도 받았거나 디스크에 있는지)"""
+        self._ensure_loaded()
+        return self._symbols is not None
+
+    def is_stale(self) -> bool:
+        self._ensure_loaded()
+        return self._symbols is None or time.time() - self.fetched_at >= self.ttl
+
+    def should_refresh(self) -> bool:
+        """색인이 오래되었고 최근에 받기에 실패하지 않았는지"""
+        return self.is_stale() and time.time() - self.failed_at >= self.retry_interval
+
+    @staticmethod
+    def parse(data) -> Dict[str, SymbolInfo]:
+        """exchangeInfo 응답에서 심볼별 메타데이터를 뽑아냅니다."""
+        symbols = {}
+        for item in data.get("symbols", []):
+            filters = {f.get("filterType"): f for f in item.get("filters", [])}
+            symbols[item["symbol"]] = SymbolInfo(
+                item.get("baseAsset", ""),
+                item.get("quoteAsset", ""),
+                item.get("status", ""),
+                filters.get("PRICE_FILTER", {}).get("tickSize", "0.00000001"),
+                filters.get("LOT_SIZE", {}).get("stepSize", "0.00000001"),
+            )
+        return symbols
+
+    def update(self, data) -> None:
+        symbols = self.parse(data)
+        if not symbols:
+            raise ValueError("exchangeInfo 응답에 심볼이 없습니다")
+        self._ensure_loaded()
+        with self._lock:
+            self._symbols = symbols
+            self.fetched_at = time.time()
+            self._save()
+        logging.info(f"exchangeInfo 색인 갱신: {len(symbols)}개 심볼")
+
+    def refresh(self, sess) -> None:
+        """
+        색인이 오래되었으면 새로 받습니다. 실패하면 기존 색인을 계속 사용하고
+        retry_interval 동안은 다시 요청하지 않습니다.
+        """
+        if not self.should_refresh():
+            return
+        try:
+            r = sess.get(f"{self.url}/api/v3/exchangeInfo", timeout=30)
+            r.raise_for_status()
+            self.update(decode(r))
+        except Exception as e:
+            self.failed_at = time.time()
+            logging.error(f"exchangeInfo 조회 실패 ({self.retry_interval:.0f}초 뒤 다시 시도): {e}")
+
+    def refresh_in_background(self) -> None:
+        """
+        색인이 오래되었으면 별도 스레드에서 새로 받습니다.
+        이미 갱신 중이거나 최근 실패 후 retry_interval이 지나지 않았으면 아무것도 하지 않습니다.
+        """
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        if not self.should_refresh():
+            with self._lock:
+                self._refreshing = False
+            return
+        threading.Thread(target=self._refresh_worker, daemon=True).start()
+
+    def _refresh_worker(self) -> None:
+        from rate_limiter import GovernedSession
+        try:
+            with GovernedSession() as sess:
+                self.refresh(sess)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def get(self, symbol: str) -> Optional[SymbolInfo]:
+        self._ensure_loaded()
+        symbols = self._symbols
+        return symbols.get(symbol) if symbols is not None else None
+
+    def is_valid(self, symbol: str) -> Optional[bool]:
+        """거래 중인 심볼인지. 색인이 없으면 판단할 수 없으므로 None."""
+        if not self.available():
+            return None
+        info = self.get(symbol)
+        return info is not None and info.status == TRADING
+
+    def validate(self, symbols: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """
+        심볼 목록을 (사용 가능한 심볼, 없거나 거래 중지된 심볼)로 나눕니다.
+        색인이 없으면 모두 사용 가능한 것으로 봅니다.
+        """
+        valid, invalid = [], []
+        for symbol in symbols:
+            (invalid if self.is_valid(symbol) is False else valid).append(symbol)
+        return valid, invalid
+
+    def price_decimals(self, symbol: str, default: int = 2) -> int:
+        """심볼의 tick 크기에 맞는 가격 소수점 자릿수"""
+        info = self.get(symbol)
+        return _decimals(info.tick_size) if info else default
+
+    def format_price(self, symbol: str, price: float) -> str:
+        """
+        가격을 심볼의 tick 크기에 맞춰 문자열로 만듭니다.
+
+        Args:
+            symbol: 바이낸스 심볼
+            price: 가격
+
+        Returns:
+            천 단위 구분 기호가 들어간 가격 문자열
+        """
+        return f"{price:,.{self.price_decimals(symbol)}f}"
+
+
+_indexes = SharedInstances()
+
+
+def get_exchange_info(url: str = DEFAULT_ENDPOINTS["binance"]) -> ExchangeInfoIndex:
+    """
+    주소별 공용 exchangeInfo 색인을 반환합니다.
+    기본 주소의 색인만 디스크에 저장합니다.
+    """
+    return _indexes.get(url, lambda: ExchangeInfoIndex(
+        url, cache_path("exchange_info.json") if url == DEFAULT_ENDPOINTS["binance"] else None))
@@ -0,0 +1,114 @@
+# fast_json.py
+import json
+import re
+import threading
+import time
+from typing import Any, Dict, FrozenSet, Iterable, Union
+
+try:
+    import orjson
+except ImportError:  # orjson이 없으면 표준 json 모듈로 디코딩
+    orjson = None
+
+from metrics import Metrics
+
+BACKEND = "orjson" if orjson is not None else "json"
+# 디코딩에 쓴 누적 시간(ms)과 조회 1회의 디코딩 시간(ms)
+DECODE_METRIC = "json.decode_ms"
+CYCLE_DECODE_METRIC = "fetch.decode_ms"
+# 이 개수 이하의 심볼은 응답 본문에서 심볼별로 직접 찾음 (그보다 많으면 한 번 훑는 편이 빠름)
+FIND_MAX_SYMBOLS = 10
+
+# 전체 시장 시세 응답의 {"symbol":"...","price":"..."} 항목
+_TICKER_ITEM = re.compile(rb'"symbol"\s*:\s*"([^"]+)"\s*,\s*"price"\s*:\s*"([^"]+)"')
+
+# 스레드별 디코딩 누적 시간 - 조회 1회의 디코딩 시간에 다른 스레드(백그라운드 갱신 등)의 디코딩이 섞이지 않게 함
+_local = threading.local()
+
+
+def _record_decode(start: float) -> None:
+    elapsed = (time.perf_counter() - start) * 1000
+    Metrics().incr(DECODE_METRIC, elapsed)
+    _local.decode_ms = getattr(_local, "decode_ms", 0.0) + elapsed
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """JSON을 디코딩하고 걸린 시간을 지표에 더합니다. (orjson이 있으면 orjson 사용)"""
+    start = time.perf_counter()
+    result = orjson.loads(data) if orjson is not None else json.loads(data)
+    _record_decode(start)
+    return result
+
+
+def decode(response) -> Any:
+    """requests/httpx 응답 본문을 디코딩합니다. (r.json() 대신 사용)"""
+    return loads(response.content)
+
+
+async def decode_async(response) -> Any:
+    """aiohttp 응답 본문을 디코딩합니다. (await r.json(content_type=None) 대신 사용)"""
+    return loads(await response.read())
+
+
+def _find_prices(data: bytes, symbols: FrozenSet[str]) -> Dict[str, float]:
+    # 바이낸스 응답은 공백 없는 형식 - 심볼마다 bytes.find로 해당 항목만 찾음
+    prices = {}
+    for symbol in symbols:
+        key = b'"symbol":"' + symbol.encode() + b'","price":"'
+        start = data.find(key)
+        if start >= 0:
+            start += len(key)
+            prices[symbol] = float(data[start:data.index(b'"', start)])
+    return prices
+
+
+def extract_ticker_prices(data: bytes, symbols: Iterable[str]) -> Dict[str, float]:
+    """
+    전체 시장 시세(/api/v3/ticker/price) 응답에서 조회 대상 심볼의 가격만 뽑아냅니다.
+    심볼이 적으면 응답 본문에서 해당 항목만 직접 찾고, 많으면 orjson으로 한 번에 디코딩합니다.
+    orjson이 없으면 시장마다 딕셔너리를 만들지 않고 (심볼, 가격) 바이트 쌍만 뽑아 고릅니다.
+
+    Args:
+        data: 응답 본문
+        symbols: 조회할 심볼 목록
+
+    Returns:
+        {심볼: 가격} - 응답에 없는 심볼은 빠짐
+    """
+    watched = frozenset(symbols)
+    if len(watched) <= FIND_MAX_SYMBOLS:
+        start = time.perf_counter()
+        prices = _find_prices(data, watched)
+        _record_decode(start)
+        if prices or not watched:
+            return prices
+        # 하나도 못 찾음 - 형식이 다를 수 있으니(공백 등) 아래 방식으로 다시 확인
+
+    if orjson is not None:
+        return {item["symbol"]: float(item["price"]) for item in loads(data) if item["symbol"] in watched}
+
+    start = time.perf_counter()
+    table = dict(_TICKER_ITEM.findall(data))
+    prices = {}
+    for symbol in watched:
+        price = table.get(symbol.encode())
+        if price is not None:
+            prices[symbol] = float(price)
+    _record_decode(start)
+    if not table and data.strip() not in (b"", b"[]"):
+        # 예상한 형식이 아님 - 전체 디코딩으로 대체
+        prices = {item["symbol"]: float(item["price"]) for item in loads(data) if item["symbol"] in watched}
+    return prices
+
+
+def decode_time_ms() -> float:
+    """
+    현재 스레드가 지금까지 디코딩에 쓴 누적 시간(ms) - 조회 전후 차이로 조회 1회의 디코딩 시간을 계산.
+    비동기 조회는 이벤트 루프 스레드에서 디코딩하므로 조회를 실행한 스레드의 값에 포함됩니다.
+    """
+    return getattr(_local, "decode_ms", 0.0)
+
+
+def record_cycle(start_ms: float) -> None:
+    """조회 1회의 디코딩 시간을 지표로 남깁니다. (start_ms는 조회 시작 때의 decode_time_ms())"""
+    Metrics().set_gauge(CYCLE_DECODE_METRIC, round(decode_time_ms() - start_ms, 3))
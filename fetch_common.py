@@ -0,0 +1,336 @@
+# fetch_common.py
+import datetime
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy가 없으면 심볼별 계산만 사용
+    np = None
+
+from last_known_good import get_last_known_good
+
+# 업스트림 기본 주소 (벤치마크/목 서버에서 덮어쓸 수 있음)
+DEFAULT_ENDPOINTS = {
+    "binance": "https://api.binance.com",
+    "upbit": "https://api.upbit.com",
+    "fx": "https://api.exchangerate-api.com",
+}
+
+# 환율 출처: 외부 환율 API 또는 업비트 KRW-USDT 체결가
+FX_SOURCE_API = "exchangerate"
+FX_SOURCE_UPBIT = "upbit"
+UPBIT_USDT_MARKET = "KRW-USDT"
+
+# 이 개수 이상의 심볼은 numpy 배열로 한 번에 계산
+# (benchmark.py compute 측정, 조회기가 PriceTable을 재사용할 때: 100개 안팎에서 심볼별 계산과 비슷하고
+#  200개부터 꾸준히 25~35% 빠름. 그보다 적으면 딕셔너리 <-> 배열 변환 비용이 더 큼)
+VECTORIZE_MIN_SYMBOLS = 200
+
+# 요청별 기본 타임아웃(초)과, 남은 조회 시간이 거의 없을 때도 주는 최소 타임아웃
+REQUEST_TIMEOUT = 10
+MIN_REQUEST_TIMEOUT = 0.05
+# 새로고침 1회의 시간 예산 = 새로고침 간격 x 이 비율 (최소 MIN_CYCLE_DEADLINE초)
+CYCLE_DEADLINE_RATIO = 0.8
+MIN_CYCLE_DEADLINE = 1.0
+# 시간 예산을 넘겨 부분 결과로 끝난 조회 수
+DEADLINE_METRIC = "fetch.deadline_exceeded"
+
+
+def resolve_endpoints(endpoints: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """기본 주소에 사용자 지정 주소를 덮어써서 반환합니다."""
+    merged = DEFAULT_ENDPOINTS.copy()
+    if endpoints:
+        merged.update(endpoints)
+    return merged
+
+
+def cycle_deadline(refresh_interval: float) -> float:
+    """새로고침 간격에 맞는 조회 1회의 시간 예산(초)"""
+    return max(MIN_CYCLE_DEADLINE, refresh_interval * CYCLE_DEADLINE_RATIO)
+
+
+class CycleDeadline:
+    """
+    조회 1회의 전체 시간 예산.
+    요청마다 타임아웃을 따로 주면 호스트가 응답하지 않을 때 타임아웃이 쌓여 수 분까지 늘어나므로,
+    요청 타임아웃을 남은 시간으로 줄이고 시간이 지나면 남은 요청은 보내지 않습니다.
+    """
+
+    def __init__(self, seconds: Optional[float] = None):
+        """
+        Args:
+            seconds: 시간 예산(초) - None이면 제한 없음
+        """
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds if seconds else None
+
+    def remaining(self) -> Optional[float]:
+        """남은 시간(초). 제한이 없으면 None."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def timeout(self, default: float = REQUEST_TIMEOUT) -> float:
+        """남은 시간을 넘지 않는 요청 타임아웃(초)"""
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        return max(MIN_REQUEST_TIMEOUT, min(default, remaining))
+
+
+def to_upbit_symbol(binance_symbol: str) -> Optional[str]:
+    """바이낸스 USDT 심볼을 업비트 KRW 마켓 코드로 변환합니다."""
+    if binance_symbol.endswith("USDT"):
+        return "KRW-" + binance_symbol.replace("USDT", "")
+    return None
+
+
+def morning_target(now: Optional[datetime.datetime] = None) -> Tuple[datetime.date, int]:
+    """
+    기준 시가(오전 9시)의 날짜와 밀리초 타임스탬프를 반환합니다.
+    자정과 오전 9시 사이라면 전날 오전 9시를 기준으로 합니다.
+    """
+    now = now or datetime.datetime.now()
+    morning_time = datetime.time(9, 0)
+    target_date = now.date()
+    if now.time() < morning_time:
+        target_date = target_date - datetime.timedelta(days=1)
+    nine_am = datetime.datetime.combine(target_date, morning_time)
+    return target_date, int(nine_am.timestamp() * 1000)
+
+
+def fill_last_known_good(source: str, values: Dict[str, Optional[float]], keys: Iterable[str],
+                         revalidate: Optional[Callable[[List[str]], Dict[str, Optional[float]]]] = None,
+                         fill: bool = True) -> Dict[str, float]:
+    """
+    값을 받지 못한 항목을 출처의 마지막 정상 값으로 채웁니다. (lkg_max_age보다 오래된 값은 버림)
+    모든 조회기가 같은 저장소를 쓰므로 어느 경로로 조회하든 같은 값으로 채워집니다.
+
+    Args:
+        source: 출처 (업스트림 주소 - 목 서버 값과 섞이지 않도록)
+        values: 이번 조회 결과 {키: 값 또는 None} (직접 수정됨)
+        keys: 있어야 하는 키 목록
+        revalidate: 빠진 키 목록을 받아 {키: 값}을 다시 조회하는 함수
+            (있으면 백그라운드에서 다시 받고, 없으면 다음 조회 때 새 값을 받음)
+        fill: False면 values는 채우지 않고 나이만 계산 - QuoteBook에 쓰는 조회기는 이전 값을 원래 시각과
+            stale 표시 그대로 book에 남겨야 하므로 채운 값을 새 시세처럼 넘기지 않음
+
+    Returns:
+        이전 값으로 채운 {키: 값의 나이(초)}
+    """
+    lkg = get_last_known_good()
+    lkg.remember(source, values)
+    missing = [key for key in keys if values.get(key) is None]
+    if not missing:
+        return {}
+    ages = lkg.fill(source, values, missing, write=fill)
+    if revalidate is not None:
+        lkg.revalidate_in_background(source, lambda: revalidate(missing))
+    return ages
+
+
+def aged_symbols(binance_ages: Dict[str, float], upbit_symbols: Dict[str, str],
+                 upbit_ages: Dict[str, float]) -> Dict[str, float]:
+    """
+    이전 값으로 채운 항목의 나이를 심볼별로 모읍니다. (KRW-USDT는 모든 심볼의 프리미엄에 영향)
+
+    Returns:
+        {심볼: 결과에 쓰인 가장 오래된 값의 나이(초)}
+    """
+    aged = dict(binance_ages)
+    for symbol, market in upbit_symbols.items():
+        age = max(upbit_ages.get(market, 0.0), upbit_ages.get(UPBIT_USDT_MARKET, 0.0))
+        if age:
+            aged[symbol] = max(age, aged.get(symbol, 0.0))
+    return aged
+
+
+def build_results(symbols, binance_map, morning_map, upbit_symbols,
+                  upbit_price_map, usd_to_krw, table=None):
+    """
+    조회된 원시 가격들로 {심볼: (가격, 아침 대비 변동률, 김치 프리미엄)} 결과를 조합합니다.
+    심볼이 많고 numpy가 있으면 build_results_vectorized로 계산합니다.
+    table에는 조회기가 계속 들고 있는 PriceTable을 넘겨 배열을 조회마다 새로 만들지 않게 합니다.
+    """
+    if np is not None and len(symbols) >= VECTORIZE_MIN_SYMBOLS:
+        return build_results_vectorized(symbols, binance_map, morning_map, upbit_symbols,
+                                        upbit_price_map, usd_to_krw, table)
+    return build_results_scalar(symbols, binance_map, morning_map, upbit_symbols,
+                                upbit_price_map, usd_to_krw)
+
+
+def build_results_scalar(symbols, binance_map, morning_map, upbit_symbols,
+                         upbit_price_map, usd_to_krw):
+    """build_results의 심볼별 계산 버전"""
+    results = {}
+    for symbol in symbols:
+        binance_price = binance_map.get(symbol)
+        up_sym = upbit_symbols.get(symbol)
+        up_price = upbit_price_map.get(up_sym) if up_sym else None
+        results[symbol] = (binance_price, *quote_values(binance_price, morning_map.get(symbol),
+                                                        up_price, usd_to_krw))
+    return results
+
+
+def quote_values(binance_price, morning_price, upbit_price, usd_to_krw) -> Tuple[Optional[float], Optional[float]]:
+    """
+    심볼 하나의 (아침 대비 변동률, 김치 프리미엄)을 계산합니다.
+    build_results_scalar와 QuoteBook.apply가 함께 사용하며, 계산할 수 없는 항목은 None입니다.
+    """
+    morning_diff = None
+    kimchi_premium = None
+
+    if binance_price is not None and morning_price and morning_price > 0:
+        diff = binance_price - morning_price
+        morning_diff = (diff / morning_price) * 100
+
+    if binance_price is not None and upbit_price is not None and usd_to_krw > 0:
+        kimchi_premium = ((upbit_price - (binance_price * usd_to_krw))
+                          / (binance_price * usd_to_krw)) * 100
+
+    return morning_diff, kimchi_premium
+
+
+def stage_results(symbols, inputs, book=None, table=None) -> Dict[str, tuple]:
+    """
+    조회 도중 단계별 중간 결과를 만듭니다.
+    book(QuoteBook)이 있으면 입력을 book에 바로 써넣고 값이 바뀐 심볼의 결과만 돌려줍니다.
+
+    Args:
+        symbols: 조회 대상 심볼 목록
+        inputs: build_results의 인자 (binance_map, morning_map, upbit_symbols, upbit_price_map, usd_to_krw)
+        book: 결과를 써넣을 QuoteBook
+        table: 조회기가 들고 있는 PriceTable
+    """
+    if book is None:
+        return build_results(symbols, **inputs, table=table)
+    changed = book.apply(symbols, **inputs, partial=True)
+    return {s: book.get(s).as_tuple() for s in changed}
+
+
+def _to_optional(values) -> List[Optional[float]]:
+    """NaN을 None으로 바꾼 파이썬 리스트"""
+    result = values.astype(object)
+    result[np.isnan(values)] = None
+    return result.tolist()
+
+
+class PriceTable:
+    """
+    심볼 ID(목록 안의 위치) 순서로 정렬된 가격 배열.
+    조회기마다 하나를 계속 들고 있으면서 조회마다 배열 값만 제자리에서 다시 채우고,
+    심볼 목록이 바뀔 때만 배열을 새로 만듭니다. 아침 대비 변동률과 김치 프리미엄은
+    한 번의 벡터 연산으로 계산하며, 빠진 값은 NaN으로 두고 None 검사 대신 마스크로 걸러냅니다.
+    """
+
+    def __init__(self, symbols: Iterable[str] = (), upbit_symbols: Optional[Dict[str, str]] = None):
+        self.symbols: List[str] = []
+        self.upbit_symbols: Dict[str, str] = {}
+        self.ids: Dict[str, int] = {}
+        self.upbit_markets: List[Optional[str]] = []
+        self.binance = self.morning = self.upbit = None
+        symbols = list(symbols)
+        if symbols:
+            self.ensure(symbols, upbit_symbols or {})
+
+    def ensure(self, symbols: List[str], upbit_symbols: Dict[str, str]) -> None:
+        """
+        심볼 목록과 업비트 마켓 매핑을 맞춥니다.
+        배열은 심볼 목록이 바뀌었을 때만 새로 만들고, 매핑만 바뀌었으면 매핑만 다시 계산합니다.
+        """
+        symbols = list(symbols)
+        resized = self.binance is None or self.symbols != symbols
+        if resized:
+            self.symbols = symbols
+            self.ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+            size = len(self.symbols)
+            self.binance = np.full(size, np.nan)
+            self.morning = np.full(size, np.nan)
+            self.upbit = np.full(size, np.nan)
+        if resized or self.upbit_symbols != upbit_symbols:
+            self.upbit_symbols = dict(upbit_symbols)
+            self.upbit_markets = [upbit_symbols.get(s) for s in self.symbols]
+
+    def load(self, binance_map, morning_map, upbit_price_map) -> List[Optional[float]]:
+        """
+        이번 조회 값으로 배열을 채웁니다. (빠진 값은 NaN)
+
+        Returns:
+            심볼 순서대로 정렬된 바이낸스 가격 리스트 (결과 조합에 그대로 사용)
+        """
+        prices = list(map(binance_map.get, self.symbols))
+        self.binance[:] = np.array(prices, dtype=float)
+        self.morning[:] = np.array(list(map(morning_map.get, self.symbols)), dtype=float)
+        self.upbit[:] = np.array(list(map(upbit_price_map.get, self.upbit_markets)), dtype=float)
+        return prices
+
+    def compute(self, usd_to_krw: float) -> Tuple["np.ndarray", "np.ndarray"]:
+        """(아침 대비 변동률, 김치 프리미엄) 배열을 계산합니다. 계산할 수 없는 항목은 NaN."""
+        nan = np.nan
+        binance, morning, upbit = self.binance, self.morning, self.upbit
+        with np.errstate(divide="ignore", invalid="ignore"):
+            has_price = ~np.isnan(binance)
+            morning_diff = np.where(has_price & (morning > 0), ((binance - morning) / morning) * 100, nan)
+            krw = binance * (usd_to_krw or 0.0)
+            premium_ok = has_price & ~np.isnan(upbit) & (krw > 0)
+            kimchi_premium = np.where(premium_ok, ((upbit - krw) / krw) * 100, nan)
+        return morning_diff, kimchi_premium
+
+
+def build_results_vectorized(symbols, binance_map, morning_map, upbit_symbols,
+                             upbit_price_map, usd_to_krw, table=None):
+    """build_results의 numpy 버전 (table이 없으면 이번 계산용 PriceTable을 만듦)"""
+    if table is None:
+        table = PriceTable()
+    table.ensure(symbols, upbit_symbols)
+    prices = table.load(binance_map, morning_map, upbit_price_map)
+    morning_diff, kimchi_premium = table.compute(usd_to_krw)
+    return dict(zip(table.symbols, zip(prices, _to_optional(morning_diff), _to_optional(kimchi_premium))))
+
+
+class SymbolQuarantine:
+    """
+    거래소가 존재하지 않는다고 응답한 심볼 목록.
+    격리된 심볼은 일괄 요청에서 빼서 나머지 심볼이 계속 한 번의 요청으로 조회되게 합니다.
+    상장 직후 심볼 등을 위해 ttl이 지나면 다시 시도합니다.
+    """
+
+    def __init__(self, ttl: float = 3600):
+        """
+        Args:
+            ttl: 격리를 유지할 시간(초)
+        """
+        self.ttl = ttl
+        self._until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, symbol: str) -> None:
+        with self._lock:
+            self._until[symbol] = time.monotonic() + self.ttl
+
+    def contains(self, symbol: str) -> bool:
+        with self._lock:
+            until = self._until.get(symbol)
+            if until is None:
+                return False
+            if until <= time.monotonic():
+                del self._until[symbol]
+                return False
+            return True
+
+    def split(self, symbols: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """심볼 목록을 (조회할 심볼, 격리된 심볼)로 나눕니다."""
+        valid, quarantined = [], []
+        for symbol in symbols:
+            (quarantined if self.contains(symbol) else valid).append(symbol)
+        return valid, quarantined
+
+
+# 바이낸스 일괄 조회 경로가 공유하는 격리 목록
+binance_quarantine = SymbolQuarantine()
@@ -0,0 +1,253 @@
+# fetch_worker.py
+import asyncio
+import logging
+import threading
+
+import requests
+
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from PyQt5.QtCore import QObject, QThread, Qt, QMetaObject, pyqtSignal, pyqtSlot
+
+from async_fetcher import AsyncPriceFetcher, aiohttp
+from fetch_common import cycle_deadline
+from last_known_good import get_last_known_good
+from metrics import Metrics
+from price_fetcher import PriceFetcher
+from quotes import QuoteBook
+from rate_limiter import GovernedSession, RequestGovernor
+from result_delta import KEYFRAME_INTERVAL, ResultDeltaEncoder
+
+# 새 연결(TCP+TLS 핸드셰이크) 수를 세는 지표 이름
+HANDSHAKE_METRIC = "http.handshakes"
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        Metrics().incr(HANDSHAKE_METRIC)
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        Metrics().incr(HANDSHAKE_METRIC)
+        return super()._new_conn()
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """새 연결을 맺을 때마다 핸드셰이크 카운터를 올리는 HTTP 어댑터"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+def make_pooled_session(pool_connections: int = 8, pool_maxsize: int = 16) -> requests.Session:
+    """
+    keep-alive 연결을 재사용하고 RequestGovernor를 거치는 requests 세션을 만듭니다.
+
+    Args:
+        pool_connections: 연결 풀을 유지할 호스트 수
+        pool_maxsize: 호스트별 최대 유지 연결 수
+
+    Returns:
+        설정이 끝난 세션
+    """
+    sess = GovernedSession()
+    sess.headers.update({'User-Agent': 'Mozilla/5.0', 'Connection': 'keep-alive'})
+    adapter = PooledHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    sess.mount("http://", adapter)
+    sess.mount("https://", adapter)
+    return sess
+
+
+class PriceFetchWorker(QObject):
+    """
+    전용 스레드에서 계속 살아있는 가격 조회 작업자.
+    새로고침마다 QThread와 세션을 새로 만드는 대신, 한 스레드와 연결 풀을 계속 재사용합니다.
+    새로고침 요청은 request_refresh()로 보내며 작업자 스레드의 이벤트 큐를 통해 처리됩니다.
+    """
+    result_ready = pyqtSignal(dict)
+    # emit_deltas=True일 때 result_ready 대신 바뀐 항목만 담아 보냄 (result_delta 참고)
+    delta_ready = pyqtSignal(dict)
+    # 조회 도중 단계별 중간 결과 (단계 이름, 바뀐 심볼의 결과) - 바이낸스 가격이 먼저 도착하면 바로 표시
+    stage_ready = pyqtSignal(str, dict)
+    error_occurred = pyqtSignal(str)
+    # 조회에 실패해 마지막 정상 값으로 채운 심볼의 {심볼: 값의 나이(초)}
+    values_aged = pyqtSignal(dict)
+    # (순번, 결과(또는 델타) 또는 None, 오류 메시지) - RefreshCoordinator가 오래된 결과를 걸러낼 때 사용
+    cycle_finished = pyqtSignal(int, object, str)
+    _refresh_requested = pyqtSignal(int)
+
+    def __init__(self, symbols, engine="sync", pool_connections=8, pool_maxsize=16,
+                 emit_deltas=False, keyframe_interval=KEYFRAME_INTERVAL, deadline=None, **fetcher_kwargs):
+        """
+        Args:
+            symbols: 조회할 바이낸스 심볼 목록
+            engine: "sync" 또는 "async"
+            pool_connections: 연결 풀을 유지할 호스트 수
+            pool_maxsize: 호스트별 최대 유지 연결 수
+            emit_deltas: True면 전체 결과 대신 이전 결과와 달라진 항목만 delta_ready로 보냄
+            keyframe_interval: 델타 모드에서 전체 결과(키프레임)를 보내는 간격
+            deadline: 조회 1회의 시간 예산(초) - None이면 제한 없음 (set_refresh_interval로도 설정)
+            fetcher_kwargs: PriceFetcher/AsyncPriceFetcher에 넘길 공통 인자
+                (endpoints, reference_provider, fx_provider, fx_source)
+        """
+        super().__init__()
+        self.symbols = list(symbols)
+        self.engine = engine
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.fetcher_kwargs = fetcher_kwargs
+        self.deadline = deadline
+        self.encoder = ResultDeltaEncoder(keyframe_interval) if emit_deltas else None
+        # 알림/화면 갱신이 함께 읽는 심볼별 시세 레코드 (조회마다 제자리에서 갱신)
+        self.book = QuoteBook(self.symbols)
+        # 단계별 중간 결과로 이미 바뀐 심볼 (다음 델타에 함께 담음)
+        self._stage_changed = set()
+        # set_symbols로 바꾼 심볼 목록 - 작업자 스레드가 다음 조회를 시작할 때 반영
+        self._pending_symbols = None
+        self._symbols_lock = threading.Lock()
+        self.session = None
+        # 조회기는 한 번 만들어 계속 재사용 (계산용 배열 등 조회기가 들고 있는 상태를 유지)
+        self._fetcher = None
+        self._loop = None
+        self._aio_session = None
+
+        self._thread = QThread()
+        self.moveToThread(self._thread)
+        self._refresh_requested.connect(self._refresh)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """연결을 정리하고 작업자 스레드를 종료합니다."""
+        if self._thread.isRunning():
+            QMetaObject.invokeMethod(self, "_close", Qt.BlockingQueuedConnection)
+            self._thread.quit()
+            self._thread.wait()
+
+    def request_refresh(self, seq: int = 0):
+        """
+        새로고침을 요청합니다. 어느 스레드에서 호출해도 됩니다.
+
+        Args:
+            seq: 이 조회의 순번 (cycle_finished로 그대로 돌려줌)
+        """
+        self._refresh_requested.emit(seq)
+
+    def set_symbols(self, symbols):
+        """
+        다음 새로고침부터 사용할 심볼 목록을 바꿉니다. 어느 스레드에서 호출해도 됩니다.
+        진행 중인 조회의 book과 조회기는 건드리지 않고, 작업자 스레드가 다음 조회를 시작할 때 반영합니다.
+        """
+        with self._symbols_lock:
+            self._pending_symbols = list(symbols)
+
+    def _apply_pending_symbols(self):
+        with self._symbols_lock:
+            symbols, self._pending_symbols = self._pending_symbols, None
+        if symbols is None:
+            return
+        self.symbols = symbols
+        self.book.set_symbols(symbols)
+        if self._fetcher is not None:
+            self._fetcher.symbols = symbols
+        self.request_keyframe()
+
+    def set_refresh_interval(self, refresh_interval: float):
+        """새로고침 간격에 맞춰 조회 1회의 시간 예산을 정합니다. (다음 조회부터 적용)"""
+        self.deadline = cycle_deadline(refresh_interval)
+        if self._fetcher is not None:
+            self._fetcher.deadline = self.deadline
+
+    def request_keyframe(self):
+        """델타 모드에서 다음 결과를 전체 결과로 보내게 합니다. (받는 쪽에서 순번이 끊겼을 때 등)"""
+        if self.encoder is not None:
+            self.encoder.request_keyframe()
+
+    def next_interval(self, base_interval: float) -> float:
+        """API 예산 상태를 반영한 다음 새로고침 간격(초)"""
+        return RequestGovernor().recommended_interval(base_interval)
+
+    def handshakes_per_minute(self) -> float:
+        """최근 1분 동안 새로 맺은 연결 수"""
+        return Metrics().per_minute(HANDSHAKE_METRIC)
+
+    @pyqtSlot(int)
+    def _refresh(self, seq):
+        self._apply_pending_symbols()
+        try:
+            # 받지 못한 항목은 이전 값을 원래 시각 그대로 stale로 유지 (lkg_max_age가 지나면 비움)
+            changed = self._stage_changed.union(self.book.apply(
+                self.symbols, **self.fetch(), max_age=get_last_known_good().max_age))
+            self._stage_changed = set()
+            if self.encoder is not None:
+                results = self.encoder.encode_book(self.book, changed)
+                self.delta_ready.emit(results)
+            else:
+                results = self.book.results()
+                self.result_ready.emit(results)
+            if self._fetcher.aged:
+                self.values_aged.emit(self._fetcher.aged)
+            self.cycle_finished.emit(seq, results, "")
+        except Exception as e:
+            logging.error(f"가격 가져오기 실패: {str(e)}")
+            message = f"가격 업데이트에 실패했습니다: {str(e)}"
+            self.error_occurred.emit(message)
+            self.cycle_finished.emit(seq, None, message)
+        Metrics().set_gauge(f"{HANDSHAKE_METRIC}.last_minute", self.handshakes_per_minute())
+        logging.debug(f"API 예산 상태: {RequestGovernor().state()}")
+
+    def fetch(self):
+        """작업자 스레드에서 1회 조회를 실행하고 원시 입력을 반환합니다. (결과는 QuoteBook.apply로 계산)"""
+        if self.engine == "async" and aiohttp is not None:
+            return self._fetch_async()
+        if self.session is None:
+            self.session = make_pooled_session(self.pool_connections, self.pool_maxsize)
+        if self._fetcher is None:
+            self._fetcher = PriceFetcher(self.symbols, session=self.session, on_stage=self._on_stage,
+                                         deadline=self.deadline, book=self.book, **self.fetcher_kwargs)
+        return self._fetcher.fetch_inputs()
+
+    def _on_stage(self, stage, changed):
+        # 조회기가 book에 바로 써넣고 바뀐 심볼의 결과만 넘김 (아직 오지 않은 항목은 이전 값 유지)
+        if changed:
+            self._stage_changed.update(changed)
+            self.stage_ready.emit(stage, changed)
+
+    def _fetch_async(self):
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        if self._fetcher is None:
+            self._fetcher = AsyncPriceFetcher(self.symbols, max_per_host=self.pool_maxsize,
+                                              on_stage=self._on_stage, deadline=self.deadline,
+                                              book=self.book, **self.fetcher_kwargs)
+        if self._aio_session is None:
+            self._aio_session = self._loop.run_until_complete(self._open_aio_session(self._fetcher))
+        return self._loop.run_until_complete(self._fetcher.fetch_inputs_async(self._aio_session))
+
+    async def _open_aio_session(self, fetcher):
+        trace = aiohttp.TraceConfig()
+
+        async def on_connection_create_end(session, context, params):
+            Metrics().incr(HANDSHAKE_METRIC)
+
+        trace.on_connection_create_end.append(on_connection_create_end)
+        return fetcher.create_session(trace_configs=[trace])
+
+    @pyqtSlot()
+    def _close(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+        if self._loop is not None:
+            if self._aio_session is not None:
+                self._loop.run_until_complete(self._aio_session.close())
+                self._aio_session = None
+            self._loop.close()
+            self._loop = None
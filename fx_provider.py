@@ -0,0 +1,109 @@
+# fx_provider.py
+import logging
+import threading
+import time
+from typing import Optional
+
+import requests
+
+from fetch_common import DEFAULT_ENDPOINTS
+from utils import SharedInstances, cache_path, load_json_cache, save_json_cache
+
+
+class FxRateProvider:
+    """
+    USD/KRW 환율 제공자.
+    한 번 받은 환율은 TTL 동안 재사용하고, TTL이 지나면 기존 값을 그대로 돌려주면서
+    백그라운드에서 갱신합니다(stale-while-revalidate). 마지막 정상 값은 디스크에 남겨
+    재시작 직후에도 환율 조회를 기다리지 않습니다.
+    """
+
+    def __init__(self, url: str = DEFAULT_ENDPOINTS["fx"], ttl: float = 3600,
+                 path: Optional[str] = None, timeout: float = 10):
+        """
+        Args:
+            url: 환율 API 주소
+            ttl: 환율을 새로 받지 않고 재사용할 시간(초)
+            path: 마지막 정상 값을 저장할 파일 경로 (None이면 저장하지 않음)
+            timeout: 요청 타임아웃(초)
+        """
+        self.url = url
+        self.ttl = ttl
+        self.path = path
+        self.timeout = timeout
+        self.rate: Optional[float] = None
+        self.fetched_at = 0.0
+        self._session = requests.Session()
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._load()
+
+    def _load(self) -> None:
+        loaded = load_json_cache(self.path, "저장된 환율",
+                                 lambda data: (float(data["rate"]), float(data["fetched_at"])))
+        if loaded is not None:
+            self.rate, self.fetched_at = loaded
+            logging.info(f"저장된 환율 로드: {self.rate}")
+
+    def _save(self) -> None:
+        save_json_cache(self.path, {"rate": self.rate, "fetched_at": self.fetched_at}, "환율")
+
+    def fetch(self) -> Optional[float]:
+        """환율 API에서 값을 받아 캐시를 갱신합니다. 실패하면 None."""
+        try:
+            r = self._session.get(f"{self.url}/v4/latest/USD", timeout=self.timeout)
+            rate = float(r.json()["rates"]["KRW"])
+        except Exception as e:
+            logging.error(f"환율 정보 가져오기 실패: {e}")
+            return None
+        with self._lock:
+            self.rate = rate
+            self.fetched_at = time.time()
+            self._save()
+        return rate
+
+    def _revalidate(self) -> None:
+        try:
+            self.fetch()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def is_fresh(self) -> bool:
+        return self.rate is not None and time.time() - self.fetched_at < self.ttl
+
+    def get_rate(self) -> float:
+        """
+        환율을 반환합니다. 캐시된 값이 있으면 절대 네트워크를 기다리지 않습니다.
+
+        Returns:
+            USD/KRW 환율 (한 번도 받지 못했으면 0.0)
+        """
+        with self._lock:
+            rate = self.rate
+            stale = not self.is_fresh()
+            start_refresh = rate is not None and stale and not self._refreshing
+            if start_refresh:
+                self._refreshing = True
+        if start_refresh:
+            threading.Thread(target=self._revalidate, daemon=True).start()
+        if rate is not None:
+            return rate
+        # 최초 1회만 동기로 조회
+        return self.fetch() or 0.0
+
+
+_providers = SharedInstances()
+
+
+def get_fx_provider(url: str = DEFAULT_ENDPOINTS["fx"]) -> FxRateProvider:
+    """
+    주소별 공용 환율 제공자를 반환합니다.
+    기본 주소의 제공자만 설정의 fx_ttl을 따르고 마지막 값을 디스크에 저장합니다.
+    """
+    def create():
+        if url == DEFAULT_ENDPOINTS["fx"]:
+            from config_manager import ConfigManager
+            return FxRateProvider(url, ttl=ConfigManager().get("fx_ttl", 3600), path=cache_path("fx_rate.json"))
+        return FxRateProvider(url)
+    return _providers.get(url, create)
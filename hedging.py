@@ -0,0 +1,286 @@
+# hedging.py
+import collections
+import concurrent.futures
+import logging
+import threading
+import time
+import urllib.parse
+from typing import Deque, Dict, List, Optional, Tuple
+
+from fetch_common import DEFAULT_ENDPOINTS, REQUEST_TIMEOUT
+from metrics import Metrics
+from rate_limiter import RateLimitDeferred
+from utils import SharedInstances
+
+# 같은 API를 제공하는 바이낸스 미러 호스트 (기본 주소가 첫 번째)
+BINANCE_MIRRORS = [
+    DEFAULT_ENDPOINTS["binance"],
+    "https://api1.binance.com",
+    "https://api2.binance.com",
+    "https://api3.binance.com",
+]
+# 호스트별로 보관하는 최근 응답 시간 개수와, 순위를 매기기 위한 최소 표본 수
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 5
+# 표본이 부족할 때 헤지 대기 시간과 헤지 대기 시간 하한(초)
+DEFAULT_HEDGE_DELAY = 0.3
+MIN_HEDGE_DELAY = 0.05
+# 실패한 호스트를 순위 맨 뒤에 두는 시간(초) - 지나면 응답 시간 순위로 돌아와 다시 시도됨
+FAILURE_COOLDOWN = 60
+# 일반 요청 대비 헤지 요청 비율 상한과, 한 번에 몰아 쓸 수 있는 헤지 수
+MAX_HEDGE_RATIO = 0.1
+HEDGE_BURST = 5
+
+HEDGE_METRIC = "hedge.sent"
+HEDGE_WON_METRIC = "hedge.won"
+HEDGE_SKIPPED_METRIC = "hedge.skipped"
+# 기본 호스트가 바로 실패해(연결 거부, 5xx) 기다리지 않고 다음 호스트로 보낸 횟수
+HEDGE_FAILOVER_METRIC = "hedge.failover"
+
+
+def _host_label(host: str) -> str:
+    return urllib.parse.urlsplit(host).netloc
+
+
+class HostLatencyTracker:
+    """
+    호스트별 최근 응답 시간 기록.
+    p50/p99를 계산해 빠른 호스트부터 순서를 매기며, 실패한 요청은 타임아웃만큼 걸린 것으로 기록합니다.
+    최근 요청이 실패한 호스트는 응답 시간과 관계없이 아직 표본이 없는 호스트보다도 뒤로 보냅니다.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        # 호스트별 (연속 실패 횟수, 마지막 실패 시각) - 성공하면 지움
+        self._failures: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, host: str, latency: float, failed: bool = False) -> None:
+        """
+        Args:
+            host: 호스트 주소
+            latency: 응답 시간(초) - 실패한 요청은 타임아웃
+            failed: 연결 실패나 5xx 응답이었는지
+        """
+        with self._lock:
+            samples = self._samples.get(host)
+            if samples is None:
+                samples = self._samples[host] = collections.deque(maxlen=self.window)
+            samples.append(latency)
+            if failed:
+                count = self._failures.get(host, (0, 0.0))[0]
+                self._failures[host] = (count + 1, time.monotonic())
+            else:
+                self._failures.pop(host, None)
+
+    def failures(self, host: str) -> int:
+        """최근 FAILURE_COOLDOWN초 안에 실패한 호스트의 연속 실패 횟수 (아니면 0)"""
+        with self._lock:
+            count, failed_at = self._failures.get(host, (0, 0.0))
+        return count if time.monotonic() - failed_at < FAILURE_COOLDOWN else 0
+
+    def percentile(self, host: str, q: float) -> Optional[float]:
+        """
+        Args:
+            host: 호스트 주소
+            q: 백분위 (0~100)
+
+        Returns:
+            응답 시간 백분위(초) - 표본이 MIN_SAMPLES개 미만이면 None
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(host, ()))
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * q / 100))]
+
+    def ranked(self, hosts: List[str]) -> List[str]:
+        """
+        표본이 충분한 정상 호스트는 p50 순으로, 그 뒤에 표본이 부족한 호스트를 주어진 순서대로,
+        마지막에 최근 요청이 실패한 호스트를 연속 실패가 적은 순으로 붙여 반환합니다.
+        """
+        known = []
+        unknown = []
+        failing = []
+        for host in hosts:
+            failures = self.failures(host)
+            if failures:
+                failing.append((failures, host))
+                continue
+            p50 = self.percentile(host, 50)
+            (unknown if p50 is None else known).append((p50, host))
+        known.sort(key=lambda item: item[0])
+        failing.sort(key=lambda item: item[0])
+        return [host for _, host in known] + [host for _, host in unknown] + [host for _, host in failing]
+
+    def publish(self, hosts: List[str]) -> None:
+        """호스트별 p50/p99를 지표로 내보냅니다."""
+        metrics = Metrics()
+        for host in hosts:
+            for q in (50, 99):
+                value = self.percentile(host, q)
+                if value is not None:
+                    metrics.set_gauge(f"hedge.{_host_label(host)}.p{q}", round(value * 1000, 1))
+
+
+class HedgedRequester:
+    """
+    같은 API를 제공하는 여러 호스트에 헤지 요청을 보냅니다.
+    가장 빠른 호스트로 먼저 요청하고, 그 호스트의 응답 시간 백분위만큼 기다려도 응답이 없으면
+    다음 호스트로 같은 요청을 한 번 더 보내 먼저 온 응답을 사용합니다.
+    보낸 요청이 실패하면(연결 거부, 5xx) 기다리지 않고 헤지 예산과 관계없이 바로 다음 호스트로 보냅니다.
+    헤지 요청도 RequestGovernor 예산을 쓰므로 일반 요청 대비 max_ratio 비율까지만 보냅니다.
+    """
+
+    def __init__(self, hosts: List[str], delay_percentile: float = 95, max_ratio: float = MAX_HEDGE_RATIO,
+                 tracker: Optional[HostLatencyTracker] = None, max_workers: int = 8):
+        """
+        Args:
+            hosts: 같은 API를 제공하는 호스트 주소 목록 (첫 번째가 기본 호스트)
+            delay_percentile: 헤지 전에 기다릴 시간으로 쓸 응답 시간 백분위
+            max_ratio: 일반 요청 대비 헤지 요청 비율 상한
+            tracker: 응답 시간 기록 (기본값: 새 기록)
+            max_workers: 요청을 보낼 스레드 수
+        """
+        self.hosts = list(hosts)
+        self.delay_percentile = delay_percentile
+        self.max_ratio = max_ratio
+        self.tracker = tracker or HostLatencyTracker()
+        self._budget = 1.0
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                               thread_name_prefix="hedge")
+
+    def hedge_delay(self, host: str) -> float:
+        """헤지 요청을 보내기 전에 기다릴 시간(초)"""
+        delay = self.tracker.percentile(host, self.delay_percentile)
+        return DEFAULT_HEDGE_DELAY if delay is None else max(MIN_HEDGE_DELAY, delay)
+
+    def _take_hedge(self) -> bool:
+        with self._lock:
+            if self._budget < 1:
+                return False
+            self._budget -= 1
+            return True
+
+    def _timed_get(self, sess, host: str, path: str, params, timeout: float):
+        start = time.monotonic()
+        try:
+            r = sess.get(f"{host}{path}", params=params, timeout=timeout)
+        except RateLimitDeferred:
+            raise
+        except Exception:
+            # 실패한 호스트는 타임아웃만큼 걸린 것으로 기록하고 순위에서 뒤로 보냄
+            self.tracker.record(host, timeout, failed=True)
+            raise
+        if _failed(r):
+            self.tracker.record(host, timeout, failed=True)
+        else:
+            self.tracker.record(host, time.monotonic() - start)
+        return r
+
+    def get(self, sess, path: str, params=None, timeout: float = REQUEST_TIMEOUT):
+        """
+        헤지 GET 요청을 보내고 먼저 도착한 응답을 반환합니다.
+
+        Args:
+            sess: requests 세션 (여러 스레드에서 함께 사용)
+            path: 호스트 뒤에 붙일 경로 (쿼리 문자열 포함 가능)
+            params: 요청 파라미터
+            timeout: 요청별 타임아웃(초)
+
+        Returns:
+            먼저 도착한 정상 응답 (모든 호스트가 5xx로 응답했으면 마지막 5xx 응답)
+
+        Raises:
+            Exception: 모든 호스트의 요청이 실패하면 마지막 오류
+        """
+        hosts = self.tracker.ranked(self.hosts)
+        with self._lock:
+            self._budget = min(HEDGE_BURST, self._budget + self.max_ratio)
+
+        primary = hosts[0]
+        # 아직 요청을 보내지 않은 호스트 (순위 순)
+        remaining = hosts[1:]
+        futures = {self._executor.submit(self._timed_get, sess, primary, path, params, timeout): primary}
+        pending = set(futures)
+        hedged = False
+        wait_timeout = min(timeout, self.hedge_delay(primary))
+        error = None
+        failed = None
+        while pending:
+            done, pending = concurrent.futures.wait(pending, timeout=wait_timeout,
+                                                    return_when=concurrent.futures.FIRST_COMPLETED)
+            if not done:
+                # 백분위만큼 기다려도 응답이 없음 - 헤지 예산 안에서 다음 호스트로 한 번 더 보냄
+                hedged = True
+                wait_timeout = None
+                if not remaining:
+                    continue
+                if not self._take_hedge():
+                    Metrics().incr(HEDGE_SKIPPED_METRIC)
+                    continue
+                Metrics().incr(HEDGE_METRIC)
+                # 아직 응답 시간을 모르는 호스트가 있으면 그쪽으로 보내 순위를 매길 표본을 모음
+                unmeasured = [h for h in remaining if self.tracker.percentile(h, 50) is None]
+                backup = unmeasured[0] if unmeasured else remaining[0]
+                remaining.remove(backup)
+                pending.add(self._submit(futures, sess, backup, path, params, timeout))
+                continue
+            for future in done:
+                try:
+                    r = future.result()
+                except RateLimitDeferred:
+                    # 요청 한도는 미러 호스트와 함께 쓰므로 다른 호스트로 보내도 소용없음
+                    raise
+                except Exception as e:
+                    error = e
+                else:
+                    if not _failed(r):
+                        if futures[future] != primary:
+                            Metrics().incr(HEDGE_WON_METRIC)
+                            logging.debug(f"다른 호스트가 응답함: {futures[future]}{path}")
+                        self.tracker.publish(self.hosts)
+                        return r
+                    failed = r
+                if remaining and not pending:
+                    # 보낸 요청이 모두 바로 실패함 - 헤지 예산과 관계없이 곧바로 다음 호스트로 보냄
+                    Metrics().incr(HEDGE_FAILOVER_METRIC)
+                    pending.add(self._submit(futures, sess, remaining.pop(0), path, params, timeout))
+                    if not hedged:
+                        wait_timeout = min(timeout, self.hedge_delay(futures[next(iter(pending))]))
+        self.tracker.publish(self.hosts)
+        if failed is not None:
+            # 모든 호스트가 5xx - 호출하는 쪽의 재시도 정책이 상태 코드로 판단하도록 응답을 그대로 반환
+            return failed
+        raise error
+
+    def _submit(self, futures, sess, host: str, path: str, params, timeout: float) -> concurrent.futures.Future:
+        future = self._executor.submit(self._timed_get, sess, host, path, params, timeout)
+        futures[future] = host
+        return future
+
+
+def _failed(r) -> bool:
+    """다른 호스트로 다시 보낼 만한 응답인지 (서버 오류)"""
+    return r.status_code >= 500
+
+
+_hedgers = SharedInstances()
+
+
+def get_hedger(url: str = DEFAULT_ENDPOINTS["binance"]) -> Optional[HedgedRequester]:
+    """
+    주소별 공용 헤지 요청기를 반환합니다.
+    미러 호스트가 알려진 기본 바이낸스 주소만 헤지하며, 다른 주소(목 서버 등)는 None입니다.
+    """
+    if url != DEFAULT_ENDPOINTS["binance"]:
+        return None
+    def create():
+        from config_manager import ConfigManager
+        config = ConfigManager()
+        return HedgedRequester(BINANCE_MIRRORS,
+                               delay_percentile=config.get("hedge_percentile", 95),
+                               max_ratio=config.get("hedge_max_ratio", MAX_HEDGE_RATIO))
+    return _hedgers.get(url, create)
@@ -0,0 +1,127 @@
+# last_known_good.py
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+from metrics import Metrics
+
+# 마지막 정상 값으로 대신 채운 항목 수 / 너무 오래되어 버린 항목 수
+SERVED_METRIC = "lkg.served"
+EXPIRED_METRIC = "lkg.expired"
+
+
+class LastKnownGoodStore:
+    """
+    출처별(바이낸스, 업비트 등) 마지막 정상 값 저장소.
+    업스트림 호출이 실패해 값이 None이 되면 max_age 안의 이전 값을 대신 돌려주고
+    그 값이 몇 초 전 것인지 함께 알려줍니다(stale-while-revalidate).
+    대신 채운 출처는 백그라운드에서 한 번만 다시 조회해 값을 새로 받습니다.
+    """
+
+    def __init__(self, max_age: float = 300):
+        """
+        Args:
+            max_age: 이전 값을 대신 쓸 수 있는 최대 나이(초) - 이보다 오래된 값은 버림
+        """
+        self.max_age = max_age
+        self._values: Dict[str, Dict[str, Tuple[float, float]]] = {}
+        self._revalidating: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def remember(self, source: str, values: Dict[str, Optional[float]], now: Optional[float] = None) -> None:
+        """
+        정상적으로 받은 값을 저장합니다. None인 항목은 무시합니다.
+
+        Args:
+            source: 출처 이름 ("binance", "upbit" 등)
+            values: {키: 값 또는 None}
+            now: 받은 시각 (기본값: 현재 시각)
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            stored = self._values.setdefault(source, {})
+            for key, value in values.items():
+                if value is not None:
+                    stored[key] = (value, now)
+
+    def fill(self, source: str, values: Dict[str, Optional[float]], keys: Iterable[str],
+             now: Optional[float] = None, write: bool = True) -> Dict[str, float]:
+        """
+        keys 중 값을 받지 못한 항목을 저장된 이전 값으로 채웁니다. (values를 직접 수정)
+
+        Args:
+            source: 출처 이름
+            values: 이번 조회에서 받은 {키: 값 또는 None}
+            keys: 있어야 하는 키 목록
+            now: 기준 시각 (기본값: 현재 시각)
+            write: False면 values는 그대로 두고 이전 값의 나이만 계산
+
+        Returns:
+            이전 값으로 채운 {키: 값의 나이(초)}
+        """
+        now = time.time() if now is None else now
+        ages = {}
+        expired = 0
+        with self._lock:
+            stored = self._values.get(source, {})
+            for key in keys:
+                if values.get(key) is not None or key not in stored:
+                    continue
+                value, fetched_at = stored[key]
+                age = now - fetched_at
+                if age > self.max_age:
+                    del stored[key]
+                    expired += 1
+                    continue
+                if write:
+                    values[key] = value
+                ages[key] = age
+
+        if ages or expired:
+            metrics = Metrics()
+            metrics.incr(SERVED_METRIC, len(ages))
+            metrics.incr(EXPIRED_METRIC, expired)
+        return ages
+
+    def revalidate_in_background(self, source: str,
+                                 refresh: Callable[[], Dict[str, Optional[float]]]) -> bool:
+        """
+        출처의 값을 별도 스레드에서 다시 받아 저장합니다. 이미 진행 중이면 아무것도 하지 않습니다.
+
+        Args:
+            source: 출처 이름
+            refresh: 새 값을 조회해 {키: 값 또는 None}을 돌려주는 함수
+
+        Returns:
+            새로 시작했으면 True
+        """
+        with self._lock:
+            if source in self._revalidating:
+                return False
+            self._revalidating.add(source)
+        threading.Thread(target=self._revalidate, args=(source, refresh), daemon=True).start()
+        return True
+
+    def _revalidate(self, source: str, refresh: Callable[[], Dict[str, Optional[float]]]) -> None:
+        try:
+            self.remember(source, refresh())
+        except Exception as e:
+            logging.error(f"{source} 재조회 실패: {e}")
+        finally:
+            with self._lock:
+                self._revalidating.discard(source)
+
+
+_store: Optional[LastKnownGoodStore] = None
+_store_lock = threading.Lock()
+
+
+def get_last_known_good() -> LastKnownGoodStore:
+    """설정의 lkg_max_age를 따르는 공용 저장소를 반환합니다."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            from config_manager import ConfigManager
+            _store = LastKnownGoodStore(max_age=ConfigManager().get("lkg_max_age", 300))
+        return _store
@@ -43,6 +43,15 @@ if __name__ == "__main__":
         app = QApplication(sys.argv)
         logging.debug("QApplication created successfully")
 
+        # Resolve DNS and open upstream connections while the window is being built
+        logging.debug("Starting connection warm-up")
+        try:
+            from warmup import start_warmup
+
+            start_warmup()
+        except Exception as e:
+            logging.error(f"Connection warm-up failed to start: {e}")
+
         # Import modules with explicit error handling
         logging.debug("Importing overlay module")
         try:
@@ -0,0 +1,98 @@
+# metrics.py
+import collections
+import threading
+import time
+from typing import Any, Dict
+
+
+class Metrics:
+    """
+    조회 관련 지표(카운터/게이지)를 모으는 클래스.
+    ConfigManager와 같이 싱글톤으로 애플리케이션 전체에서 하나의 인스턴스를 공유합니다.
+    """
+    _instance = None
+    # 분당 비율 계산에 쓰는 이벤트 보관 시간(초)
+    WINDOW = 60
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(Metrics, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = collections.defaultdict(float)
+        self._gauges: Dict[str, Any] = {}
+        self._events: Dict[str, collections.deque] = collections.defaultdict(collections.deque)
+        self._initialized = True
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """
+        카운터를 증가시킵니다.
+
+        Args:
+            name: 지표 이름
+            value: 증가량
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._counters[name] += value
+            events = self._events[name]
+            events.append((now, value))
+            self._trim(events, now)
+
+    def set_gauge(self, name: str, value: Any) -> None:
+        """
+        게이지 값을 설정합니다.
+
+        Args:
+            name: 지표 이름
+            value: 현재 값
+        """
+        with self._lock:
+            self._gauges[name] = value
+
+    def get(self, name: str, default: Any = 0) -> Any:
+        """카운터 또는 게이지의 현재 값을 반환합니다."""
+        with self._lock:
+            if name in self._counters:
+                return self._counters[name]
+            return self._gauges.get(name, default)
+
+    def per_minute(self, name: str) -> float:
+        """
+        최근 1분 동안 카운터가 증가한 양을 반환합니다.
+
+        Args:
+            name: 지표 이름
+
+        Returns:
+            최근 WINDOW초 동안의 증가량
+        """
+        now = time.monotonic()
+        with self._lock:
+            events = self._events.get(name)
+            if not events:
+                return 0
+            self._trim(events, now)
+            return sum(value for _, value in events)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """모든 지표를 딕셔너리로 반환합니다. (카운터는 분당 증가량도 함께)"""
+        now = time.monotonic()
+        with self._lock:
+            result = dict(self._gauges)
+            for name, value in self._counters.items():
+                events = self._events[name]
+                self._trim(events, now)
+                result[name] = value
+                result[f"{name}.per_minute"] = sum(v for _, v in events)
+            return result
+
+    def _trim(self, events: collections.deque, now: float) -> None:
+        while events and now - events[0][0] > self.WINDOW:
+            events.popleft()
@@ -0,0 +1,503 @@
+# mock_server.py
+import asyncio
+import json
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+from fetch_common import morning_target
+
+try:
+    from aiohttp import web
+except ImportError:  # 웹소켓 대역 서버는 aiohttp가 있어야 사용 가능
+    web = None
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+    import h2.exceptions
+except ImportError:  # HTTP/2 대역 서버는 h2가 있어야 사용 가능
+    h2 = None
+
+
+# 목 서버에 상장된 것으로 취급하는 자산 - 벤치마크용 SYM0~SYM1999와 주요 코인
+MOCK_BASES = [f"SYM{i}" for i in range(2000)] + ["BTC", "ETH", "XRP", "SOL", "DOGE", "ADA"]
+MOCK_BINANCE_SYMBOLS = [f"{b}USDT" for b in MOCK_BASES]
+
+
+def mock_price(symbol: str) -> float:
+    """심볼마다 고정된 가짜 가격을 만듭니다."""
+    return float(100 + sum(ord(c) for c in symbol) % 900)
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        parsed = urllib.parse.urlsplit(self.path)
+        params = dict(urllib.parse.parse_qsl(parsed.query))
+        with server.lock:
+            server.request_counts[parsed.path] = server.request_counts.get(parsed.path, 0) + 1
+        if server.latency:
+            time.sleep(server.latency)
+        if server.slow_ratio and random.random() < server.slow_ratio:
+            time.sleep(server.slow_latency)
+        if server.error_ratio and random.random() < server.error_ratio:
+            # 일시적 오류 흉내 - 429면 Retry-After도 함께 보냄
+            headers = {"Retry-After": str(server.retry_after)} if server.error_status in (418, 429) else {}
+            self._send(server.error_status, {"code": -1003, "msg": "mock error"}, headers)
+            return
+
+        route = server.routes.get(parsed.path)
+        if route is None:
+            self._send(404, {"error": "not found"})
+            return
+        status, body = route(params)
+        headers = {}
+        if parsed.path.startswith("/api/v3/"):
+            headers["X-MBX-USED-WEIGHT-1M"] = str(server.add_weight(self.path))
+        elif parsed.path.startswith("/v1/"):
+            headers["Remaining-Req"] = "group=default; min=1800; sec=29"
+        self._send(status, body, headers)
+
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        with self.server.lock:
+            self.server.bytes_sent += len(payload)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class MockExchangeServer(ThreadingHTTPServer):
+    """
+    바이낸스/업비트/환율 API를 흉내내는 로컬 HTTP 서버.
+    벤치마크에서 모든 엔드포인트를 이 서버 하나로 돌려 사용합니다.
+    """
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.05, port: int = 0):
+        """
+        Args:
+            latency: 요청마다 지연시킬 시간(초) - 네트워크 왕복 시간 흉내
+            port: 바인딩할 포트 (0이면 임의 포트)
+        """
+        super().__init__(("127.0.0.1", port), _MockHandler)
+        self.latency = latency
+        # 이 비율의 요청은 slow_latency만큼 더 지연 (느린 엣지 노드 흉내)
+        self.slow_ratio = 0.0
+        self.slow_latency = 1.0
+        # 이 비율의 요청은 error_status로 실패 (429/418이면 Retry-After: retry_after초)
+        self.error_ratio = 0.0
+        self.error_status = 503
+        self.retry_after = 0
+        self.lock = threading.Lock()
+        self.request_counts: Dict[str, int] = {}
+        self.connections = 0
+        self.bytes_sent = 0
+        # 바이낸스에 없는 심볼처럼 400 "Invalid symbol."을 돌려줄 심볼
+        self.invalid_symbols = set()
+        # 업비트에 상장되지 않은 것으로 취급할 마켓 (/v1/ticker 404, /v1/market/all에서 제외)
+        self.upbit_unlisted = set()
+        self.used_weight = 0
+        self._weight_minute = 0
+        self.routes = {
+            "/api/v3/ticker/price": self._ticker_price,
+            "/api/v3/klines": self._klines,
+            "/api/v3/ticker/tradingDay": self._trading_day,
+            "/v1/ticker": self._upbit_ticker,
+            "/v1/market/all": self._upbit_markets,
+            "/api/v3/exchangeInfo": self._exchange_info,
+            "/v4/latest/USD": self._fx,
+        }
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def add_weight(self, url: str) -> int:
+        """바이낸스처럼 1분 단위로 누적 가중치를 계산해 반환합니다."""
+        from rate_limiter import request_cost
+        minute = int(time.time() // 60)
+        with self.lock:
+            if minute != self._weight_minute:
+                self._weight_minute, self.used_weight = minute, 0
+            self.used_weight += request_cost(url)[0]
+            return self.used_weight
+
+    def verify_request(self, request, client_address):
+        # 새 TCP 연결마다 한 번 호출됨 - 연결 재사용 여부 확인용
+        with self.lock:
+            self.connections += 1
+        return True
+
+    def endpoints(self) -> Dict[str, str]:
+        """fetch_common.DEFAULT_ENDPOINTS 형식의 주소 목록을 반환합니다."""
+        return {"binance": self.url, "upbit": self.url, "fx": self.url}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _invalid(self, params):
+        symbols = json.loads(params["symbols"]) if "symbols" in params else [params.get("symbol")]
+        return any(s in self.invalid_symbols for s in symbols)
+
+    def _ticker_price(self, params):
+        if self._invalid(params):
+            return 400, {"code": -1121, "msg": "Invalid symbol."}
+        if "symbol" in params:
+            symbol = params["symbol"]
+            return 200, {"symbol": symbol, "price": str(mock_price(symbol))}
+        if "symbols" not in params:
+            # 전체 시장 시세
+            return 200, [{"symbol": s, "price": str(mock_price(s))} for s in MOCK_BINANCE_SYMBOLS
+                         if s not in self.invalid_symbols]
+        symbols = json.loads(params["symbols"])
+        return 200, [{"symbol": s, "price": str(mock_price(s))} for s in symbols]
+
+    def _klines(self, params):
+        if self._invalid(params):
+            return 400, {"code": -1121, "msg": "Invalid symbol."}
+        price = mock_price(params.get("symbol", "")) * 0.99
+        start = int(params.get("startTime", 0))
+        return 200, [[start, str(price), str(price), str(price), str(price), "0",
+                      start + 3599999, "0", 0, "0", "0", "0"]]
+
+    def _trading_day(self, params):
+        if self._invalid(params):
+            return 400, {"code": -1121, "msg": "Invalid symbol."}
+        _, ts = morning_target()
+        symbols = json.loads(params.get("symbols", "[]"))
+        return 200, [{"symbol": s, "openPrice": str(mock_price(s) * 0.99), "openTime": ts,
+                      "lastPrice": str(mock_price(s))} for s in symbols]
+
+    def _exchange_info(self, params):
+        symbols = [{
+            "symbol": f"{b}USDT", "status": "TRADING", "baseAsset": b, "quoteAsset": "USDT",
+            "filters": [{"filterType": "PRICE_FILTER", "tickSize": "0.01000000"},
+                        {"filterType": "LOT_SIZE", "stepSize": "0.00001000"}],
+        } for b in MOCK_BASES if f"{b}USDT" not in self.invalid_symbols]
+        return 200, {"timezone": "UTC", "symbols": symbols}
+
+    def _upbit_ticker(self, params):
+        markets = [m for m in params.get("markets", "").split(",") if m]
+        if any(m in self.upbit_unlisted for m in markets):
+            return 404, {"error": {"name": 404, "message": "Code not found"}}
+        return 200, [{"market": m, "trade_price": 1390.0 if m == "KRW-USDT" else mock_price(m[4:] + "USDT") * 1400}
+                     for m in markets]
+
+    def _upbit_markets(self, params):
+        return 200, [{"market": f"KRW-{b}", "korean_name": b, "english_name": b}
+                     for b in MOCK_BASES + ["USDT"] if f"KRW-{b}" not in self.upbit_unlisted]
+
+    def _fx(self, params):
+        return 200, {"base": "USD", "rates": {"KRW": 1380.0}}
+
+
+class MockStreamServer:
+    """
+    바이낸스 결합 스트림(/stream?streams=...)과 업비트 웹소켓(/websocket/v1)을 흉내내는 로컬 서버.
+    별도 스레드의 이벤트 루프에서 실행되며, 재연결 확인용으로 연결을 강제로 끊을 수 있습니다.
+    """
+
+    def __init__(self, interval: float = 0.1, port: int = 0):
+        """
+        Args:
+            interval: 스트림별 메시지 전송 간격(초)
+            port: 바인딩할 포트 (0이면 임의 포트)
+        """
+        self.interval = interval
+        self.port = port
+        self.connections = 0
+        self.messages_sent = 0
+        self._sockets = set()
+        self._tasks = set()
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(5)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5)
+
+    def drop_connections(self):
+        """열려 있는 모든 웹소켓 연결을 서버 쪽에서 끊습니다."""
+        async def _drop():
+            for ws in list(self._sockets):
+                await ws.close()
+        asyncio.run_coroutine_threadsafe(_drop(), self._loop).result(5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_get("/stream", self._stream)
+        app.router.add_get("/websocket/v1", self._upbit)
+        self._runner = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        self._loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await self._runner.cleanup()
+
+    def _messages(self, streams, prices):
+        for stream in streams:
+            name, _, kind = stream.partition("@")
+            symbol = name.upper()
+            price = prices.setdefault(symbol, mock_price(symbol))
+            price *= 1 + random.uniform(-0.001, 0.001)
+            prices[symbol] = price
+            if kind == "miniTicker":
+                data = {"e": "24hrMiniTicker", "s": symbol, "c": f"{price:.4f}"}
+            else:
+                data = {"u": self.messages_sent, "s": symbol,
+                        "b": f"{price * 0.9999:.4f}", "a": f"{price * 1.0001:.4f}"}
+            yield {"stream": stream, "data": data}
+
+    async def _send_loop(self, ws, streams):
+        prices = {}
+        try:
+            while not ws.closed:
+                for message in self._messages(streams, prices):
+                    await ws.send_str(json.dumps(message))
+                    self.messages_sent += 1
+                await asyncio.sleep(self.interval)
+        except (ConnectionResetError, RuntimeError):
+            pass
+
+    async def _upbit_send_loop(self, ws, codes):
+        prices = {}
+        try:
+            while not ws.closed:
+                for code in codes:
+                    symbol = code[4:] + "USDT"
+                    price = prices.setdefault(code, mock_price(symbol) * 1400)
+                    price *= 1 + random.uniform(-0.001, 0.001)
+                    prices[code] = price
+                    message = {"type": "ticker", "code": code, "trade_price": round(price, 2)}
+                    await ws.send_bytes(json.dumps(message).encode("utf-8"))
+                    self.messages_sent += 1
+                await asyncio.sleep(self.interval)
+        except (ConnectionResetError, RuntimeError):
+            pass
+
+    async def _upbit(self, request):
+        """업비트 /websocket/v1 대역 - 구독 메시지를 받은 뒤 ticker를 바이너리로 보냅니다."""
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        self._sockets.add(ws)
+        self._tasks.add(asyncio.current_task())
+        sender = None
+        try:
+            async for msg in ws:
+                if sender is None:
+                    codes = []
+                    for part in json.loads(msg.data):
+                        if part.get("type") == "ticker":
+                            codes = part.get("codes", [])
+                    sender = asyncio.ensure_future(self._upbit_send_loop(ws, codes))
+        except asyncio.CancelledError:
+            pass
+        finally:
+            if sender is not None:
+                sender.cancel()
+            self._sockets.discard(ws)
+            self._tasks.discard(asyncio.current_task())
+        return ws
+
+    async def _stream(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        self._sockets.add(ws)
+        self._tasks.add(asyncio.current_task())
+        streams = [s for s in request.query.get("streams", "").split("/") if s]
+        sender = asyncio.ensure_future(self._send_loop(ws, streams))
+        try:
+            async for _ in ws:
+                pass
+        except asyncio.CancelledError:
+            pass
+        finally:
+            sender.cancel()
+            self._sockets.discard(ws)
+            self._tasks.discard(asyncio.current_task())
+        return ws
+
+
+class _Http2Protocol(asyncio.Protocol):
+    """MockHttp2Server의 연결 하나 (h2c, prior knowledge)"""
+
+    def __init__(self, server):
+        self.server = server
+        self.conn = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False, header_encoding="utf-8"))
+        self.transport = None
+        self._window_open = asyncio.Event()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.server.connections += 1
+        self.conn.initiate_connection()
+        self.transport.write(self.conn.data_to_send())
+
+    def data_received(self, data):
+        try:
+            events = self.conn.receive_data(data)
+        except h2.exceptions.ProtocolError:
+            self.transport.close()
+            return
+        for event in events:
+            if isinstance(event, h2.events.RequestReceived):
+                path = dict(event.headers)[":path"]
+                asyncio.ensure_future(self._respond(event.stream_id, path))
+            elif isinstance(event, h2.events.WindowUpdated):
+                self._window_open.set()
+            elif isinstance(event, h2.events.ConnectionTerminated):
+                self.transport.close()
+        self.transport.write(self.conn.data_to_send())
+
+    async def _respond(self, stream_id, path):
+        # 스트림마다 따로 지연시키므로 한 연결에 실린 요청들이 동시에 처리됨
+        if self.server.latency:
+            await asyncio.sleep(self.server.latency)
+        status, payload, headers = self.server.handle(path)
+        self.conn.send_headers(stream_id, [(":status", str(status)), ("content-type", "application/json"),
+                                           ("content-length", str(len(payload)))] + list(headers.items()))
+        while payload:
+            window = min(self.conn.local_flow_control_window(stream_id), self.conn.max_outbound_frame_size)
+            if window <= 0:
+                self._window_open.clear()
+                await self._window_open.wait()
+                continue
+            chunk, payload = payload[:window], payload[window:]
+            self.conn.send_data(stream_id, chunk)
+            self.transport.write(self.conn.data_to_send())
+        self.conn.end_stream(stream_id)
+        self.transport.write(self.conn.data_to_send())
+
+
+class MockHttp2Server:
+    """
+    MockExchangeServer와 같은 API를 HTTP/2(h2c, TLS 없음)로 제공하는 로컬 서버.
+    요청마다 latency만큼 지연하되 스트림별로 동시에 처리하므로 멀티플렉싱 효과를 확인할 수 있습니다.
+    별도 스레드의 이벤트 루프에서 실행됩니다.
+    """
+
+    def __init__(self, latency: float = 0.05, port: int = 0):
+        """
+        Args:
+            latency: 요청마다 지연시킬 시간(초)
+            port: 바인딩할 포트 (0이면 임의 포트)
+        """
+        self.latency = latency
+        self.port = port
+        self.connections = 0
+        self.request_counts: Dict[str, int] = {}
+        # 응답 내용은 HTTP/1.1 목 서버의 라우팅을 그대로 사용 (그 서버는 실행하지 않음)
+        self.exchange = MockExchangeServer(latency=0)
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def endpoints(self) -> Dict[str, str]:
+        return {"binance": self.url, "upbit": self.url, "fx": self.url}
+
+    def handle(self, path: str):
+        """(상태 코드, 응답 본문 바이트, 추가 헤더)를 만듭니다."""
+        parsed = urllib.parse.urlsplit(path)
+        params = dict(urllib.parse.parse_qsl(parsed.query))
+        self.request_counts[parsed.path] = self.request_counts.get(parsed.path, 0) + 1
+        route = self.exchange.routes.get(parsed.path)
+        status, body = route(params) if route else (404, {"error": "not found"})
+        headers = {}
+        if parsed.path.startswith("/api/v3/"):
+            headers["x-mbx-used-weight-1m"] = str(self.exchange.add_weight(path))
+        elif parsed.path.startswith("/v1/"):
+            headers["remaining-req"] = "group=default; min=1800; sec=29"
+        return status, json.dumps(body).encode("utf-8"), headers
+
+    def start(self):
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5)
+        self.exchange.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            self._loop.create_server(lambda: _Http2Protocol(self), "127.0.0.1", self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
@@ -1,116 +1,347 @@
-# price_fetcher.py
-import requests
+# overlay.py
+import contextlib
 import datetime
 import logging
-from PyQt5.QtCore import QThread, pyqtSignal
-from typing import Dict, List, Tuple, Optional
+from PyQt5.QtCore import QThread, Qt, pyqtSignal
+from PyQt5.QtGui import QFont
+from PyQt5.QtWidgets import QApplication, QLabel, QVBoxLayout, QWidget
+
+from config_manager import ConfigManager
+from exchange_info import get_exchange_info
+from fast_json import decode, decode_time_ms, extract_ticker_prices, record_cycle
+from fetch_common import (DEADLINE_METRIC, FX_SOURCE_API, FX_SOURCE_UPBIT, REQUEST_TIMEOUT,
+                          UPBIT_USDT_MARKET, CycleDeadline, PriceTable, aged_symbols, binance_quarantine,
+                          build_results, cycle_deadline, fill_last_known_good, resolve_endpoints, stage_results)
+from fx_provider import get_fx_provider
+from hedging import get_hedger
+from metrics import Metrics
+from rate_limiter import GovernedSession, RequestGovernor
+from reference_prices import get_reference_provider
+from retry_policy import PERMANENT, classify_error, get_retry_policy
+from upbit_markets import chunk_markets, get_upbit_catalog
+from transport import RequestsTransport, make_transport
+from warmup import shared_session
+
+# symbols=[...] 일괄 요청 한 번에 넣는 최대 심볼 수 (URL 길이 제한)
+BINANCE_BATCH_SIZE = 100
+# 이 개수 이상을 조회하면 전체 시장 시세를 한 번에 받아서 골라냄
+SNAPSHOT_THRESHOLD = 150
+# 기본 새로고침 간격(2초)에 맞춘 조회 1회의 시간 예산(초)
+DEFAULT_DEADLINE = cycle_deadline(2)
+# 바뀌면 조회기를 새로 만들어야 하는 설정 (refresh_interval은 간격만 바꿈)
+FETCHER_SETTINGS = ("symbols", "fx_source", "fetch_engine", "use_streaming", "stream_reference_interval",
+                    "use_upbit_stream", "snapshot_threshold", "hedge_binance", "transport")
 
 
 class PriceFetcherThread(QThread):
     result_ready = pyqtSignal(dict)
+    # 조회 도중 단계별 중간 결과 (단계 이름, 결과) - 아직 받지 못한 항목은 None (PriceFetchWorker와 같음)
+    stage_ready = pyqtSignal(str, dict)
     error_occurred = pyqtSignal(str)
+    # 바이낸스에 없어 조회에서 제외된 심볼 목록
+    symbols_quarantined = pyqtSignal(list)
+    # 조회에 실패해 마지막 정상 값으로 채운 심볼의 {심볼: 값의 나이(초)}
+    values_aged = pyqtSignal(dict)
+    # (순번, 결과 또는 None, 오류 메시지) - RefreshCoordinator가 다음 새로고침을 예약할 때 사용
+    cycle_finished = pyqtSignal(int, object, str)
 
-    def __init__(self, symbols):
+    def __init__(self, symbols, fx_source=FX_SOURCE_API, endpoints=None,
+                 snapshot_threshold=SNAPSHOT_THRESHOLD, deadline=DEFAULT_DEADLINE, hedge=False, session=None,
+                 transport=None):
         super().__init__()
         self.symbols = symbols
+        self.fx_source = fx_source
+        self.snapshot_threshold = snapshot_threshold
+        self.endpoints = resolve_endpoints(endpoints)
+        self.upbit_catalog = get_upbit_catalog(self.endpoints['upbit'])
+        self.reference_provider = get_reference_provider(self.endpoints['binance'])
+        # 켜져 있으면 바이낸스 요청이 늦을 때 미러 호스트(api1~3)로 같은 요청을 한 번 더 보냄
+        self.hedger = get_hedger(self.endpoints['binance']) if hedge else None
+        # 시작할 때 워밍업한 공용 세션이 있으면 그 연결을 그대로 사용
+        self.session = session or shared_session()
+        # 전송 계층 (transport.Http2Transport 등) - 없으면 위 세션으로 HTTP/1.1 요청
+        self.transport = transport
+        self.quarantined = []
+        self.aged = {}
+        # 조회 1회의 시간 예산(초) - 지나면 남은 요청은 보내지 않고 받은 결과만 반환
+        self.deadline = deadline
+        self.cycle_deadline = CycleDeadline()
+        # 요청별 재시도 정책 (일시적 오류는 같은 조회 안에서 다시 보냄)
+        self.retry_policy = get_retry_policy()
+        # 심볼이 많을 때 쓰는 계산용 배열 (스레드 객체와 함께 유지되고 심볼 목록이 바뀔 때만 다시 만듦)
+        self.price_table = PriceTable()
+        self._seq = 0
+        # 조회 중에 들어온 새로고침 요청의 순번 (끝나면 한 번만 다시 조회)
+        self._pending_seq = None
+        self.finished.connect(self._run_pending)
 
     def run(self):
+        seq = self._seq
         try:
             results = self.fetch()
             self.result_ready.emit(results)
+            if self.quarantined:
+                self.symbols_quarantined.emit(self.quarantined)
+            if self.aged:
+                self.values_aged.emit(self.aged)
+            self.cycle_finished.emit(seq, results, "")
         except Exception as e:
             logging.error(f"가격 가져오기 실패: {str(e)}")
-            self.error_occurred.emit(f"가격 업데이트에 실패했습니다: {str(e)}")
+            message = f"가격 업데이트에 실패했습니다: {str(e)}"
+            self.error_occurred.emit(message)
+            self.cycle_finished.emit(seq, None, message)
+
+    def request_refresh(self, seq: int = 0):
+        """
+        새로고침 1회를 시작합니다. (PriceFetchWorker와 같은 이름) GUI 스레드에서 호출해야 합니다.
+        이전 조회가 아직 진행 중이면 요청을 버리지 않고 하나로 합쳐 조회가 끝난 직후 한 번 더 조회합니다.
+
+        Args:
+            seq: 이 조회의 순번 (cycle_finished로 그대로 돌려줌)
+        """
+        if self.isRunning():
+            self._pending_seq = seq
+            return
+        self._seq = seq
+        self.start()
+
+    def _run_pending(self):
+        if self._pending_seq is not None:
+            seq, self._pending_seq = self._pending_seq, None
+            self.request_refresh(seq)
+
+    def set_refresh_interval(self, refresh_interval: float):
+        """새로고침 간격에 맞춰 조회 1회의 시간 예산을 정합니다. (다음 조회부터 적용)"""
+        self.deadline = cycle_deadline(refresh_interval)
+
+    def stop(self):
+        """예약된 조회를 취소하고 진행 중인 조회가 끝날 때까지 기다립니다."""
+        self._pending_seq = None
+        self.wait()
+
+    def next_interval(self, base_interval: float) -> float:
+        """API 예산 상태를 반영한 다음 새로고침 간격(초) - 한도에 가까워지면 간격을 늘림"""
+        return RequestGovernor().recommended_interval(base_interval)
 
     def fetch(self):
         results = {}
+        self.cycle_deadline = deadline = CycleDeadline(self.deadline)
+        decode_start = decode_time_ms()
         try:
-            usd_to_krw = self.fetch_usd_krw_rate()
-            with requests.Session() as sess:
+            usd_to_krw = None
+            if self.fx_source != FX_SOURCE_UPBIT:
+                usd_to_krw = self.fetch_usd_krw_rate()
+            transport_ctx = (contextlib.nullcontext(self.transport) if self.transport
+                             else RequestsTransport(self.session))
+            with transport_ctx as sess:
                 # 세션 설정
                 sess.headers.update({'User-Agent': 'Mozilla/5.0'})
-                sess.timeout = 10  # 타임아웃 설정
 
                 binance_map = {}
-                upbit_map = {}
                 upbit_symbols = {}
                 morning_map = {}
 
-                # 모든 심볼에 대한 Binance 데이터 한 번에 가져오기 시도
+                # exchangeInfo 색인으로 없는 심볼을 알 수 있으면 요청 없이 바로 격리
+                exchange_info = get_exchange_info(self.endpoints['binance'])
+                exchange_info.refresh_in_background()
+                for symbol in exchange_info.validate(self.symbols)[1]:
+                    binance_quarantine.add(symbol)
+
+                # 모든 심볼에 대한 Binance 데이터 한 번에 가져오기 시도 (격리된 심볼 제외)
+                valid_symbols, _ = binance_quarantine.split(self.symbols)
                 try:
-                    symbols_str = ",".join([f'"{s}"' for s in self.symbols])
-                    r = sess.get(f"https://api.binance.com/api/v3/ticker/price?symbols=[{symbols_str}]")
-                    if r.status_code == 200:
-                        for item in r.json():
-                            binance_map[item["symbol"]] = float(item["price"])
-                    else:
-                        # 일괄 요청 실패 시 개별 요청으로 폴백
-                        for symbol in self.symbols:
-                            binance_price = self.fetch_binance_price(sess, symbol)
-                            binance_map[symbol] = binance_price
+                    binance_map = self.fetch_binance_prices(sess, valid_symbols)
                 except Exception as e:
-                    logging.error(f"Binance 일괄 조회 실패, 개별 조회로 전환: {e}")
-                    for symbol in self.symbols:
-                        binance_price = self.fetch_binance_price(sess, symbol)
-                        binance_map[symbol] = binance_price
-
-                # 나머지 데이터 처리
-                for symbol in self.symbols:
-                    morning_price = self.fetch_morning_price(sess, symbol)
+                    if classify_error(e)[0] != PERMANENT:
+                        # 5xx/타임아웃/요청 한도 초과는 이미 재시도했으므로 심볼별 요청(N배)을 더 보내지 않음
+                        # - 받지 못한 가격은 아래에서 마지막 정상 값으로 채움
+                        logging.error(f"Binance 일괄 조회 실패: {e}")
+                    else:
+                        # 응답 형식 오류 등 일괄 요청 자체의 문제일 때만 개별 요청으로 폴백
+                        # (없는 심볼로 인한 400은 fetch_binance_batch가 목록을 나눠 처리)
+                        logging.error(f"Binance 일괄 조회 실패, 개별 조회로 전환: {e}")
+                        # HTTP/2 전송 계층이면 심볼별 요청이 연결 하나에 동시에 실림
+                        prices = sess.map(lambda symbol: self.fetch_binance_price(sess, symbol), valid_symbols)
+                        binance_map = dict(zip(valid_symbols, prices))
+                # 이번 조회에서 새로 격리된 심볼 반영
+                valid_symbols, self.quarantined = binance_quarantine.split(self.symbols)
+                # 받지 못한 가격은 마지막 정상 값으로 채우고 백그라운드에서 다시 받음
+                binance_ages = fill_last_known_good(
+                    self.endpoints['binance'], binance_map, valid_symbols, self.revalidate_binance)
+
+                # 업비트 상장 마켓 목록은 하루 한 번만 새로 받음 (단계별 결과가 같은 계산용 배열을 쓰도록 먼저 매핑)
+                self.upbit_catalog.refresh(sess, self.endpoints['upbit'], timeout=deadline.timeout())
+                for symbol in valid_symbols:
                     up_sym = self.to_upbit_symbol(symbol)
-                    morning_map[symbol] = morning_price
                     if up_sym:
                         upbit_symbols[symbol] = up_sym
+                inputs = {"binance_map": binance_map, "morning_map": morning_map, "upbit_symbols": upbit_symbols,
+                          "upbit_price_map": {}, "usd_to_krw": usd_to_krw}
+                self._emit_stage("prices", inputs)
+
+                # 기준 시가는 거래일 단위로 캐시되므로 하루 한 번 일괄 조회로 충분함
+                morning_map = self.reference_provider.get_opens(
+                    sess, valid_symbols, self.endpoints['binance'], fallback=self.fetch_morning_price,
+                    deadline=deadline, map_fn=sess.map)
+                inputs["morning_map"] = morning_map
+                self._emit_stage("reference", inputs)
 
                 upbit_markets = list(upbit_symbols.values())
-                upbit_price_map = {}
-                if upbit_markets:
-                    try:
-                        url = "https://api.upbit.com/v1/ticker"
-                        r = sess.get(url, params={"markets": ",".join(upbit_markets)})
-                        if r.status_code == 200:
-                            for item in r.json():
-                                upbit_price_map[item["market"]] = float(item["trade_price"])
-                    except Exception as e:
-                        logging.error(f"Upbit 조회 실패: {e}")
-
-            # 결과 데이터 조합
-            for symbol in self.symbols:
-                binance_price = binance_map.get(symbol)
-                morning_price = morning_map.get(symbol)
-                kimchi_premium = None
-                morning_diff = None
-
-                if binance_price is not None and morning_price and morning_price > 0:
-                    diff = binance_price - morning_price
-                    morning_diff = (diff / morning_price) * 100
-
-                if binance_price is not None and usd_to_krw > 0:
-                    up_sym = upbit_symbols.get(symbol)
-                    if up_sym and up_sym in upbit_price_map:
-                        up_price = upbit_price_map[up_sym]
-                        kimchi_premium = ((up_price - (binance_price * usd_to_krw))
-                                          / (binance_price * usd_to_krw)) * 100
-
-                results[symbol] = (binance_price, morning_diff, kimchi_premium)
+                if self.fx_source == FX_SOURCE_UPBIT:
+                    # 환율도 같은 업비트 일괄 요청의 KRW-USDT 체결가로 계산
+                    upbit_markets.append(UPBIT_USDT_MARKET)
+                upbit_price_map = self.fetch_upbit_prices(sess, upbit_markets)
+                upbit_ages = fill_last_known_good(
+                    self.endpoints['upbit'], upbit_price_map, upbit_markets, self.revalidate_upbit)
+
+            # 이전 값으로 채운 항목의 나이를 심볼별로 모음
+            self.aged = aged_symbols(binance_ages, upbit_symbols, upbit_ages)
+
+            if deadline.expired():
+                # 받지 못한 항목은 마지막 정상 값으로 채워지거나 None으로 남음
+                Metrics().incr(DEADLINE_METRIC)
+                logging.warning(f"조회 시간 예산({self.deadline:.1f}초) 초과 - 받은 결과만 표시합니다")
+            if usd_to_krw is None:
+                # KRW-USDT 시세를 받지 못했으면 외부 환율 API로 대체
+                usd_to_krw = upbit_price_map.get(UPBIT_USDT_MARKET) or self.fetch_usd_krw_rate()
+
+            # 결과 데이터 조합 (심볼이 많으면 numpy로 한 번에 계산)
+            results = build_results(self.symbols, binance_map, morning_map, upbit_symbols,
+                                    upbit_price_map, usd_to_krw, self.price_table)
 
         except Exception as e:
             logging.error(f"가격 데이터 가져오기 중 치명적 오류: {e}")
 
+        record_cycle(decode_start)
         return results
 
+    def _emit_stage(self, stage, inputs):
+        self.stage_ready.emit(stage, stage_results(self.symbols, inputs, table=self.price_table))
+
+    def revalidate_binance(self, symbols):
+        """마지막 정상 값 재조회용 바이낸스 가격 조회 (조회 시간 예산과 무관하게 별도 세션 사용)"""
+        prices = {}
+        with GovernedSession() as sess:
+            for i in range(0, len(symbols), BINANCE_BATCH_SIZE):
+                symbols_str = ",".join([f'"{s}"' for s in symbols[i:i + BINANCE_BATCH_SIZE]])
+                r = sess.get(f"{self.endpoints['binance']}/api/v3/ticker/price?symbols=[{symbols_str}]",
+                             timeout=REQUEST_TIMEOUT)
+                r.raise_for_status()
+                prices.update({item["symbol"]: float(item["price"]) for item in decode(r)})
+        return prices
+
+    def revalidate_upbit(self, markets):
+        """마지막 정상 값 재조회용 업비트 시세 조회"""
+        prices = {}
+        with GovernedSession() as sess:
+            for chunk in chunk_markets(markets):
+                r = sess.get(f"{self.endpoints['upbit']}/v1/ticker", params={"markets": ",".join(chunk)},
+                             timeout=REQUEST_TIMEOUT)
+                r.raise_for_status()
+                prices.update({item["market"]: float(item["trade_price"]) for item in decode(r)})
+        return prices
+
     def fetch_usd_krw_rate(self):
-        try:
-            r = requests.get("https://api.exchangerate-api.com/v4/latest/USD", timeout=10)
-            return float(r.json()["rates"]["KRW"])
-        except Exception as e:
-            logging.error(f"환율 정보 가져오기 실패: {e}")
-            return 0.0
+        # TTL 캐시된 값을 바로 반환하고, 만료되었으면 백그라운드에서 갱신
+        return get_fx_provider(self.endpoints['fx']).get_rate()
+
+    def fetch_binance_prices(self, sess, symbols):
+        """
+        바이낸스 가격을 조회합니다. 심볼이 snapshot_threshold 이상이면 전체 시장 시세 한 번으로,
+        그보다 적으면 BINANCE_BATCH_SIZE 단위의 symbols=[...] 일괄 요청으로 가져옵니다.
+        """
+        if self.snapshot_threshold and len(symbols) >= self.snapshot_threshold:
+            return self.fetch_binance_snapshot(sess, symbols)
+        prices = {}
+        for i in range(0, len(symbols), BINANCE_BATCH_SIZE):
+            prices.update(self.fetch_binance_batch(sess, symbols[i:i + BINANCE_BATCH_SIZE]))
+        return prices
+
+    def fetch_binance_snapshot(self, sess, symbols):
+        """
+        전체 시장 시세(/api/v3/ticker/price, 가중치 4)를 한 번 받아 조회 대상만 골라냅니다.
+        수천 개 항목 전체를 디코딩하지 않고 응답 본문에서 조회 대상 항목만 찾습니다.
+        응답에 없는 심볼은 바이낸스에 없는 심볼이므로 격리합니다.
+
+        Raises:
+            requests.HTTPError: 오류 응답
+        """
+        r = self.binance_get(sess, "/api/v3/ticker/price")
+        r.raise_for_status()
+        prices = extract_ticker_prices(r.content, symbols)
+        for symbol in set(symbols).difference(prices):
+            binance_quarantine.add(symbol)
+            logging.warning(f"{symbol} 바이낸스에 없는 심볼이라 조회에서 제외합니다")
+        return prices
+
+    def fetch_binance_batch(self, sess, symbols):
+        """
+        여러 심볼의 바이낸스 가격을 한 번의 요청으로 조회합니다.
+        존재하지 않는 심볼이 섞여 400이 오면 목록을 반으로 나눠 다시 요청하면서 원인 심볼을 찾아
+        격리합니다. 격리된 심볼은 다음 새로고침부터 빠지므로 나머지는 다시 한 번의 요청으로 조회됩니다.
+
+        Raises:
+            requests.HTTPError: 400 이외의 오류 응답
+        """
+        if not symbols or self.cycle_deadline.expired():
+            return {}
+        symbols_str = ",".join([f'"{s}"' for s in symbols])
+        r = self.binance_get(sess, f"/api/v3/ticker/price?symbols=[{symbols_str}]")
+        if r.status_code == 200:
+            return {item["symbol"]: float(item["price"]) for item in decode(r)}
+        if r.status_code != 400:
+            r.raise_for_status()
+
+        if len(symbols) == 1:
+            binance_quarantine.add(symbols[0])
+            logging.warning(f"{symbols[0]} 바이낸스에 없는 심볼이라 조회에서 제외합니다: {r.text}")
+            return {}
+        mid = len(symbols) // 2
+        prices = self.fetch_binance_batch(sess, symbols[:mid])
+        prices.update(self.fetch_binance_batch(sess, symbols[mid:]))
+        return prices
+
+    def binance_get(self, sess, path, params=None):
+        """
+        바이낸스 GET 요청 (헤지가 켜져 있으면 미러 호스트 중 먼저 온 응답 사용).
+        일시적 오류와 요청 한도 초과는 재시도 정책에 따라 같은 조회 안에서 다시 보냅니다.
+        """
+        def send():
+            timeout = self.cycle_deadline.timeout()
+            if self.hedger is not None:
+                return self.hedger.get(sess, path, params=params, timeout=timeout)
+            return sess.get(f"{self.endpoints['binance']}{path}", params=params, timeout=timeout)
+        return self.retry_policy.call(send, self.cycle_deadline, label=path)
+
+    def fetch_upbit_prices(self, sess, markets):
+        upbit_price_map = {}
+        # 마켓이 많으면 URL 길이 제한에 걸리지 않도록 나눠서 요청
+        for chunk in chunk_markets(markets):
+            if self.cycle_deadline.expired():
+                break
+            try:
+                url = f"{self.endpoints['upbit']}/v1/ticker"
+                r = self.retry_policy.call(
+                    lambda: sess.get(url, params={"markets": ",".join(chunk)}, timeout=self.cycle_deadline.timeout()),
+                    self.cycle_deadline, label=url)
+                if r.status_code == 200:
+                    for item in decode(r):
+                        upbit_price_map[item["market"]] = float(item["trade_price"])
+                elif r.status_code == 404:
+                    # 없는 마켓이 섞임 - 상장 폐지 등으로 목록이 바뀌었을 수 있으니 다음 조회 때 다시 받음
+                    logging.error(f"Upbit 조회 실패: 상장되지 않은 마켓 포함 ({r.text})")
+                    self.upbit_catalog.invalidate()
+            except Exception as e:
+                logging.error(f"Upbit 조회 실패: {e}")
+        return upbit_price_map
 
     def fetch_binance_price(self, sess, symbol):
+        if self.cycle_deadline.expired():
+            return None
         try:
-            r = sess.get("https://api.binance.com/api/v3/ticker/price", params={"symbol": symbol}, timeout=10)
-            return float(r.json()["price"])
+            r = self.binance_get(sess, "/api/v3/ticker/price", params={"symbol": symbol})
+            r.raise_for_status()
+            return float(decode(r)["price"])
         except Exception as e:
             logging.error(f"{symbol} 바이낸스 가격 조회 실패: {e}")
             return None
@@ -129,17 +360,25 @@ class PriceFetcherThread(QThread):
                 # 그 외의 경우 당일 데이터 사용
                 target_date = today
 
+            # 디스크/메모리에 저장된 기준 시가가 있으면 네트워크 요청 생략
+            cached = self.reference_provider.cached_open(symbol, target_date)
+            if cached is not None:
+                return cached
+
             # 타겟 날짜의 오전 9시 시간 생성
             nine_am = datetime.datetime.combine(target_date, morning_time)
 
+            if self.cycle_deadline.expired():
+                return None
+
             ts = int(nine_am.timestamp() * 1000)
-            url = "https://api.binance.com/api/v3/klines"
-            r = sess.get(url, params={
+            r = self.binance_get(sess, "/api/v3/klines", params={
                 "symbol": symbol, "interval": "1h",
                 "startTime": ts, "endTime": ts + 3600000, "limit": 1
-            }, timeout=10)
+            })
+            r.raise_for_status()
 
-            data = r.json()
+            data = decode(r)
             if data and len(data) > 0:
                 price = float(data[0][1])
                 logging.info(f"{symbol} {target_date} 오전 9시 가격: {price}")
@@ -150,6 +389,266 @@ class PriceFetcherThread(QThread):
         return None
 
     def to_upbit_symbol(self, binance_symbol):
-        if binance_symbol.endswith("USDT"):
-            return "KRW-" + binance_symbol.replace("USDT", "")
-        return None
+        return self.upbit_catalog.to_upbit_symbol(binance_symbol)
+
+
+def create_price_fetcher(config=None):
+    """
+    설정에 맞는 가격 조회기를 만들어 RefreshCoordinator에 연결합니다.
+    창(Overlay)은 이 함수로 조회기를 한 번만 만들어 계속 재사용합니다.
+    - use_streaming: StreamingPriceThread (stream_reference_interval, use_upbit_stream 반영)
+    - fetch_engine == "async": 전용 스레드의 PriceFetchWorker
+    - 그 외: PriceFetcherThread (snapshot_threshold, hedge_binance, transport 반영)
+    모두 fx_source와 refresh_interval을 따르며, 새로고침 요청은 조회 중이면 하나로 합쳐지고
+    다음 새로고침 간격은 API 예산 상태(next_interval)에 맞춰 늘어납니다.
+
+    Args:
+        config: 설정 (기본값: ConfigManager())
+
+    Returns:
+        RefreshCoordinator - start()로 새로고침을 시작하고 close()로 끝냄. 조회기는 coordinator.worker
+    """
+    if config is None:
+        config = ConfigManager()
+    from refresh_coordinator import RefreshCoordinator
+    refresh_interval = config.get("refresh_interval", 2)
+    return RefreshCoordinator(_create_worker(config, refresh_interval), refresh_interval)
+
+
+def _create_worker(config, refresh_interval):
+    symbols = config.get("symbols", [])
+    fx_source = config.get("fx_source", FX_SOURCE_API)
+
+    if config.get("use_streaming", False):
+        from streaming import UPBIT_STREAM_URL, StreamingPriceFeed, StreamingPriceThread
+        if StreamingPriceFeed.available():
+            return StreamingPriceThread(symbols, refresh_interval=refresh_interval,
+                                        reference_interval=config.get("stream_reference_interval", 60),
+                                        upbit_stream_url=(UPBIT_STREAM_URL if config.get("use_upbit_stream", True)
+                                                          else None),
+                                        fx_source=fx_source)
+        logging.warning("aiohttp가 설치되어 있지 않아 스트리밍 대신 REST로 조회합니다")
+
+    if config.get("fetch_engine", "sync") == "async":
+        from fetch_worker import PriceFetchWorker
+        worker = PriceFetchWorker(symbols, engine="async", fx_source=fx_source)
+        # 작업자 스레드는 요청을 기다리며 계속 살아 있음 (조회는 RefreshCoordinator가 요청)
+        worker.start()
+        return worker
+
+    return PriceFetcherThread(symbols, fx_source=fx_source,
+                              snapshot_threshold=config.get("snapshot_threshold", SNAPSHOT_THRESHOLD),
+                              hedge=config.get("hedge_binance", False),
+                              transport=make_transport(config.get("transport", "requests"),
+                                                       session=shared_session()))
+
+
+class Overlay(QWidget):
+    """
+    항상 위에 떠 있는 가격 표시 창.
+    create_price_fetcher()로 설정에 맞는 조회기를 만들고, 새로고침은 RefreshCoordinator의 타이머가
+    API 예산 상태에 맞춘 간격으로 예약합니다. 단계별 중간 결과는 받은 항목만 바로 덮어씁니다.
+    """
+
+    def __init__(self):
+        super().__init__(None, Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.config = ConfigManager()
+        # {심볼: (가격, 아침 대비 변동률, 김치 프리미엄)}
+        self.prices = {}
+        self.aged = {}
+        self.labels = {}
+        self.settings_dialog = None
+        self.refresher = None
+        self._drag_offset = None
+
+        self.panel = QWidget(self)
+        self.panel_layout = QVBoxLayout(self.panel)
+        self.panel_layout.setContentsMargins(8, 4, 8, 4)
+        self.panel_layout.setSpacing(2)
+        self.status_label = QLabel(self.panel)
+        self.status_label.hide()
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.panel)
+
+        self.load_settings()
+        self.apply_appearance()
+        self.build_rows()
+        self.start_fetcher()
+
+    def load_settings(self):
+        """ConfigManager 설정을 창 속성으로 읽어옵니다. (SettingsDialog가 같은 속성을 읽음)"""
+        self.symbols = list(self.config.get("symbols", []))
+        self.refresh_interval = self.config.get("refresh_interval", 2)
+        self.window_width = self.config.get("window_width", 300)
+        self.window_height = self.config.get("window_height", 40)
+        self.opacity_level = self.config.get("opacity", 1.0)
+        self.font_name = self.config.get("font_name", "Segoe UI")
+        self.font_size = self.config.get("font_size", 12)
+        self.use_animations = self.config.get("use_animations", True)
+        self.use_gradient_bg = self.config.get("use_gradient_bg", True)
+        self.use_blur_effect = self.config.get("use_blur_effect", False)
+        self.text_color = self.config.get("text_color", "#FFFFFF")
+        self.background_color = self.config.get("background_color", "rgba(40,40,40,200)")
+        self.positive_color = self.config.get("positive_color", "#4CAF50")
+        self.negative_color = self.config.get("negative_color", "#F44336")
+        self.neutral_color = self.config.get("neutral_color", "#FFA500")
+
+    def apply_appearance(self):
+        self.setGeometry(self.config.get("window_x", 1600), self.config.get("window_y", 50),
+                         self.window_width, self.window_height)
+        self.setMinimumHeight(self.window_height)
+        self.setWindowOpacity(self.opacity_level)
+        self.setFont(QFont(self.font_name, self.font_size))
+        if self.use_gradient_bg:
+            background = (f"qlineargradient(x1:0, y1:0, x2:0, y2:1, "
+                          f"stop:0 {self.background_color}, stop:1 rgba(0,0,0,220))")
+        else:
+            background = self.background_color
+        self.panel.setStyleSheet(f"background: {background}; border-radius: 6px; color: {self.text_color};")
+        for symbol in self.labels:
+            self.render_row(symbol)
+
+    def build_rows(self):
+        """심볼마다 한 줄씩 표시할 라벨을 만듭니다."""
+        for label in self.labels.values():
+            self.panel_layout.removeWidget(label)
+            label.deleteLater()
+        self.panel_layout.removeWidget(self.status_label)
+        self.labels = {}
+        for symbol in self.symbols:
+            label = QLabel(symbol, self.panel)
+            self.panel_layout.addWidget(label)
+            self.labels[symbol] = label
+        self.panel_layout.addWidget(self.status_label)
+        self.adjustSize()
+
+    def start_fetcher(self):
+        """설정에 맞는 조회기를 만들어 새로고침을 시작합니다."""
+        self.refresher = create_price_fetcher(self.config)
+        self.refresher.result_ready.connect(self.update_prices)
+        self.refresher.error_occurred.connect(self.show_error)
+        worker = self.refresher.worker
+        if hasattr(worker, "stage_ready"):
+            worker.stage_ready.connect(self.update_stage)
+        if hasattr(worker, "values_aged"):
+            worker.values_aged.connect(self.update_aged)
+        self.refresher.start()
+
+    def stop_fetcher(self):
+        if self.refresher is not None:
+            self.refresher.close()
+            self.refresher = None
+
+    def update_prices(self, results):
+        """한 번의 새로고침이 끝난 전체 결과"""
+        self.prices = dict(results)
+        self.status_label.hide()
+        for symbol in self.labels:
+            self.render_row(symbol)
+
+    def update_stage(self, stage, results):
+        """조회 도중 단계별 결과 - 이번 단계에서 받은 값만 덮어쓰고 나머지는 이전 값을 유지"""
+        for symbol, values in results.items():
+            previous = self.prices.get(symbol, (None, None, None))
+            self.prices[symbol] = tuple(new if new is not None else old for new, old in zip(values, previous))
+            if symbol in self.labels:
+                self.render_row(symbol)
+
+    def update_aged(self, aged):
+        self.aged = aged
+
+    def show_error(self, message):
+        self.status_label.setText(message)
+        self.status_label.setStyleSheet(f"color: {self.negative_color};")
+        self.status_label.show()
+
+    def render_row(self, symbol):
+        price, morning_diff, kimchi_premium = self.prices.get(symbol, (None, None, None))
+        if price is None:
+            self.labels[symbol].setText(f"{symbol}  -")
+            self.labels[symbol].setStyleSheet(f"color: {self.neutral_color};")
+            return
+
+        text = f"{symbol}  {price:,.2f}" if price >= 1 else f"{symbol}  {price:.6g}"
+        if morning_diff is not None:
+            text += f"  {morning_diff:+.2f}%"
+        if kimchi_premium is not None:
+            text += f"  김프 {kimchi_premium:.2f}%"
+        if symbol in self.aged:
+            # 조회에 실패해 이전 값을 표시 중
+            text += f"  ({int(self.aged[symbol])}초 전)"
+
+        if morning_diff is None or morning_diff == 0:
+            color = self.neutral_color
+        else:
+            color = self.positive_color if morning_diff > 0 else self.negative_color
+        self.labels[symbol].setText(text)
+        self.labels[symbol].setStyleSheet(f"color: {color};")
+
+    def apply_settings(self, settings):
+        """SettingsDialog에서 적용한 설정을 저장하고 창과 조회기에 반영합니다."""
+        changed = {key for key, value in settings.items() if self.config.get(key) != value}
+        self.config.update(settings)
+        self.config.save()
+        self.load_settings()
+        self.apply_appearance()
+        if "symbols" in changed:
+            self.build_rows()
+        if changed.intersection(FETCHER_SETTINGS):
+            # 조회기 종류나 대상이 바뀌면 새로 만듦 (진행 중인 조회는 끝날 때까지 기다림)
+            self.stop_fetcher()
+            self.start_fetcher()
+        elif "refresh_interval" in changed:
+            self.refresher.set_interval(self.refresh_interval)
+
+    def open_settings(self):
+        from settings_dialog import SettingsDialog
+        if self.settings_dialog is None:
+            self.settings_dialog = SettingsDialog(self)
+            self.settings_dialog.settings_applied.connect(self.apply_settings)
+        self.settings_dialog.show()
+        self.settings_dialog.raise_()
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key_F2:
+            self.open_settings()
+        elif event.key() == Qt.Key_F5:
+            self.refresher.trigger("manual")
+        elif event.key() == Qt.Key_Escape:
+            self.showMinimized()
+        elif event.key() == Qt.Key_Q and event.modifiers() & Qt.ControlModifier:
+            self.close()
+        else:
+            super().keyPressEvent(event)
+
+    def wheelEvent(self, event):
+        # 마우스 휠로 투명도 조절
+        step = 0.05 if event.angleDelta().y() > 0 else -0.05
+        self.opacity_level = min(1.0, max(0.1, self.opacity_level + step))
+        self.setWindowOpacity(self.opacity_level)
+        self.config.set("opacity", self.opacity_level)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self._drag_offset = event.globalPos() - self.frameGeometry().topLeft()
+        elif event.button() == Qt.RightButton:
+            self.open_settings()
+
+    def mouseMoveEvent(self, event):
+        if self._drag_offset is not None and event.buttons() & Qt.LeftButton:
+            self.move(event.globalPos() - self._drag_offset)
+
+    def mouseReleaseEvent(self, event):
+        if self._drag_offset is not None:
+            self._drag_offset = None
+            self.config.update({"window_x": self.x(), "window_y": self.y()})
+
+    def closeEvent(self, event):
+        self.stop_fetcher()
+        self.config.save()
+        if self.settings_dialog is not None:
+            self.settings_dialog.close()
+        super().closeEvent(event)
+        QApplication.quit()
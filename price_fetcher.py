@@ -1,118 +1,208 @@
 # price_fetcher.py
-import requests
-import datetime
+import contextlib
 import logging
 from PyQt5.QtCore import QThread, pyqtSignal
-from typing import Dict, List, Tuple, Optional
 
-
-class PriceFetcherThread(QThread):
-    result_ready = pyqtSignal(dict)
-    error_occurred = pyqtSignal(str)
-
-    def __init__(self, symbols):
-        super().__init__()
+from async_fetcher import AsyncPriceFetcher
+from fast_json import decode, decode_time_ms, record_cycle
+from fetch_common import (DEADLINE_METRIC, FX_SOURCE_API, FX_SOURCE_UPBIT, UPBIT_USDT_MARKET,
+                          CycleDeadline, PriceTable, aged_symbols, build_results, fill_last_known_good,
+                          morning_target, resolve_endpoints, stage_results)
+from fx_provider import get_fx_provider
+from metrics import Metrics
+from rate_limiter import GovernedSession
+from reference_prices import get_reference_provider
+from retry_policy import get_retry_policy
+from upbit_markets import chunk_markets, get_upbit_catalog
+
+
+class PriceFetcher:
+    """
+    가격 조회 로직. 스레드와 무관하게 재사용할 수 있으며,
+    session을 넘기면 새로고침마다 연결을 새로 맺지 않고 그 세션을 계속 사용합니다.
+    """
+
+    def __init__(self, symbols, engine="sync", endpoints=None, reference_provider=None,
+                 fx_provider=None, fx_source=FX_SOURCE_API, session=None, upbit_catalog=None,
+                 on_stage=None, deadline=None, retry_policy=None, book=None):
         self.symbols = symbols
-
-    def run(self):
-        try:
-            results = self.fetch()
-            self.result_ready.emit(results)
-        except Exception as e:
-            logging.error(f"가격 가져오기 실패: {str(e)}")
-            self.error_occurred.emit(f"가격 업데이트에 실패했습니다: {str(e)}")
+        self.engine = engine
+        self.endpoints = resolve_endpoints(endpoints)
+        self.reference_provider = reference_provider or get_reference_provider(self.endpoints['binance'])
+        self.fx_provider = fx_provider or get_fx_provider(self.endpoints['fx'])
+        self.fx_source = fx_source
+        self.session = session
+        self.upbit_catalog = upbit_catalog or get_upbit_catalog(self.endpoints['upbit'])
+        # 단계별 중간 결과 콜백 (AsyncPriceFetcher.on_stage와 같음)
+        self.on_stage = on_stage
+        # 결과를 바로 써넣을 QuoteBook - 있으면 단계별로 book을 갱신하고 바뀐 심볼만 on_stage로 보냄
+        self.book = book
+        # 조회 1회의 시간 예산(초) - 지나면 남은 요청은 보내지 않고 받은 결과만 반환
+        self.deadline = deadline
+        self.cycle_deadline = CycleDeadline()
+        # 요청별 재시도 정책 (일시적 오류는 같은 조회 안에서 다시 보냄)
+        self.retry_policy = retry_policy or get_retry_policy()
+        # 심볼이 많을 때 쓰는 계산용 배열 (조회기와 함께 유지되고 심볼 목록이 바뀔 때만 다시 만듦)
+        self.price_table = PriceTable()
+        # 조회에 실패해 마지막 정상 값으로 채운 심볼의 {심볼: 값의 나이(초)}
+        self.aged = {}
+        # 비동기 엔진 조회기 - 한 번 만들어 계속 재사용 (계산용 배열 등 조회기가 들고 있는 상태를 유지)
+        self._async_fetcher = None
 
     def fetch(self):
-        results = {}
-        usd_to_krw = self.fetch_usd_krw_rate()
-        with requests.Session() as sess:
+        if self.engine == "async":
+            if AsyncPriceFetcher.available():
+                fetcher = self.async_fetcher()
+                results = fetcher.fetch()
+                self.aged = fetcher.aged
+                return results
+            logging.warning("aiohttp가 설치되어 있지 않아 동기 엔진으로 조회합니다")
+        return self.fetch_sync()
+
+    def async_fetcher(self) -> AsyncPriceFetcher:
+        """이 조회기와 같은 설정의 AsyncPriceFetcher (심볼 목록과 시간 예산은 매번 현재 값으로 맞춤)"""
+        if self._async_fetcher is None:
+            self._async_fetcher = AsyncPriceFetcher(self.symbols, endpoints=self.endpoints,
+                                                    reference_provider=self.reference_provider,
+                                                    fx_provider=self.fx_provider,
+                                                    fx_source=self.fx_source,
+                                                    upbit_catalog=self.upbit_catalog,
+                                                    on_stage=self.on_stage,
+                                                    deadline=self.deadline,
+                                                    book=self.book)
+        self._async_fetcher.symbols = self.symbols
+        self._async_fetcher.deadline = self.deadline
+        return self._async_fetcher
+
+    def fetch_sync(self):
+        return build_results(self.symbols, **self.fetch_inputs(), table=self.price_table)
+
+    def fetch_inputs(self):
+        """결과 조합에 필요한 원시 입력(가격/시가/업비트 시세/환율)을 조회합니다. (QuoteBook.apply의 인자)"""
+        self.cycle_deadline = deadline = CycleDeadline(self.deadline)
+        decode_start = decode_time_ms()
+        usd_to_krw = None
+        # 공유 세션이 있으면 그대로 쓰고(연결 재사용), 없으면 이번 조회용 세션을 만듦
+        session_ctx = contextlib.nullcontext(self.session) if self.session else GovernedSession()
+        with session_ctx as sess:
             binance_map = {}
-            upbit_map = {}
             upbit_symbols = {}
             morning_map = {}
 
+            # 바이낸스 가격을 가장 먼저 받아 내보내고, 업비트 마켓 목록/환율은 그 뒤에 확인
+            for symbol in self.symbols:
+                binance_map[symbol] = self.fetch_binance_price(sess, symbol)
+            # 받지 못한 가격은 마지막 정상 값으로 채움 (lkg_max_age보다 오래된 값은 버림)
+            # book이 있으면 채우지 않음 - book이 이전 값을 원래 시각과 stale 표시 그대로 유지
+            binance_ages = fill_last_known_good(self.endpoints['binance'], binance_map, self.symbols,
+                                                fill=self.book is None)
+            inputs = {"binance_map": binance_map, "morning_map": {}, "upbit_symbols": {},
+                      "upbit_price_map": {}, "usd_to_krw": 0.0}
+            self._emit_stage("prices", inputs)
+
+            # 업비트 상장 마켓 목록은 하루 한 번만 새로 받음
+            self.upbit_catalog.refresh(sess, self.endpoints['upbit'], timeout=deadline.timeout())
             for symbol in self.symbols:
-                binance_price = self.fetch_binance_price(sess, symbol)
-                morning_price = self.fetch_morning_price(sess, symbol)
                 up_sym = self.to_upbit_symbol(symbol)
-                binance_map[symbol] = binance_price
-                morning_map[symbol] = morning_price
                 if up_sym:
                     upbit_symbols[symbol] = up_sym
 
+            # 기준 시가는 거래일 단위로 캐시되므로 하루 한 번 일괄 조회로 충분함
+            morning_map = self.reference_provider.get_opens(
+                sess, self.symbols, self.endpoints['binance'], fallback=self.fetch_morning_price,
+                deadline=deadline)
+            inputs["morning_map"] = morning_map
+            self._emit_stage("reference", inputs)
+
             upbit_markets = list(upbit_symbols.values())
-            upbit_price_map = {}
-            if upbit_markets:
-                try:
-                    url = "https://api.upbit.com/v1/ticker"
-                    r = sess.get(url, params={"markets": ",".join(upbit_markets)})
-                    for item in r.json():
-                        upbit_price_map[item["market"]] = float(item["trade_price"])
-                except Exception as e:
-                    logging.error(f"Upbit 조회 실패: {e}")
-
-        for symbol in self.symbols:
-            binance_price = binance_map.get(symbol)
-            morning_price = morning_map.get(symbol)
-            kimchi_premium = None
-            morning_diff = None
-
-            if binance_price is not None and morning_price and morning_price > 0:
-                diff = binance_price - morning_price
-                morning_diff = (diff / morning_price) * 100
-
-            if binance_price is not None and usd_to_krw > 0:
-                up_sym = upbit_symbols.get(symbol)
-                if up_sym and up_sym in upbit_price_map:
-                    up_price = upbit_price_map[up_sym]
-                    kimchi_premium = ((up_price - (binance_price * usd_to_krw))
-                                      / (binance_price * usd_to_krw)) * 100
-
-            results[symbol] = (binance_price, morning_diff, kimchi_premium)
-
-        return results
+            if self.fx_source == FX_SOURCE_UPBIT:
+                # 환율도 같은 업비트 일괄 요청의 KRW-USDT 체결가로 계산
+                upbit_markets.append(UPBIT_USDT_MARKET)
+            else:
+                usd_to_krw = self.fetch_usd_krw_rate()
+            upbit_price_map = self.fetch_upbit_prices(sess, upbit_markets)
+            upbit_ages = fill_last_known_good(self.endpoints['upbit'], upbit_price_map, upbit_markets,
+                                              fill=self.book is None)
+        self.aged = aged_symbols(binance_ages, upbit_symbols, upbit_ages)
+
+        if deadline.expired():
+            # 받지 못한 항목은 마지막 정상 값으로 채워지거나 None으로 남아 QuoteBook에서 stale로 표시됨
+            Metrics().incr(DEADLINE_METRIC)
+            logging.warning(f"조회 시간 예산({self.deadline:.1f}초) 초과 - 받은 결과만 표시합니다")
+        if usd_to_krw is None:
+            # KRW-USDT 시세를 받지 못했으면 외부 환율 API로 대체
+            usd_to_krw = upbit_price_map.get(UPBIT_USDT_MARKET) or self.fetch_usd_krw_rate()
+
+        record_cycle(decode_start)
+        return {"binance_map": binance_map, "morning_map": morning_map, "upbit_symbols": upbit_symbols,
+                "upbit_price_map": upbit_price_map, "usd_to_krw": usd_to_krw}
+
+    def _emit_stage(self, stage, inputs):
+        if self.on_stage is not None:
+            self.on_stage(stage, stage_results(self.symbols, inputs, self.book, self.price_table))
 
     def fetch_usd_krw_rate(self):
-        try:
-            r = requests.get("https://api.exchangerate-api.com/v4/latest/USD")
-            return float(r.json()["rates"]["KRW"])
-        except Exception as e:
-            logging.error(f"환율 정보 가져오기 실패: {e}")
-            return 0.0
+        # TTL 캐시된 값을 바로 반환하고, 만료되었으면 백그라운드에서 갱신
+        return self.fx_provider.get_rate()
+
+    def get(self, sess, url, params=None):
+        """
+        재시도 정책에 따라 GET 요청을 보냅니다. 타임아웃은 시도마다 남은 조회 시간으로 줄어듭니다.
+
+        Returns:
+            마지막 응답 (400/404처럼 다시 보내지 않는 오류 응답도 그대로 반환)
+        """
+        return self.retry_policy.call(
+            lambda: sess.get(url, params=params, timeout=self.cycle_deadline.timeout()),
+            self.cycle_deadline, label=url)
 
     def fetch_binance_price(self, sess, symbol):
+        if self.cycle_deadline.expired():
+            return None
         try:
-            r = sess.get("https://api.binance.com/api/v3/ticker/price", params={"symbol": symbol})
-            return float(r.json()["price"])
+            r = self.get(sess, f"{self.endpoints['binance']}/api/v3/ticker/price", {"symbol": symbol})
+            r.raise_for_status()
+            return float(decode(r)["price"])
         except Exception as e:
             logging.error(f"{symbol} 바이낸스 가격 조회 실패: {e}")
             return None
 
+    def fetch_upbit_prices(self, sess, markets):
+        upbit_price_map = {}
+        # 마켓이 많으면 URL 길이 제한에 걸리지 않도록 나눠서 요청
+        for chunk in chunk_markets(markets):
+            if self.cycle_deadline.expired():
+                break
+            try:
+                r = self.get(sess, f"{self.endpoints['upbit']}/v1/ticker", {"markets": ",".join(chunk)})
+                if r.status_code == 404:
+                    # 없는 마켓이 섞임 - 상장 폐지 등으로 목록이 바뀌었을 수 있으니 다음 조회 때 다시 받음
+                    self.upbit_catalog.invalidate()
+                r.raise_for_status()
+                for item in decode(r):
+                    upbit_price_map[item["market"]] = float(item["trade_price"])
+            except Exception as e:
+                logging.error(f"Upbit 조회 실패: {e}")
+        return upbit_price_map
+
     def fetch_morning_price(self, sess, symbol):
         try:
-            today = datetime.date.today()
-            now = datetime.datetime.now()
-            morning_time = datetime.time(9, 0)  # 오전 9시
-
-            # 현재 시간이 자정과 오전 9시 사이인지 확인
-            if now.time() < morning_time:
-                # 자정과 오전 9시 사이라면 전날 데이터 사용
-                target_date = today - datetime.timedelta(days=1)
-            else:
-                # 그 외의 경우 당일 데이터 사용
-                target_date = today
+            target_date, ts = morning_target()
+            # 디스크/메모리에 저장된 기준 시가가 있으면 네트워크 요청 생략
+            cached = self.reference_provider.cached_open(symbol, target_date)
+            if cached is not None:
+                return cached
 
-            # 타겟 날짜의 오전 9시 시간 생성
-            nine_am = datetime.datetime.combine(target_date, morning_time)
+            if self.cycle_deadline.expired():
+                return None
 
-            ts = int(nine_am.timestamp() * 1000)
-            url = "https://api.binance.com/api/v3/klines"
-            r = sess.get(url, params={
+            r = self.get(sess, f"{self.endpoints['binance']}/api/v3/klines", {
                 "symbol": symbol, "interval": "1h",
                 "startTime": ts, "endTime": ts + 3600000, "limit": 1
             })
+            r.raise_for_status()
 
-            data = r.json()
+            data = decode(r)
             if data and len(data) > 0:
                 price = float(data[0][1])
                 logging.info(f"{symbol} {target_date} 오전 9시 가격: {price}")
@@ -123,6 +213,31 @@ class PriceFetcherThread(QThread):
         return None
 
     def to_upbit_symbol(self, binance_symbol):
-        if binance_symbol.endswith("USDT"):
-            return "KRW-" + binance_symbol.replace("USDT", "")
-        return None
\ No newline at end of file
+        return self.upbit_catalog.to_upbit_symbol(binance_symbol)
+
+
+class PriceFetcherThread(QThread):
+    """새로고침 1회를 별도 스레드에서 실행합니다. 인자는 PriceFetcher와 같습니다."""
+    result_ready = pyqtSignal(dict)
+    error_occurred = pyqtSignal(str)
+    # 조회에 실패해 마지막 정상 값으로 채운 심볼의 {심볼: 값의 나이(초)}
+    values_aged = pyqtSignal(dict)
+
+    def __init__(self, symbols, **kwargs):
+        super().__init__()
+        self.symbols = symbols
+        self.fetcher = PriceFetcher(symbols, **kwargs)
+
+    def run(self):
+        try:
+            results = self.fetch()
+            self.result_ready.emit(results)
+            if self.fetcher.aged:
+                self.values_aged.emit(self.fetcher.aged)
+        except Exception as e:
+            logging.error(f"가격 가져오기 실패: {str(e)}")
+            self.error_occurred.emit(f"가격 업데이트에 실패했습니다: {str(e)}")
+
+    def fetch(self):
+        return self.fetcher.fetch()
+
@@ -0,0 +1,169 @@
+# quotes.py
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from fetch_common import quote_values
+
+# Quote.stale 비트 플래그 - 이번 조회에서 값을 새로 받지 못한 항목
+STALE_PRICE = 1
+STALE_REFERENCE = 2
+STALE_PREMIUM = 4
+
+
+class Quote:
+    """
+    심볼 하나의 시세 레코드.
+    __slots__로 인스턴스 딕셔너리 없이 저장하고, 조회마다 새로 만들지 않고 값만 바꿉니다.
+    값을 받지 못한 항목은 이전 값을 그대로 두고 stale 플래그를 세웁니다.
+    """
+    __slots__ = ("symbol", "price", "reference", "morning_diff", "kimchi_premium",
+                 "price_time", "reference_time", "premium_time", "stale")
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.price: Optional[float] = None
+        self.reference: Optional[float] = None
+        self.morning_diff: Optional[float] = None
+        self.kimchi_premium: Optional[float] = None
+        # 항목별로 마지막으로 값을 받은 시각 (time.time(), 받은 적 없으면 0)
+        self.price_time = 0.0
+        self.reference_time = 0.0
+        self.premium_time = 0.0
+        self.stale = 0
+
+    def as_tuple(self) -> tuple:
+        """result_ready 형식의 (가격, 아침 대비 변동률, 김치 프리미엄)"""
+        return self.price, self.morning_diff, self.kimchi_premium
+
+    def is_stale(self, flag: int) -> bool:
+        return bool(self.stale & flag)
+
+    def __repr__(self):
+        return (f"Quote({self.symbol}, price={self.price}, diff={self.morning_diff}, "
+                f"premium={self.kimchi_premium}, stale={self.stale})")
+
+
+class QuoteBook:
+    """
+    심볼별 Quote 모음.
+    조회 스레드가 결과(update) 또는 원시 입력(apply)으로 갱신하고 알림/화면 갱신은 같은 레코드를 읽습니다.
+    update()/apply()는 실제로 값이 바뀐 심볼만 돌려주므로 바뀐 셀만 다시 그릴 수 있습니다.
+    """
+
+    def __init__(self, symbols: Iterable[str] = ()):
+        self._quotes: Dict[str, Quote] = {}
+        self.set_symbols(symbols)
+
+    def set_symbols(self, symbols: Iterable[str]) -> None:
+        """심볼 목록을 바꿉니다. 남아 있는 심볼의 레코드는 그대로 유지됩니다."""
+        symbols = list(symbols)
+        self._quotes = {s: self._quotes.get(s) or Quote(s) for s in symbols}
+
+    def get(self, symbol: str) -> Optional[Quote]:
+        return self._quotes.get(symbol)
+
+    def __iter__(self) -> Iterator[Quote]:
+        return iter(self._quotes.values())
+
+    def __len__(self) -> int:
+        return len(self._quotes)
+
+    def update(self, results: Dict[str, tuple], morning_map: Optional[Dict[str, float]] = None,
+               now: Optional[float] = None, partial: bool = False) -> List[str]:
+        """
+        조회 결과로 레코드를 제자리에서 갱신합니다.
+
+        Args:
+            results: {심볼: (가격, 아침 대비 변동률, 김치 프리미엄)}
+            morning_map: 기준 시가 {심볼: 시가} (있으면 reference에 기록)
+            now: 기준 시각 (기본값: 현재 시각)
+            partial: 조회 중간 단계의 결과인지 - 아직 오지 않은 항목(None)은 stale로 표시하지 않음
+
+        Returns:
+            값이 바뀐 심볼 목록
+        """
+        now = time.time() if now is None else now
+        morning_map = morning_map or {}
+        changed = []
+        for symbol, (price, morning_diff, kimchi_premium) in results.items():
+            if self._store(symbol, price, morning_map.get(symbol), morning_diff, kimchi_premium, now, partial):
+                changed.append(symbol)
+        return changed
+
+    def apply(self, symbols: Iterable[str], binance_map: Dict[str, Optional[float]],
+              morning_map: Dict[str, float], upbit_symbols: Dict[str, str],
+              upbit_price_map: Dict[str, float], usd_to_krw: float,
+              now: Optional[float] = None, partial: bool = False,
+              max_age: Optional[float] = None) -> List[str]:
+        """
+        조회기가 받은 원시 입력으로 레코드를 바로 계산해 갱신합니다.
+        결과 딕셔너리를 거치지 않으며, 기준 시가도 reference에 기록합니다.
+
+        Args:
+            symbols: 갱신할 심볼 목록
+            binance_map, morning_map, upbit_symbols, upbit_price_map, usd_to_krw: build_results의 인자와 같음
+            now: 기준 시각 (기본값: 현재 시각)
+            partial: 조회 중간 단계의 입력인지 (update와 같음)
+            max_age: 이번에 받지 못해 이전 값을 유지하는 항목의 최대 나이(초) - 더 오래되면 None으로 비움
+                (LastKnownGoodStore의 lkg_max_age와 같은 기준)
+
+        Returns:
+            값이 바뀐 심볼 목록
+        """
+        now = time.time() if now is None else now
+        changed = []
+        for symbol in symbols:
+            price = binance_map.get(symbol)
+            reference = morning_map.get(symbol)
+            up_sym = upbit_symbols.get(symbol)
+            up_price = upbit_price_map.get(up_sym) if up_sym else None
+            morning_diff, kimchi_premium = quote_values(price, reference, up_price, usd_to_krw)
+            if self._store(symbol, price, reference, morning_diff, kimchi_premium, now, partial, max_age):
+                changed.append(symbol)
+        return changed
+
+    def _store(self, symbol, price, reference, morning_diff, kimchi_premium, now, partial,
+               max_age=None) -> bool:
+        """레코드 하나를 갱신하고 값이나 stale 플래그가 바뀌었는지 반환합니다."""
+        quote = self._quotes.get(symbol)
+        if quote is None:
+            quote = self._quotes[symbol] = Quote(symbol)
+        before = quote.as_tuple()
+        stale = 0
+
+        if price is not None:
+            quote.price = price
+            quote.price_time = now
+        else:
+            stale |= STALE_PRICE
+            if max_age is not None and now - quote.price_time > max_age:
+                quote.price = None
+
+        if morning_diff is not None:
+            quote.morning_diff = morning_diff
+            quote.reference_time = now
+            if reference is not None:
+                quote.reference = reference
+        else:
+            stale |= STALE_REFERENCE
+            if max_age is not None and now - quote.reference_time > max_age:
+                quote.morning_diff = None
+
+        if kimchi_premium is not None:
+            quote.kimchi_premium = kimchi_premium
+            quote.premium_time = now
+        else:
+            stale |= STALE_PREMIUM
+            if max_age is not None and now - quote.premium_time > max_age:
+                quote.kimchi_premium = None
+
+        if partial:
+            # 값을 받은 항목만 stale 해제
+            stale = quote.stale & stale
+        changed = quote.as_tuple() != before or quote.stale != stale
+        quote.stale = stale
+        return changed
+
+    def results(self) -> Dict[str, tuple]:
+        """기존 result_ready 형식으로 변환합니다."""
+        return {s: q.as_tuple() for s, q in self._quotes.items()}
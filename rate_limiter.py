@@ -0,0 +1,334 @@
+# rate_limiter.py
+import asyncio
+import email.utils
+import json
+import logging
+import threading
+import time
+import urllib.parse
+from typing import Dict, Optional, Tuple
+
+import requests
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp가 없으면 asyncio 엔진용 TraceConfig는 쓰지 않음
+    aiohttp = None
+
+from metrics import Metrics
+
+BINANCE = "binance"
+UPBIT = "upbit"
+
+# 거래소별 한도: 바이낸스는 분당 요청 가중치, 업비트는 초당 요청 수
+BINANCE_WEIGHT_LIMIT = 6000
+UPBIT_REQUESTS_PER_SEC = 10
+
+# 우선순위: 가격 조회는 항상 먼저, 기준 시가/메타데이터는 예산이 부족하면 다음 주기로 미룸
+PRIORITY_HIGH = 0
+PRIORITY_LOW = 1
+
+
+class RateLimitDeferred(requests.RequestException):
+    """예산이 부족하거나 차단 중이라 요청을 보내지 않고 미뤘을 때 발생합니다."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        """
+        Args:
+            message: 오류 메시지
+            retry_after: 다시 요청할 수 있을 때까지 남은 시간(초) - 다음 주기로 미룬 요청이면 None
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After 헤더(초 또는 HTTP 날짜)를 기다릴 시간(초)으로 바꿉니다."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def venue_for(url: str) -> Optional[str]:
+    """요청 경로로 거래소를 판별합니다. (바이낸스 /api/v3, 업비트 /v1)"""
+    path = urllib.parse.urlsplit(url).path
+    if path.startswith("/api/v3/"):
+        return BINANCE
+    if path.startswith("/v1/"):
+        return UPBIT
+    return None
+
+
+def request_cost(url: str, params: Optional[Dict] = None) -> Tuple[int, int]:
+    """
+    요청의 예상 가중치와 우선순위를 계산합니다.
+
+    Args:
+        url: 요청 주소 (쿼리 문자열 포함 가능)
+        params: 요청 파라미터
+
+    Returns:
+        (가중치, 우선순위)
+    """
+    parts = urllib.parse.urlsplit(url)
+    query = dict(urllib.parse.parse_qsl(parts.query))
+    query.update(params or {})
+    path = parts.path
+
+    if venue_for(url) == UPBIT:
+        return 1, PRIORITY_HIGH
+    if path == "/api/v3/ticker/price":
+        # 단일 심볼 2, 여러 심볼 또는 전체 시장 4
+        return (2 if "symbol" in query else 4), PRIORITY_HIGH
+    if path == "/api/v3/ticker/tradingDay":
+        try:
+            count = len(json.loads(query.get("symbols", "[]")))
+        except ValueError:
+            count = 1
+        return min(200, 4 * max(1, count)), PRIORITY_LOW
+    if path == "/api/v3/exchangeInfo":
+        return 20, PRIORITY_LOW
+    if path == "/api/v3/klines":
+        return 2, PRIORITY_LOW
+    return 1, PRIORITY_HIGH
+
+
+class TokenBucket:
+    """일정 속도로 다시 채워지는 토큰 버킷"""
+
+    def __init__(self, capacity: float, refill_per_sec: float):
+        self.capacity = capacity
+        self.refill_per_sec = refill_per_sec
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.refill_per_sec)
+        self._updated = now
+
+    def available(self) -> float:
+        self._refill(time.monotonic())
+        return self.tokens
+
+    def wait_time(self, cost: float) -> float:
+        """cost만큼 토큰이 모일 때까지 기다려야 하는 시간(초)"""
+        missing = cost - self.available()
+        return max(0.0, missing / self.refill_per_sec)
+
+    def consume(self, cost: float) -> None:
+        self._refill(time.monotonic())
+        self.tokens -= cost
+
+    def sync(self, tokens: float) -> None:
+        """서버가 알려준 남은 예산으로 토큰 수를 맞춥니다."""
+        self._refill(time.monotonic())
+        self.tokens = max(0.0, min(self.capacity, tokens))
+
+
+class RequestGovernor:
+    """
+    거래소 API 예산 관리자.
+    바이낸스 X-MBX-USED-WEIGHT-1M, 업비트 Remaining-Req 헤더로 거래소별 토큰 버킷을 맞추고,
+    예산이 부족하면 요청을 잠시 기다리게 하거나 우선순위가 낮은 요청을 다음 주기로 미룹니다.
+    429/418 응답을 받으면 Retry-After 동안 해당 거래소 요청을 모두 멈춥니다.
+    ConfigManager와 같이 싱글톤으로 모든 조회 경로가 같은 예산을 공유합니다.
+    """
+    _instance = None
+    # 한도 대비 이 비율 이상 사용하면 새로고침 주기를 늘림
+    TARGET_USAGE = 0.7
+    # 남은 예산이 이 비율 아래면 우선순위 낮은 요청을 미룸
+    LOW_PRIORITY_RESERVE = 0.2
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(RequestGovernor, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._lock = threading.Lock()
+        self.buckets = {
+            BINANCE: TokenBucket(BINANCE_WEIGHT_LIMIT, BINANCE_WEIGHT_LIMIT / 60),
+            UPBIT: TokenBucket(UPBIT_REQUESTS_PER_SEC, UPBIT_REQUESTS_PER_SEC),
+        }
+        self.banned_until = {BINANCE: 0.0, UPBIT: 0.0}
+        self.used_weight = 0
+        self._initialized = True
+
+    def _plan(self, venue: str, cost: float, priority: int) -> Tuple[bool, float]:
+        """(요청 가능 여부, 기다려야 할 시간)을 계산합니다. lock 안에서 호출."""
+        now = time.monotonic()
+        if self.banned_until[venue] > now:
+            return False, self.banned_until[venue] - now
+        bucket = self.buckets[venue]
+        if priority == PRIORITY_LOW and bucket.available() - cost < bucket.capacity * self.LOW_PRIORITY_RESERVE:
+            return False, 0.0
+        return True, bucket.wait_time(cost)
+
+    def acquire(self, venue: str, cost: float, priority: int = PRIORITY_HIGH, max_wait: float = 1.0) -> None:
+        """
+        요청 전에 예산을 확보합니다. 필요하면 max_wait까지 기다립니다.
+
+        Raises:
+            RateLimitDeferred: 차단 중이거나 예산이 부족해 요청을 미뤄야 할 때
+        """
+        with self._lock:
+            allowed, wait = self._plan(venue, cost, priority)
+            if allowed and wait <= max_wait:
+                self.buckets[venue].consume(cost)
+        self._check(venue, allowed, wait, max_wait)
+        if wait > 0:
+            time.sleep(wait)
+        self._publish(venue)
+
+    async def acquire_async(self, venue: str, cost: float, priority: int = PRIORITY_HIGH,
+                            max_wait: float = 1.0) -> None:
+        """acquire의 asyncio 버전"""
+        with self._lock:
+            allowed, wait = self._plan(venue, cost, priority)
+            if allowed and wait <= max_wait:
+                self.buckets[venue].consume(cost)
+        self._check(venue, allowed, wait, max_wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._publish(venue)
+
+    def _check(self, venue: str, allowed: bool, wait: float, max_wait: float) -> None:
+        if not allowed or wait > max_wait:
+            Metrics().incr(f"governor.{venue}.deferred")
+            reason = "차단 중" if self.banned_until[venue] > time.monotonic() else "예산 부족"
+            # 우선순위가 낮아 예산을 남겨 두려고 미룬 요청은 다음 주기에 다시 보냄
+            raise RateLimitDeferred(f"{venue} 요청 보류 ({reason}, {wait:.1f}초)",
+                                    retry_after=wait if allowed or wait > 0 else None)
+
+    def observe(self, venue: str, status: int, headers) -> None:
+        """
+        응답 헤더로 남은 예산을 갱신합니다.
+
+        Args:
+            venue: 거래소
+            status: HTTP 상태 코드
+            headers: 응답 헤더 (대소문자 구분 없는 매핑)
+        """
+        with self._lock:
+            if venue == BINANCE:
+                used = headers.get("X-MBX-USED-WEIGHT-1M")
+                if used is not None:
+                    self.used_weight = int(used)
+                    self.buckets[BINANCE].sync(BINANCE_WEIGHT_LIMIT - self.used_weight)
+                    if self.used_weight > BINANCE_WEIGHT_LIMIT * self.TARGET_USAGE:
+                        logging.warning(f"바이낸스 가중치 사용량 높음: {self.used_weight}/{BINANCE_WEIGHT_LIMIT}")
+            elif venue == UPBIT:
+                remaining = self._parse_remaining_req(headers.get("Remaining-Req"))
+                if remaining is not None:
+                    self.buckets[UPBIT].sync(remaining)
+
+            if status in (418, 429):
+                # Retry-After는 초 또는 HTTP 날짜 - 없거나 해석할 수 없으면 60초
+                delay = parse_retry_after(headers.get("Retry-After"))
+                if delay is None:
+                    delay = 60.0
+                self.banned_until[venue] = time.monotonic() + delay
+                Metrics().incr(f"governor.{venue}.rate_limited")
+                logging.error(f"{venue} 요청 한도 초과({status}), {delay:.0f}초 동안 요청 중지")
+        self._publish(venue)
+
+    @staticmethod
+    def _parse_remaining_req(value: Optional[str]) -> Optional[int]:
+        """'group=default; min=1800; sec=29' 형식에서 초당 남은 요청 수를 꺼냅니다."""
+        if not value:
+            return None
+        for part in value.split(";"):
+            key, _, number = part.strip().partition("=")
+            if key == "sec" and number.isdigit():
+                return int(number)
+        return None
+
+    def stretch_factor(self) -> float:
+        """현재 사용량 기준으로 새로고침 주기를 몇 배 늘려야 하는지 반환합니다. (1.0 = 그대로)"""
+        with self._lock:
+            usage = self.used_weight / BINANCE_WEIGHT_LIMIT
+        return max(1.0, usage / self.TARGET_USAGE)
+
+    def recommended_interval(self, base_interval: float) -> float:
+        """
+        차단을 피하기 위한 다음 새로고침 간격을 반환합니다.
+
+        Args:
+            base_interval: 설정된 새로고침 간격(초)
+
+        Returns:
+            늘어난 간격(초) - 차단 중이면 차단이 풀릴 때까지
+        """
+        interval = base_interval * self.stretch_factor()
+        now = time.monotonic()
+        with self._lock:
+            ban = max(self.banned_until.values()) - now
+        interval = max(interval, ban)
+        if interval > base_interval:
+            logging.info(f"API 예산 보호를 위해 새로고침 간격 {base_interval}초 → {interval:.1f}초")
+        Metrics().set_gauge("governor.recommended_interval", interval)
+        return interval
+
+    def state(self) -> Dict[str, Dict]:
+        """거래소별 남은 토큰과 차단 상태"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                venue: {
+                    "tokens": round(bucket.available(), 1),
+                    "capacity": bucket.capacity,
+                    "banned_for": max(0.0, round(self.banned_until[venue] - now, 1)),
+                }
+                for venue, bucket in self.buckets.items()
+            }
+
+    def _publish(self, venue: str) -> None:
+        metrics = Metrics()
+        bucket = self.buckets[venue]
+        metrics.set_gauge(f"governor.{venue}.tokens", round(bucket.available(), 1))
+        if venue == BINANCE:
+            metrics.set_gauge("governor.binance.used_weight_1m", self.used_weight)
+
+    def trace_config(self):
+        """aiohttp 세션에 붙여 요청 전 예산 확보, 응답 후 헤더 반영을 하는 TraceConfig를 만듭니다."""
+        async def on_request_start(session, context, params):
+            venue = venue_for(str(params.url))
+            if venue:
+                cost, priority = request_cost(str(params.url))
+                await self.acquire_async(venue, cost, priority)
+
+        async def on_request_end(session, context, params):
+            venue = venue_for(str(params.url))
+            if venue:
+                self.observe(venue, params.response.status, params.response.headers)
+
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(on_request_start)
+        trace.on_request_end.append(on_request_end)
+        return trace
+
+
+class GovernedSession(requests.Session):
+    """모든 요청이 RequestGovernor를 거치는 requests 세션"""
+
+    def request(self, method, url, *args, **kwargs):
+        governor = RequestGovernor()
+        venue = venue_for(url)
+        if venue:
+            cost, priority = request_cost(url, kwargs.get("params"))
+            governor.acquire(venue, cost, priority)
+        r = super().request(method, url, *args, **kwargs)
+        if venue:
+            governor.observe(venue, r.status_code, r.headers)
+        return r
@@ -0,0 +1,252 @@
+# reference_prices.py
+import asyncio
+import datetime
+import json
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fast_json import decode, decode_async
+from fetch_common import DEFAULT_ENDPOINTS, CycleDeadline, morning_target
+from utils import SharedInstances, cache_path, load_json_cache, save_json_cache
+
+# ticker/tradingDay 한 번에 보낼 수 있는 최대 심볼 수
+TRADING_DAY_BATCH = 100
+
+
+def trading_day_timezone(now: Optional[datetime.datetime] = None) -> str:
+    """
+    오전 9시(로컬)에 시작하는 거래일을 얻기 위한 ticker/tradingDay의 timeZone 값을 반환합니다.
+    tradingDay는 지정한 UTC 오프셋의 자정에 하루가 시작하므로 로컬 오프셋에서 9시간을 뺍니다.
+    """
+    now = now or datetime.datetime.now()
+    offset = now.astimezone().utcoffset() or datetime.timedelta(0)
+    minutes = int(offset.total_seconds() // 60) - 9 * 60
+    sign = "-" if minutes < 0 else ""
+    hours, mins = divmod(abs(minutes), 60)
+    return f"{sign}{hours}:{mins:02d}" if mins else f"{sign}{hours}"
+
+
+class ReferencePriceStore:
+    """
+    마감된 기준 캔들(오전 9시 시가)을 디스크에 보관하는 저장소.
+    settings.json과 같은 폴더(~/.myCryptoOverlay)에 (거래소, 심볼, 거래일) 키로 저장하며,
+    오전 9시에 거래일이 바뀌면 지난 항목은 자동으로 버려집니다.
+    """
+    FILE_NAME = "reference_prices.json"
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: 저장 파일 경로 (기본값: 설정 파일과 같은 폴더)
+        """
+        self._path = path
+        self._entries: Optional[Dict[str, Dict]] = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        if self._path is None:
+            self._path = cache_path(self.FILE_NAME)
+        return self._path
+
+    @staticmethod
+    def _key(venue: str, symbol: str, target_date: datetime.date) -> str:
+        return f"{venue}|{symbol}|{target_date.isoformat()}"
+
+    def _load(self, target_date: datetime.date) -> Dict[str, Dict]:
+        if self._entries is None:
+            self._entries = load_json_cache(self.path, "기준 시가 캐시", dict) or {}
+        # 거래일이 바뀌었으면 지난 항목 정리
+        suffix = "|" + target_date.isoformat()
+        expired = [key for key in self._entries if not key.endswith(suffix)]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._dirty = True
+        return self._entries
+
+    def get(self, venue: str, symbol: str, target_date: datetime.date) -> Optional[float]:
+        with self._lock:
+            entry = self._load(target_date).get(self._key(venue, symbol, target_date))
+        return entry["open"] if entry else None
+
+    def put(self, venue: str, symbol: str, target_date: datetime.date, price: float, open_time: int) -> None:
+        with self._lock:
+            self._load(target_date)[self._key(venue, symbol, target_date)] = {
+                "open": price, "open_time": open_time
+            }
+            self._dirty = True
+
+    def flush(self) -> None:
+        """변경된 내용이 있으면 파일에 저장합니다."""
+        with self._lock:
+            if not self._dirty or self._entries is None:
+                return
+            if save_json_cache(self.path, self._entries, "기준 시가 캐시", ensure_ascii=False):
+                self._dirty = False
+
+
+class ReferencePriceProvider:
+    """
+    기준 시가(오전 9시 시가) 제공자.
+    ticker/tradingDay 일괄 요청으로 여러 심볼의 시가를 한 번에 가져오고,
+    빠진 심볼만 klines 조회로 보완합니다. 결과는 (심볼, 거래일) 단위로 메모리에 캐시하고,
+    저장소가 주어지면 디스크에도 남겨 재시작 후에도 다시 조회하지 않습니다.
+    """
+
+    def __init__(self, store: Optional[ReferencePriceStore] = None, venue: str = "binance"):
+        """
+        Args:
+            store: 디스크 저장소 (None이면 메모리 캐시만 사용)
+            venue: 저장소 키에 쓸 거래소 이름
+        """
+        self._cache: Dict[Tuple[str, datetime.date], float] = {}
+        self._lock = threading.Lock()
+        self.store_backend = store
+        self.venue = venue
+
+    def cached_open(self, symbol: str, target_date: datetime.date) -> Optional[float]:
+        """메모리 캐시, 디스크 저장소 순으로 기준 시가를 찾습니다. 없으면 None."""
+        with self._lock:
+            price = self._cache.get((symbol, target_date))
+        if price is None and self.store_backend is not None:
+            price = self.store_backend.get(self.venue, symbol, target_date)
+            if price is not None:
+                with self._lock:
+                    self._cache[(symbol, target_date)] = price
+        return price
+
+    def lookup(self, symbols: List[str], target_date: datetime.date) -> Tuple[Dict[str, float], List[str]]:
+        """캐시에 있는 시가와 캐시에 없는 심볼 목록을 반환합니다."""
+        found, missing = {}, []
+        for symbol in symbols:
+            price = self.cached_open(symbol, target_date)
+            if price is None:
+                missing.append(symbol)
+            else:
+                found[symbol] = price
+        return found, missing
+
+    def store(self, symbol: str, target_date: datetime.date, price: float, open_time: int) -> None:
+        with self._lock:
+            # 지난 거래일 항목은 더 이상 쓰이지 않으므로 정리
+            stale = [key for key in self._cache if key[1] != target_date]
+            for key in stale:
+                del self._cache[key]
+            self._cache[(symbol, target_date)] = price
+        if self.store_backend is not None:
+            self.store_backend.put(self.venue, symbol, target_date, price, open_time)
+
+    def flush(self) -> None:
+        if self.store_backend is not None:
+            self.store_backend.flush()
+
+    def trading_day_params(self, symbols: List[str]) -> Dict[str, str]:
+        return {
+            "symbols": json.dumps(symbols, separators=(",", ":")),
+            "timeZone": trading_day_timezone(),
+            "type": "MINI",
+        }
+
+    def parse_trading_day(self, data, ts: int) -> Dict[str, float]:
+        """tradingDay 응답에서 기준 시각에 시작한 거래일의 시가만 골라냅니다."""
+        opens = {}
+        for item in data if isinstance(data, list) else []:
+            if int(item.get("openTime", -1)) == ts:
+                opens[item["symbol"]] = float(item["openPrice"])
+        return opens
+
+    def _chunks(self, symbols: List[str]):
+        for i in range(0, len(symbols), TRADING_DAY_BATCH):
+            yield symbols[i:i + TRADING_DAY_BATCH]
+
+    def get_opens(self, sess, symbols: List[str], binance_url: str,
+                  fallback: Callable, deadline: Optional[CycleDeadline] = None,
+                  map_fn: Optional[Callable] = None) -> Dict[str, Optional[float]]:
+        """
+        심볼별 기준 시가를 반환합니다. (requests 세션 사용)
+
+        Args:
+            sess: requests 세션
+            symbols: 바이낸스 심볼 목록
+            binance_url: 바이낸스 API 주소
+            fallback: 일괄 조회에서 빠진 심볼용 개별 조회 함수 (sess, symbol) -> 가격
+            deadline: 조회 1회의 시간 예산 - 시간이 지나면 캐시에 있는 시가만 반환
+            map_fn: 개별 조회를 실행할 map 함수 (전송 계층의 map을 넘기면 동시에 조회)
+
+        Returns:
+            {심볼: 시가 또는 None}
+        """
+        deadline = deadline or CycleDeadline()
+        target_date, ts = morning_target()
+        opens, missing = self.lookup(symbols, target_date)
+        for chunk in self._chunks(missing):
+            if deadline.expired():
+                break
+            try:
+                r = sess.get(f"{binance_url}/api/v3/ticker/tradingDay",
+                             params=self.trading_day_params(chunk), timeout=deadline.timeout())
+                if r.status_code == 200:
+                    opens.update(self.parse_trading_day(decode(r), ts))
+                else:
+                    logging.warning(f"tradingDay 일괄 조회 실패 ({r.status_code}), klines로 대체")
+            except Exception as e:
+                logging.error(f"tradingDay 일괄 조회 실패: {e}")
+
+        def fetch_one(symbol):
+            return fallback(sess, symbol) if not deadline.expired() else None
+
+        leftovers = [s for s in missing if s not in opens]
+        for symbol, price in zip(leftovers, (map_fn or map)(fetch_one, leftovers)):
+            opens[symbol] = price
+        for symbol in missing:
+            if opens.get(symbol) is not None:
+                self.store(symbol, target_date, opens[symbol], ts)
+        self.flush()
+        return {symbol: opens.get(symbol) for symbol in symbols}
+
+    async def get_opens_async(self, sess, symbols: List[str], binance_url: str,
+                              fallback: Callable) -> Dict[str, Optional[float]]:
+        """get_opens의 aiohttp 버전. fallback은 코루틴 함수여야 합니다."""
+        target_date, ts = morning_target()
+        opens, missing = self.lookup(symbols, target_date)
+
+        async def fetch_chunk(chunk):
+            try:
+                async with sess.get(f"{binance_url}/api/v3/ticker/tradingDay",
+                                    params=self.trading_day_params(chunk)) as r:
+                    if r.status == 200:
+                        return self.parse_trading_day(await decode_async(r), ts)
+                    logging.warning(f"tradingDay 일괄 조회 실패 ({r.status}), klines로 대체")
+            except Exception as e:
+                logging.error(f"tradingDay 일괄 조회 실패: {e}")
+            return {}
+
+        for chunk_opens in await asyncio.gather(*(fetch_chunk(c) for c in self._chunks(missing))):
+            opens.update(chunk_opens)
+
+        leftovers = [s for s in missing if s not in opens]
+        for symbol, price in zip(leftovers, await asyncio.gather(*(fallback(sess, s) for s in leftovers))):
+            opens[symbol] = price
+        for symbol in missing:
+            if opens.get(symbol) is not None:
+                self.store(symbol, target_date, opens[symbol], ts)
+        self.flush()
+        return {symbol: opens.get(symbol) for symbol in symbols}
+
+
+_providers = SharedInstances()
+
+
+def get_reference_provider(url: str = DEFAULT_ENDPOINTS["binance"]) -> ReferencePriceProvider:
+    """
+    주소별 공용 기준 시가 제공자를 반환합니다. (새로고침마다 새로 만들어지는 조회 스레드들이 함께 사용)
+    기본 주소의 제공자만 디스크에 저장합니다. (벤치마크용 목 서버 시가가 섞이지 않도록)
+    """
+    def create():
+        if url == DEFAULT_ENDPOINTS["binance"]:
+            return ReferencePriceProvider(store=ReferencePriceStore())
+        return ReferencePriceProvider(venue=url)
+    return _providers.get(url, create)
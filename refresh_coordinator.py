@@ -0,0 +1,137 @@
+# refresh_coordinator.py
+import logging
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from metrics import Metrics
+
+# 진행 중인 조회에 합쳐진 새로고침 요청 수 / 버려진 오래된 결과 수
+COALESCED_METRIC = "refresh.coalesced"
+STALE_METRIC = "refresh.stale_dropped"
+
+
+class RefreshCoordinator(QObject):
+    """
+    새로고침 요청을 한 번에 하나의 조회만 진행되도록 조정합니다.
+    조회 중에 들어온 요청(F5, 타이머)은 새 조회를 띄우지 않고 "대기 중" 표시 하나로 합쳐
+    현재 조회가 끝나자마자 한 번만 다시 조회합니다. 모든 조회에 순번을 붙여
+    invalidate() 이전에 시작된 조회의 결과나 순서가 뒤바뀐 결과는 버립니다.
+    타이머는 조회가 끝난 뒤부터 다음 간격을 계산하므로 조회가 길어져도 겹치지 않습니다.
+    작업자에는 새로고침 간격에 맞춘 조회 시간 예산을 넘겨, 응답 없는 호스트가 다음 조회를 막지 않게 합니다.
+    """
+    result_ready = pyqtSignal(dict)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, worker, refresh_interval: float = 2, parent=None):
+        """
+        Args:
+            worker: request_refresh(seq), next_interval(base)와 cycle_finished(seq, results, error)를 가진
+                조회 작업자 (PriceFetchWorker, overlay.PriceFetcherThread, StreamingPriceThread)
+            refresh_interval: 기본 새로고침 간격(초)
+            parent: 부모 QObject
+        """
+        super().__init__(parent)
+        self.worker = worker
+        self.refresh_interval = refresh_interval
+        self.coalesced = 0
+        self._seq = 0
+        self._in_flight = None
+        self._pending = False
+        self._min_valid_seq = 0
+        self._last_applied_seq = 0
+        self._running = False
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(lambda: self.trigger("timer"))
+        self.worker.cycle_finished.connect(self._on_cycle_finished)
+        self._apply_deadline()
+
+    def start(self):
+        """즉시 한 번 조회하고 이후 타이머로 계속 새로고침합니다."""
+        self._running = True
+        self.trigger("start")
+
+    def stop(self):
+        self._running = False
+        self._timer.stop()
+        self._pending = False
+
+    def close(self):
+        """새로고침을 멈추고 작업자도 정리합니다. (진행 중인 조회가 끝날 때까지 기다림)"""
+        self.stop()
+        if hasattr(self.worker, "stop"):
+            self.worker.stop()
+
+    def set_interval(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self._apply_deadline()
+
+    def _apply_deadline(self):
+        if hasattr(self.worker, "set_refresh_interval"):
+            self.worker.set_refresh_interval(self.refresh_interval)
+
+    def is_busy(self) -> bool:
+        return self._in_flight is not None
+
+    def trigger(self, reason: str = "manual") -> bool:
+        """
+        새로고침을 요청합니다. GUI 스레드에서 호출해야 합니다.
+
+        Args:
+            reason: 로그용 요청 사유 ("manual", "timer" 등)
+
+        Returns:
+            새 조회를 시작했으면 True, 진행 중인 조회에 합쳐졌으면 False
+        """
+        if self._in_flight is not None:
+            self._pending = True
+            self.coalesced += 1
+            Metrics().incr(COALESCED_METRIC)
+            logging.debug(f"새로고침 요청 합침 ({reason}, 진행 중 #{self._in_flight})")
+            return False
+
+        self._timer.stop()
+        self._seq += 1
+        self._in_flight = self._seq
+        logging.debug(f"새로고침 #{self._seq} 시작 ({reason})")
+        self.worker.request_refresh(self._seq)
+        return True
+
+    def invalidate(self):
+        """
+        심볼 목록 변경 등으로 진행 중인 조회의 결과가 더 이상 맞지 않을 때 호출합니다.
+        진행 중인 조회가 있으면 결과를 버리고 끝나는 즉시 다시 조회합니다.
+        """
+        self._min_valid_seq = self._seq + 1
+        if self._in_flight is not None:
+            self._pending = True
+        else:
+            self.trigger("invalidate")
+
+    def _on_cycle_finished(self, seq, results, error):
+        if seq == self._in_flight:
+            self._in_flight = None
+
+        if seq < self._min_valid_seq or seq <= self._last_applied_seq:
+            Metrics().incr(STALE_METRIC)
+            logging.debug(f"오래된 새로고침 결과 #{seq} 버림")
+            if results is not None and hasattr(self.worker, "request_keyframe"):
+                # 델타 모드라면 버린 델타 때문에 받는 쪽 순번이 끊기므로 다음은 전체 결과로
+                self.worker.request_keyframe()
+        else:
+            self._last_applied_seq = seq
+            if results is not None:
+                self.result_ready.emit(results)
+            else:
+                self.error_occurred.emit(error)
+
+        if self._in_flight is not None:
+            return
+        if self._pending:
+            # 조회 중에 들어온 요청들은 한 번의 조회로 처리
+            self._pending = False
+            self.trigger("pending")
+        elif self._running:
+            interval = self.worker.next_interval(self.refresh_interval)
+            self._timer.start(int(interval * 1000))
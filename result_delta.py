@@ -0,0 +1,120 @@
+# result_delta.py
+from typing import Dict, Iterable, List, Optional
+
+from metrics import Metrics
+
+# 이 횟수마다 한 번은 전체 결과(키프레임)를 보냄
+KEYFRAME_INTERVAL = 30
+
+
+class ResultDeltaEncoder:
+    """
+    조회 결과를 이전 결과와 비교해 바뀐 항목만 담은 델타로 만듭니다.
+    델타는 {"seq", "keyframe", "changed", "removed"} 형식이며, keyframe_interval마다
+    또는 request_keyframe() 이후에는 전체 결과를 담은 키프레임을 만듭니다.
+    """
+
+    def __init__(self, keyframe_interval: int = KEYFRAME_INTERVAL):
+        """
+        Args:
+            keyframe_interval: 키프레임 간격 (델타 개수)
+        """
+        self.keyframe_interval = keyframe_interval
+        self.seq = 0
+        self._previous: Dict[str, tuple] = {}
+        # encode_book()으로 마지막에 보낸 심볼 목록 (빠진 심볼 확인용)
+        self._symbols: List[str] = []
+        self._since_keyframe = None
+
+    def request_keyframe(self) -> None:
+        """다음 결과를 키프레임으로 보냅니다. (심볼 목록 변경, 받는 쪽 순번 누락 등)"""
+        self._since_keyframe = None
+
+    def encode(self, results: Dict[str, tuple]) -> Dict:
+        """
+        Args:
+            results: {심볼: (가격, 아침 대비 변동률, 김치 프리미엄)}
+
+        Returns:
+            델타 또는 키프레임
+        """
+        keyframe = self._next_keyframe()
+        if keyframe:
+            changed = dict(results)
+            removed: List[str] = []
+        else:
+            previous = self._previous
+            changed = {s: v for s, v in results.items() if previous.get(s) != v}
+            removed = [s for s in previous if s not in results]
+        self._previous = dict(results)
+        return self._frame(keyframe, changed, removed)
+
+    def encode_book(self, book, changed: Iterable[str]) -> Dict:
+        """
+        QuoteBook을 바로 인코딩합니다.
+        바뀐 심볼은 book이 이미 알고 있으므로 전체 결과를 만들어 이전 결과와 비교하지 않습니다.
+
+        Args:
+            book: 조회 결과가 반영된 QuoteBook
+            changed: 지난 인코딩 이후 값이 바뀐 심볼
+
+        Returns:
+            델타 또는 키프레임
+        """
+        keyframe = self._next_keyframe()
+        if keyframe:
+            frame = book.results()
+            removed: List[str] = []
+        else:
+            frame = {}
+            for symbol in changed:
+                quote = book.get(symbol)
+                if quote is not None:
+                    frame[symbol] = quote.as_tuple()
+            removed = [s for s in self._symbols if book.get(s) is None]
+        self._symbols = [quote.symbol for quote in book]
+        return self._frame(keyframe, frame, removed)
+
+    def _next_keyframe(self) -> bool:
+        self.seq += 1
+        keyframe = self._since_keyframe is None or self._since_keyframe + 1 >= self.keyframe_interval
+        self._since_keyframe = 0 if keyframe else self._since_keyframe + 1
+        return keyframe
+
+    def _frame(self, keyframe: bool, changed: Dict[str, tuple], removed: List[str]) -> Dict:
+        metrics = Metrics()
+        metrics.incr("delta.keyframes" if keyframe else "delta.deltas")
+        metrics.set_gauge("delta.changed", len(changed))
+        return {"seq": self.seq, "keyframe": keyframe, "changed": changed, "removed": removed}
+
+
+class ResultDeltaDecoder:
+    """
+    ResultDeltaEncoder가 만든 델타를 받아 전체 결과를 복원합니다.
+    순번이 끊기면 키프레임을 받을 때까지 델타를 적용하지 않습니다.
+    """
+
+    def __init__(self):
+        self.snapshot: Dict[str, tuple] = {}
+        self.seq: Optional[int] = None
+
+    def apply(self, delta: Dict) -> Optional[Dict[str, tuple]]:
+        """
+        델타를 적용합니다.
+
+        Args:
+            delta: ResultDeltaEncoder.encode()의 결과
+
+        Returns:
+            이번에 바뀐 항목 (다시 그려야 할 셀) - 순번이 끊겨 적용하지 못했으면 None
+        """
+        if delta["keyframe"]:
+            self.snapshot = dict(delta["changed"])
+        elif self.seq is None or delta["seq"] != self.seq + 1:
+            return None
+        else:
+            self.snapshot.update(delta["changed"])
+            for symbol in delta["removed"]:
+                self.snapshot.pop(symbol, None)
+        self.seq = delta["seq"]
+        return delta["changed"]
@@ -0,0 +1,176 @@
+# retry_policy.py
+import logging
+import random
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+import requests
+
+try:
+    import httpx
+except ImportError:  # httpx가 없으면 requests 예외만 분류
+    httpx = None
+
+from fetch_common import CycleDeadline
+from metrics import Metrics
+from rate_limiter import RateLimitDeferred, parse_retry_after
+
+# 오류 분류: 다시 보내면 될 수 있는 오류 / 요청 한도 초과 / 다시 보내도 소용없는 오류
+RETRYABLE = "retryable"
+RATE_LIMITED = "rate_limited"
+PERMANENT = "permanent"
+
+# 다시 보낼 상태 코드 (429/418은 요청 한도 초과로 따로 분류)
+RETRYABLE_STATUS = {408, 500, 502, 503, 504}
+RATE_LIMITED_STATUS = {418, 429}
+
+RETRY_METRIC = "retry.attempts"
+RECOVERED_METRIC = "retry.recovered"
+GAVE_UP_METRIC = "retry.gave_up"
+
+_NETWORK_ERRORS = (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError)
+if httpx is not None:
+    _NETWORK_ERRORS += (httpx.TransportError,)
+
+
+def classify_status(status: int, headers=None) -> Tuple[Optional[str], Optional[float]]:
+    """
+    응답 상태 코드를 분류합니다.
+
+    Returns:
+        (분류 또는 정상 응답이면 None, Retry-After 초)
+    """
+    if status < 400:
+        return None, None
+    if status in RATE_LIMITED_STATUS:
+        return RATE_LIMITED, parse_retry_after((headers or {}).get("Retry-After"))
+    if status in RETRYABLE_STATUS:
+        return RETRYABLE, None
+    # 400(없는 심볼 등), 404 등은 다시 보내도 같은 결과
+    return PERMANENT, None
+
+
+def classify_error(error: Exception) -> Tuple[str, Optional[float]]:
+    """
+    요청 중 발생한 예외를 분류합니다.
+
+    Returns:
+        (분류, Retry-After 초)
+    """
+    if isinstance(error, RateLimitDeferred):
+        # RequestGovernor가 보류한 요청 - 차단이 풀릴 때까지 남은 시간을 Retry-After로 사용
+        return RATE_LIMITED, error.retry_after
+    response = getattr(error, "response", None)
+    if response is not None:
+        kind, retry_after = classify_status(response.status_code, response.headers)
+        if kind is not None:
+            return kind, retry_after
+    if isinstance(error, _NETWORK_ERRORS):
+        return RETRYABLE, None
+    # 응답 형식 오류(JSON/키 없음) 등
+    if isinstance(error, (ValueError, KeyError, TypeError, IndexError)):
+        return PERMANENT, None
+    return RETRYABLE, None
+
+
+class RetryPolicy:
+    """
+    요청별 재시도 정책.
+    일시적인 오류(타임아웃, 연결 실패, 5xx)는 상한이 있는 지수 백오프에 full jitter를 더해 다시 보내고,
+    요청 한도 초과(429/418)는 Retry-After만큼 기다린 뒤 다시 보내며, 없는 심볼(400) 같은 오류는
+    바로 포기합니다. 조회 1회의 시간 예산 안에서만 기다리므로 새로고침이 늦어지지 않습니다.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.2, max_delay: float = 2.0,
+                 max_retry_after: float = 5.0, rng: Optional[random.Random] = None):
+        """
+        Args:
+            max_attempts: 첫 요청을 포함한 최대 시도 횟수
+            base_delay: 첫 재시도 전 백오프 상한(초) - 시도마다 두 배
+            max_delay: 백오프 상한(초)
+            max_retry_after: 이보다 긴 Retry-After는 기다리지 않고 다음 새로고침으로 넘김
+            rng: jitter용 난수 생성기 (기본값: random 모듈)
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.rng = rng or random
+
+    def backoff(self, attempt: int) -> float:
+        """attempt번째(0부터) 재시도 전 대기 시간 - 0 ~ min(max_delay, base_delay * 2^attempt) 사이 무작위"""
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _delay(self, kind: str, attempt: int, retry_after: Optional[float]) -> Optional[float]:
+        """다음 시도 전 대기 시간. 다시 보내지 않을 때는 None."""
+        if kind == PERMANENT or attempt + 1 >= self.max_attempts:
+            return None
+        if kind == RATE_LIMITED:
+            if retry_after is None or retry_after > self.max_retry_after:
+                return None
+            # 차단이 풀리는 순간 여러 요청이 한꺼번에 몰리지 않도록 약간의 jitter를 더함
+            return retry_after + self.backoff(0)
+        return self.backoff(attempt)
+
+    def call(self, send: Callable, deadline: Optional[CycleDeadline] = None, label: str = ""):
+        """
+        send()를 정책에 따라 여러 번 시도합니다.
+        응답을 돌려받으면 상태 코드로, 예외가 나면 예외로 분류하며, 더 시도하지 않을 응답은 그대로
+        반환하므로 호출하는 쪽의 상태 코드 처리(400 격리, 404 목록 갱신 등)는 바뀌지 않습니다.
+
+        Args:
+            send: 요청을 보내고 응답을 반환하는 함수 (시도마다 호출되므로 타임아웃도 그 안에서 계산)
+            deadline: 조회 1회의 시간 예산 (남은 시간보다 오래 기다려야 하면 포기)
+            label: 로그에 남길 요청 이름
+
+        Raises:
+            Exception: 더 시도하지 않기로 한 마지막 예외
+        """
+        deadline = deadline or CycleDeadline()
+        attempt = 0
+        while True:
+            try:
+                r = send()
+            except Exception as e:
+                kind, retry_after = classify_error(e)
+                delay = self._delay(kind, attempt, retry_after)
+                if not self._wait(delay, deadline, label, kind, e):
+                    raise
+            else:
+                kind, retry_after = classify_status(r.status_code, r.headers)
+                delay = None if kind is None else self._delay(kind, attempt, retry_after)
+                if kind is None or not self._wait(delay, deadline, label, kind, r.status_code):
+                    if kind is None and attempt:
+                        Metrics().incr(RECOVERED_METRIC)
+                    return r
+            attempt += 1
+
+    def _wait(self, delay: Optional[float], deadline: CycleDeadline, label: str, kind: str, reason) -> bool:
+        """다시 보낼 수 있으면 delay만큼 기다리고 True를 반환합니다."""
+        remaining = deadline.remaining()
+        if delay is None or (remaining is not None and delay >= remaining):
+            if kind != PERMANENT:
+                Metrics().incr(GAVE_UP_METRIC)
+            return False
+        Metrics().incr(RETRY_METRIC)
+        logging.debug(f"{label} 재시도 ({kind}: {reason}), {delay:.2f}초 후")
+        time.sleep(delay)
+        return True
+
+
+_policy: Optional[RetryPolicy] = None
+_policy_lock = threading.Lock()
+
+
+def get_retry_policy() -> RetryPolicy:
+    """설정의 retry_max_attempts/retry_base_delay/retry_max_delay를 따르는 공용 정책을 반환합니다."""
+    global _policy
+    with _policy_lock:
+        if _policy is None:
+            from config_manager import ConfigManager
+            config = ConfigManager()
+            _policy = RetryPolicy(max_attempts=config.get("retry_max_attempts", 3),
+                                  base_delay=config.get("retry_base_delay", 0.2),
+                                  max_delay=config.get("retry_max_delay", 2.0))
+        return _policy
@@ -9,6 +9,8 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, pyqtSignal, pyqtSlot, QSize, QTimer
 from PyQt5.QtGui import QFont, QColor, QIcon
 
+from exchange_info import get_exchange_info
+
 
 class ColorButton(QPushButton):
     """색상 선택 버튼 클래스"""
@@ -68,6 +70,10 @@ class SettingsDialog(QDialog):
         self.update_timer.timeout.connect(self.process_delayed_updates)
         self.pending_updates = {}
 
+        # 티커 검증용 exchangeInfo 색인 (하루 한 번만 백그라운드에서 갱신)
+        self.exchange_info = get_exchange_info()
+        self.exchange_info.refresh_in_background()
+
         # UI 초기화
         self.initUI()
 
@@ -451,9 +457,20 @@ class SettingsDialog(QDialog):
         self.interval_spin.valueChanged.connect(
             lambda value: self.schedule_setting_update("refresh_interval", value))
 
+    def parse_symbols(self):
+        """입력된 티커 목록을 검증하고 바이낸스에 없는 티커는 경고 후 제외"""
+        symbols = [s.strip().upper() for s in self.symbol_input.text().split(",") if s.strip()]
+        valid, invalid = self.exchange_info.validate(symbols)
+        if invalid:
+            logging.warning(f"바이낸스에 없는 티커 제외: {invalid}")
+            QMessageBox.warning(self, "알림",
+                                f"바이낸스에 없거나 거래가 중지된 티커는 제외됩니다:\n{', '.join(invalid)}")
+            self.symbol_input.setText(", ".join(valid))
+        return valid
+
     def update_symbols(self):
         """심볼 목록 업데이트 및 즉시 적용"""
-        symbols = [s.strip().upper() for s in self.symbol_input.text().split(",") if s.strip()]
+        symbols = self.parse_symbols()
         self.schedule_setting_update("symbols", symbols)
 
     def update_width_label(self, value):
@@ -512,7 +529,7 @@ class SettingsDialog(QDialog):
     def get_current_settings(self):
         """현재 설정 값 가져오기"""
         # 심볼 목록
-        symbols = [s.strip().upper() for s in self.symbol_input.text().split(",") if s.strip()]
+        symbols = self.parse_symbols()
 
         # 임시 설정에 추가
         settings = self.temp_settings.copy()
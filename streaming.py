@@ -0,0 +1,395 @@
+# streaming.py
+import asyncio
+import json
+import logging
+import random
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+try:
+    import aiohttp
+except ImportError:  # 스트리밍 모드는 aiohttp가 있어야 사용 가능
+    aiohttp = None
+
+from async_fetcher import AsyncPriceFetcher
+from fetch_common import FX_SOURCE_API, FX_SOURCE_UPBIT, UPBIT_USDT_MARKET, build_results, cycle_deadline
+from last_known_good import get_last_known_good
+from quotes import QuoteBook
+from rate_limiter import RequestGovernor
+from result_delta import KEYFRAME_INTERVAL, ResultDeltaEncoder
+
+BINANCE_STREAM_URL = "wss://stream.binance.com:9443"
+UPBIT_STREAM_URL = "wss://api.upbit.com"
+
+
+class ReconnectPolicy:
+    """
+    웹소켓 재연결 대기 정책 (지수 백오프 + 지터).
+    바이낸스/업비트 스트림이 같은 정책을 사용합니다.
+    """
+
+    def __init__(self, initial: float = 1.0, maximum: float = 60.0,
+                 factor: float = 2.0, jitter: float = 0.2):
+        """
+        Args:
+            initial: 첫 재연결 대기 시간(초)
+            maximum: 최대 대기 시간(초)
+            factor: 실패할 때마다 곱해지는 배수
+            jitter: 대기 시간에 더해지는 무작위 비율 (0.2 = ±20%)
+        """
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.jitter = jitter
+        self.attempts = 0
+
+    def next_delay(self) -> float:
+        """다음 재연결까지 기다릴 시간을 반환하고 시도 횟수를 늘립니다."""
+        delay = min(self.maximum, self.initial * (self.factor ** self.attempts))
+        self.attempts += 1
+        return max(0.0, delay * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def reset(self) -> None:
+        """연결에 성공하면 대기 시간을 초기화합니다."""
+        self.attempts = 0
+
+    def copy(self) -> "ReconnectPolicy":
+        """같은 설정을 가진 새 정책을 만듭니다. (스트림마다 시도 횟수는 따로 셈)"""
+        return ReconnectPolicy(self.initial, self.maximum, self.factor, self.jitter)
+
+
+class StreamClient:
+    """
+    웹소켓 구독 클라이언트의 공통 부분.
+    연결 유지와 ReconnectPolicy에 따른 자동 재연결을 담당하고,
+    거래소별 구독 방식과 메시지 해석은 하위 클래스가 구현합니다.
+    """
+    name = "스트림"
+
+    def __init__(self, on_price: Callable[[str, float], None], url: str,
+                 policy: Optional[ReconnectPolicy] = None,
+                 on_state: Optional[Callable[[bool], None]] = None):
+        """
+        Args:
+            on_price: 가격 갱신 시 호출될 콜백 (심볼/마켓 코드, 가격)
+            url: 스트림 서버 주소
+            policy: 재연결 정책
+            on_state: 연결 상태 변경 시 호출될 콜백 (연결 여부)
+        """
+        self.on_price = on_price
+        self.url = url
+        self.policy = policy or ReconnectPolicy()
+        self.on_state = on_state or (lambda connected: None)
+
+    def stream_url(self) -> str:
+        return self.url
+
+    async def subscribe(self, ws) -> None:
+        """연결 직후 구독 메시지를 보냅니다. (필요한 경우만 구현)"""
+
+    def handle_message(self, message: Dict) -> None:
+        raise NotImplementedError
+
+    async def run(self, stop_event: asyncio.Event) -> None:
+        """stop_event가 설정될 때까지 연결을 유지합니다."""
+        async with aiohttp.ClientSession() as sess:
+            while not stop_event.is_set():
+                try:
+                    async with sess.ws_connect(self.stream_url(), heartbeat=30) as ws:
+                        await self.subscribe(ws)
+                        logging.info(f"{self.name} 연결됨")
+                        self.policy.reset()
+                        self.on_state(True)
+                        while not stop_event.is_set():
+                            try:
+                                msg = await ws.receive(timeout=1.0)
+                            except asyncio.TimeoutError:
+                                continue
+                            if msg.type in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                                self.handle_message(json.loads(msg.data))
+                            elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSING,
+                                              aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logging.error(f"{self.name} 오류: {e}")
+                self.on_state(False)
+                if stop_event.is_set():
+                    break
+                delay = self.policy.next_delay()
+                logging.info(f"{self.name} {delay:.1f}초 후 재연결")
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+
+
+class BinanceStreamClient(StreamClient):
+    """바이낸스 결합 스트림(@miniTicker / @bookTicker) 구독 클라이언트."""
+    name = "바이낸스 스트림"
+
+    def __init__(self, symbols: List[str], on_price: Callable[[str, float], None],
+                 url: str = BINANCE_STREAM_URL, **kwargs):
+        super().__init__(on_price, url, **kwargs)
+        self.symbols = symbols
+        self._has_trade = set()
+
+    def stream_url(self) -> str:
+        streams = []
+        for symbol in self.symbols:
+            streams.append(f"{symbol.lower()}@miniTicker")
+            streams.append(f"{symbol.lower()}@bookTicker")
+        return f"{self.url}/stream?streams=" + "/".join(streams)
+
+    def handle_message(self, message: Dict) -> None:
+        """결합 스트림 메시지 하나를 처리합니다."""
+        data = message.get("data", message)
+        symbol = data.get("s")
+        if not symbol:
+            return
+        if "c" in data:
+            # miniTicker: 최근 체결가
+            self._has_trade.add(symbol)
+            self.on_price(symbol, float(data["c"]))
+        elif "b" in data and "a" in data and symbol not in self._has_trade:
+            # bookTicker: 체결 전까지는 호가 중간값으로 표시
+            self.on_price(symbol, (float(data["b"]) + float(data["a"])) / 2)
+
+
+class UpbitStreamClient(StreamClient):
+    """업비트 ticker 웹소켓 구독 클라이언트. KRW-* 마켓의 체결가를 받습니다."""
+    name = "업비트 스트림"
+
+    def __init__(self, markets: List[str], on_price: Callable[[str, float], None],
+                 url: str = UPBIT_STREAM_URL, **kwargs):
+        super().__init__(on_price, url, **kwargs)
+        self.markets = markets
+
+    def stream_url(self) -> str:
+        return f"{self.url}/websocket/v1"
+
+    async def subscribe(self, ws) -> None:
+        await ws.send_str(json.dumps([
+            {"ticket": f"c-tracker-{uuid.uuid4()}"},
+            {"type": "ticker", "codes": self.markets},
+        ]))
+
+    def handle_message(self, message: Dict) -> None:
+        if message.get("type") == "ticker" and "code" in message:
+            self.on_price(message["code"], float(message["trade_price"]))
+
+
+class StreamingPriceFeed:
+    """
+    스트리밍 가격 피드.
+    바이낸스 가격과 업비트 KRW 가격은 웹소켓으로 받고, 아침 시가/환율은 REST로 가끔 갱신합니다.
+    어느 쪽이든 가격이 바뀌면 김치 프리미엄을 다시 계산하므로 프리미엄은 항상 최신 시세 기준입니다.
+    스트림이 끊겨 있는 동안에는 refresh_interval 간격의 REST 폴링으로 대체합니다.
+    """
+
+    def __init__(self, symbols: List[str], on_result: Callable[[Dict], None],
+                 refresh_interval: float = 2, reference_interval: float = 60,
+                 emit_interval: float = 0.25, endpoints: Optional[Dict[str, str]] = None,
+                 stream_url: str = BINANCE_STREAM_URL,
+                 upbit_stream_url: Optional[str] = UPBIT_STREAM_URL,
+                 policy: Optional[ReconnectPolicy] = None, fx_source: str = FX_SOURCE_API,
+                 book: Optional[QuoteBook] = None):
+        """
+        Args:
+            symbols: 조회할 바이낸스 심볼 목록
+            on_result: 결과 딕셔너리를 받을 콜백 (result_ready와 같은 형식)
+            refresh_interval: 스트림 단절 시 REST 폴링 간격(초)
+            reference_interval: 스트림 연결 중 REST 보조 데이터 갱신 간격(초)
+            emit_interval: 결과를 내보내는 최소 간격(초)
+            endpoints: REST 업스트림 주소 덮어쓰기
+            stream_url: 바이낸스 스트림 서버 주소
+            upbit_stream_url: 업비트 스트림 서버 주소 (None이면 업비트는 REST만 사용)
+            policy: 두 스트림이 함께 쓰는 재연결 정책 설정
+            fx_source: 환율 출처 ("upbit"이면 KRW-USDT 체결가도 실시간으로 반영)
+            book: 결과를 바로 써넣을 QuoteBook - 있으면 on_result는 결과 대신 바뀐 심볼 목록을 받음
+        """
+        self.symbols = symbols
+        self.on_result = on_result
+        self.refresh_interval = refresh_interval
+        self.reference_interval = reference_interval
+        self.emit_interval = emit_interval
+        self.policy = policy or ReconnectPolicy()
+        self.fx_source = fx_source
+        self.book = book
+        # 폴링 중에는 REST 조회 1회가 다음 폴링 시점을 넘기지 않도록 시간 예산을 둠
+        self.rest = AsyncPriceFetcher(symbols, endpoints=endpoints, fx_source=fx_source,
+                                      deadline=cycle_deadline(refresh_interval), book=book)
+        self.stream = BinanceStreamClient(symbols, self._on_price, url=stream_url,
+                                          policy=self.policy.copy(), on_state=self._on_state)
+        # 업비트에 상장된 마켓만 구독 (목록은 REST 조회 때 하루 한 번 갱신)
+        markets = [m for m in (self.rest.upbit_catalog.to_upbit_symbol(s) for s in symbols) if m]
+        if markets and fx_source == FX_SOURCE_UPBIT:
+            markets.append(UPBIT_USDT_MARKET)
+        self.upbit_stream = None
+        if upbit_stream_url and markets:
+            self.upbit_stream = UpbitStreamClient(markets, self._on_upbit_price, url=upbit_stream_url,
+                                                  policy=self.policy.copy(),
+                                                  on_state=self._on_upbit_state)
+        self.connected = False
+        self.upbit_connected = False
+        self.live_prices: Dict[str, float] = {}
+        self.live_upbit_prices: Dict[str, float] = {}
+        self.inputs = None
+        self._dirty = False
+        self._loop = None
+        self._stop = None
+
+    @staticmethod
+    def available() -> bool:
+        return aiohttp is not None
+
+    def _on_price(self, symbol: str, price: float) -> None:
+        self.live_prices[symbol] = price
+        self._dirty = True
+
+    def _on_state(self, connected: bool) -> None:
+        self.connected = connected
+        if not connected:
+            # 끊긴 동안의 웹소켓 가격은 오래된 값이므로 REST 값을 사용
+            self.live_prices.clear()
+
+    def _on_upbit_price(self, market: str, price: float) -> None:
+        self.live_upbit_prices[market] = price
+        self._dirty = True
+
+    def _on_upbit_state(self, connected: bool) -> None:
+        self.upbit_connected = connected
+        if not connected:
+            self.live_upbit_prices.clear()
+
+    def streams_connected(self) -> bool:
+        """사용 중인 모든 스트림이 연결되어 있는지 여부"""
+        return self.connected and (self.upbit_stream is None or self.upbit_connected)
+
+    def current_inputs(self) -> Dict:
+        """REST로 받은 입력에 스트림으로 받은 최신 가격을 덮어쓴 입력"""
+        inputs = dict(self.inputs)
+        inputs["binance_map"] = {**inputs["binance_map"], **self.live_prices}
+        inputs["upbit_price_map"] = {**inputs["upbit_price_map"], **self.live_upbit_prices}
+        if self.fx_source == FX_SOURCE_UPBIT and UPBIT_USDT_MARKET in self.live_upbit_prices:
+            inputs["usd_to_krw"] = self.live_upbit_prices[UPBIT_USDT_MARKET]
+        return inputs
+
+    def current_results(self) -> Dict[str, tuple]:
+        return build_results(self.symbols, **self.current_inputs(), table=self.rest.price_table)
+
+    async def _rest_loop(self) -> None:
+        last_fetch = None
+        while not self._stop.is_set():
+            now = self._loop.time()
+            interval = self.reference_interval if self.streams_connected() else self.refresh_interval
+            if last_fetch is None or now - last_fetch >= interval:
+                try:
+                    self.inputs = await self.rest.fetch_inputs_async()
+                    self._dirty = True
+                except Exception as e:
+                    logging.error(f"REST 보조 조회 실패: {e}")
+                last_fetch = now
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=min(interval, self.refresh_interval))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _emit_loop(self) -> None:
+        while not self._stop.is_set():
+            if self._dirty and self.inputs is not None:
+                self._dirty = False
+                if self.book is not None:
+                    self.on_result(self.book.apply(self.symbols, **self.current_inputs(),
+                                                   max_age=get_last_known_good().max_age))
+                else:
+                    self.on_result(self.current_results())
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=self.emit_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        tasks = [self.stream.run(self._stop), self._rest_loop(), self._emit_loop()]
+        if self.upbit_stream is not None:
+            tasks.append(self.upbit_stream.run(self._stop))
+        await asyncio.gather(*tasks)
+
+    def stop(self) -> None:
+        """다른 스레드에서 호출해도 안전하게 피드를 멈춥니다."""
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+
+class StreamingPriceThread(QThread):
+    """
+    StreamingPriceFeed를 실행하고 결과를 PriceFetcherThread와 같은 시그널로 내보냅니다.
+    emit_deltas=True면 PriceFetchWorker와 같이 바뀐 항목만 delta_ready로 보냅니다.
+    """
+    result_ready = pyqtSignal(dict)
+    delta_ready = pyqtSignal(dict)
+    error_occurred = pyqtSignal(str)
+    # (순번, 결과 또는 None, 오류 메시지) - RefreshCoordinator가 다음 새로고침을 예약할 때 사용
+    cycle_finished = pyqtSignal(int, object, str)
+
+    def __init__(self, symbols, refresh_interval=2, reference_interval=60,
+                 endpoints=None, stream_url=BINANCE_STREAM_URL,
+                 upbit_stream_url=UPBIT_STREAM_URL, fx_source=FX_SOURCE_API,
+                 emit_deltas=False, keyframe_interval=KEYFRAME_INTERVAL):
+        super().__init__()
+        self.symbols = symbols
+        self.encoder = ResultDeltaEncoder(keyframe_interval) if emit_deltas else None
+        self.book = QuoteBook(symbols)
+        self.feed = StreamingPriceFeed(symbols, self._on_result,
+                                       refresh_interval=refresh_interval,
+                                       reference_interval=reference_interval,
+                                       endpoints=endpoints, stream_url=stream_url,
+                                       upbit_stream_url=upbit_stream_url, fx_source=fx_source,
+                                       book=self.book)
+
+    def run(self):
+        try:
+            asyncio.run(self.feed.run())
+        except Exception as e:
+            logging.error(f"스트리밍 실패: {str(e)}")
+            self.error_occurred.emit(f"실시간 가격 수신에 실패했습니다: {str(e)}")
+
+    def _on_result(self, changed):
+        # 피드가 book에 바로 써넣고 바뀐 심볼 목록만 넘김
+        if self.encoder is not None:
+            self.delta_ready.emit(self.encoder.encode_book(self.book, changed))
+        else:
+            self.result_ready.emit(self.book.results())
+
+    def request_refresh(self, seq: int = 0):
+        """
+        스트림은 가격이 바뀔 때마다 결과를 내보내므로 아직 시작하지 않았을 때만 시작하고,
+        새로고침 1회는 지금까지 받은 결과로 바로 끝냅니다. (델타 모드면 다음 결과를 키프레임으로 보냄)
+
+        Args:
+            seq: 이 조회의 순번 (cycle_finished로 그대로 돌려줌)
+        """
+        if not self.isRunning():
+            self.start()
+        if self.encoder is not None:
+            self.request_keyframe()
+            self.cycle_finished.emit(seq, {}, "")
+        else:
+            self.cycle_finished.emit(seq, self.book.results(), "")
+
+    def next_interval(self, base_interval: float) -> float:
+        """API 예산 상태를 반영한 다음 새로고침 간격(초) (기준 시가/환율 REST 조회가 예산을 나눠 씀)"""
+        return RequestGovernor().recommended_interval(base_interval)
+
+    def request_keyframe(self):
+        if self.encoder is not None:
+            self.encoder.request_keyframe()
+
+    def stop(self):
+        self.feed.stop()
+        self.wait()
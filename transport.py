@@ -0,0 +1,129 @@
+# transport.py
+import concurrent.futures
+import logging
+from typing import Callable, Iterable, List
+
+try:
+    import httpx
+    import h2  # noqa: F401 - httpx의 HTTP/2 지원에 필요
+except ImportError:  # httpx[http2]가 없으면 requests 전송 계층만 사용
+    httpx = None
+
+from fetch_common import REQUEST_TIMEOUT
+from rate_limiter import GovernedSession, RequestGovernor, request_cost, venue_for
+
+TRANSPORT_REQUESTS = "requests"
+TRANSPORT_HTTP2 = "http2"
+# HTTP/2 유휴 연결 유지 시간(초)
+KEEPALIVE_EXPIRY = 60
+
+
+class RequestsTransport:
+    """
+    requests 세션 기반 HTTP/1.1 전송 계층 (기본값).
+    요청을 하나씩 차례로 보내며, 세션을 넘기지 않으면 직접 만든 세션을 닫을 때 함께 닫습니다.
+    """
+    name = TRANSPORT_REQUESTS
+
+    def __init__(self, session=None):
+        """
+        Args:
+            session: 사용할 requests 세션 (None이면 GovernedSession을 새로 만듦)
+        """
+        self._owns_session = session is None
+        self.session = session if session is not None else GovernedSession()
+        self.headers = self.session.headers
+
+    def get(self, url: str, params=None, timeout: float = REQUEST_TIMEOUT):
+        return self.session.get(url, params=params, timeout=timeout)
+
+    def map(self, fn: Callable, items: Iterable) -> List:
+        """items 각각에 fn을 적용합니다. (HTTP/1.1 연결 하나로는 한 번에 하나씩)"""
+        return [fn(item) for item in items]
+
+    def close(self) -> None:
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class Http2Transport:
+    """
+    httpx + h2 기반 HTTP/2 전송 계층.
+    map()으로 보낸 심볼별 요청들은 같은 호스트로 가는 연결 하나에 동시에 실려(멀티플렉싱)
+    요청 수만큼 왕복 시간을 기다리지 않습니다. 요청은 RequestGovernor 예산을 거칩니다.
+    여러 새로고침에 걸쳐 연결을 재사용하도록 한 번 만들어 계속 사용하고, 끝나면 close()합니다.
+    """
+    name = TRANSPORT_HTTP2
+
+    def __init__(self, max_concurrency: int = 16, prior_knowledge: bool = False):
+        """
+        Args:
+            max_concurrency: map()에서 동시에 보낼 최대 요청 수
+            prior_knowledge: True면 HTTP/1.1 없이 처음부터 HTTP/2로 연결 (TLS 없는 로컬 대역 서버용)
+        """
+        # 새로고침 간격이 길어도 연결이 끊기지 않도록 유휴 연결을 오래 유지
+        self.client = httpx.Client(http2=True, http1=not prior_knowledge, timeout=REQUEST_TIMEOUT,
+                                   limits=httpx.Limits(keepalive_expiry=KEEPALIVE_EXPIRY),
+                                   headers={'User-Agent': 'Mozilla/5.0'},
+                                   event_hooks={"request": [self._on_request], "response": [self._on_response]})
+        self.headers = self.client.headers
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency,
+                                                               thread_name_prefix="http2")
+
+    @staticmethod
+    def available() -> bool:
+        """httpx와 h2 설치 여부를 반환합니다."""
+        return httpx is not None
+
+    @staticmethod
+    def _on_request(request) -> None:
+        url = str(request.url)
+        venue = venue_for(url)
+        if venue:
+            cost, priority = request_cost(url)
+            RequestGovernor().acquire(venue, cost, priority)
+
+    @staticmethod
+    def _on_response(response) -> None:
+        venue = venue_for(str(response.request.url))
+        if venue:
+            RequestGovernor().observe(venue, response.status_code, response.headers)
+
+    def get(self, url: str, params=None, timeout: float = REQUEST_TIMEOUT):
+        return self.client.get(url, params=params, timeout=timeout)
+
+    def map(self, fn: Callable, items: Iterable) -> List:
+        """items 각각에 fn을 동시에 적용합니다. (요청은 HTTP/2 연결 하나에 함께 실림)"""
+        return list(self._executor.map(fn, items))
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def make_transport(name: str = TRANSPORT_REQUESTS, session=None, **kwargs):
+    """
+    이름에 맞는 전송 계층을 만듭니다. HTTP/2를 쓸 수 없으면 requests로 대체합니다.
+
+    Args:
+        name: "requests" 또는 "http2"
+        session: requests 전송 계층이 사용할 세션
+        kwargs: Http2Transport 인자
+    """
+    if name == TRANSPORT_HTTP2:
+        if Http2Transport.available():
+            return Http2Transport(**kwargs)
+        logging.warning("httpx[http2]가 설치되어 있지 않아 requests로 조회합니다")
+    return RequestsTransport(session)
@@ -0,0 +1,140 @@
+# upbit_markets.py
+import logging
+import threading
+import time
+from typing import Iterable, List, Optional, Set
+
+from fast_json import decode, decode_async
+from fetch_common import DEFAULT_ENDPOINTS, to_upbit_symbol
+from utils import SharedInstances, cache_path, load_json_cache, save_json_cache
+
+# /v1/ticker?markets= 값의 최대 길이 - URL 길이 제한(보통 8KB)보다 넉넉히 작게 유지
+MAX_MARKETS_PARAM = 4000
+
+
+def chunk_markets(markets: Iterable[str], max_length: int = MAX_MARKETS_PARAM) -> List[List[str]]:
+    """
+    업비트 마켓 목록을 쉼표로 이었을 때 max_length를 넘지 않도록 나눕니다.
+
+    Args:
+        markets: 업비트 마켓 코드 목록
+        max_length: markets 파라미터 최대 길이
+
+    Returns:
+        나뉜 마켓 목록들
+    """
+    chunks, current, length = [], [], 0
+    for market in markets:
+        added = len(market) + (1 if current else 0)
+        if current and length + added > max_length:
+            chunks.append(current)
+            current, length, added = [], 0, len(market)
+        current.append(market)
+        length += added
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class UpbitMarketCatalog:
+    """
+    업비트 상장 마켓 목록(/v1/market/all) 캐시.
+    /v1/ticker는 없는 마켓이 하나라도 섞이면 요청 전체가 404가 되므로,
+    실제 상장된 마켓만 요청에 넣도록 바이낸스 심볼 → 업비트 마켓 변환에 사용합니다.
+    목록은 하루에 한 번 새로 받고, 경로가 주어지면 디스크에 저장해 재시작 후에도 바로 사용합니다.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: float = 86400):
+        """
+        Args:
+            path: 목록을 저장할 파일 경로 (None이면 저장하지 않음)
+            ttl: 목록을 새로 받지 않고 재사용할 시간(초)
+        """
+        self.path = path
+        self.ttl = ttl
+        self.markets: Optional[Set[str]] = None
+        self.fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        loaded = load_json_cache(self.path, "업비트 마켓 목록",
+                                 lambda data: (set(data["markets"]), float(data["fetched_at"])))
+        if loaded is not None:
+            self.markets, self.fetched_at = loaded
+
+    def _save(self) -> None:
+        save_json_cache(self.path, {"markets": sorted(self.markets), "fetched_at": self.fetched_at},
+                        "업비트 마켓 목록")
+
+    def is_stale(self) -> bool:
+        return self.markets is None or time.time() - self.fetched_at >= self.ttl
+
+    def invalidate(self) -> None:
+        """다음 조회 때 목록을 다시 받도록 합니다. (ticker 요청이 404를 받았을 때 등)"""
+        with self._lock:
+            self.fetched_at = 0.0
+
+    def update(self, data) -> None:
+        """/v1/market/all 응답으로 목록을 갱신합니다."""
+        markets = {item["market"] for item in data}
+        if not markets:
+            return
+        with self._lock:
+            self.markets = markets
+            self.fetched_at = time.time()
+            self._save()
+        logging.info(f"업비트 마켓 목록 갱신: {len(markets)}개")
+
+    def refresh(self, sess, upbit_url: str, timeout: float = 10) -> None:
+        """
+        목록이 오래되었으면 새로 받습니다. 실패하면 기존 목록을 계속 사용합니다. (requests 세션)
+
+        Args:
+            sess: requests 세션
+            upbit_url: 업비트 API 주소
+            timeout: 요청 타임아웃(초) - 조회 중에는 남은 시간 예산을 넘기지 않도록 줄여서 넘김
+        """
+        if not self.is_stale():
+            return
+        try:
+            r = sess.get(f"{upbit_url}/v1/market/all", timeout=timeout)
+            r.raise_for_status()
+            self.update(decode(r))
+        except Exception as e:
+            logging.error(f"업비트 마켓 목록 조회 실패: {e}")
+
+    async def refresh_async(self, sess, upbit_url: str) -> None:
+        """refresh의 aiohttp 버전"""
+        if not self.is_stale():
+            return
+        try:
+            async with sess.get(f"{upbit_url}/v1/market/all") as r:
+                r.raise_for_status()
+                self.update(await decode_async(r))
+        except Exception as e:
+            logging.error(f"업비트 마켓 목록 조회 실패: {e}")
+
+    def is_listed(self, market: str) -> bool:
+        """상장 여부. 목록을 아직 받지 못했으면 상장된 것으로 간주합니다."""
+        markets = self.markets
+        return markets is None or market in markets
+
+    def to_upbit_symbol(self, binance_symbol: str) -> Optional[str]:
+        """바이낸스 심볼을 업비트 KRW 마켓 코드로 변환합니다. 업비트에 없는 마켓이면 None."""
+        market = to_upbit_symbol(binance_symbol)
+        if market is None or not self.is_listed(market):
+            return None
+        return market
+
+
+_catalogs = SharedInstances()
+
+
+def get_upbit_catalog(url: str = DEFAULT_ENDPOINTS["upbit"]) -> UpbitMarketCatalog:
+    """
+    주소별 공용 업비트 마켓 목록을 반환합니다.
+    기본 주소의 목록만 디스크에 저장합니다. (벤치마크용 목 서버 목록이 섞이지 않도록)
+    """
+    return _catalogs.get(url, lambda: UpbitMarketCatalog(
+        cache_path("upbit_markets.json") if url == DEFAULT_ENDPOINTS["upbit"] else None))
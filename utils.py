@@ -1,7 +1,9 @@
 # utils.py
 import os
+import json
 import logging
 import sys
+import threading
 
 # Global logger instance
 logger = None
@@ -54,5 +56,81 @@ def get_config_path():
     return os.path.join(config_dir, "settings.json")
 
 
+def cache_path(file_name):
+    """설정 파일과 같은 폴더(~/.myCryptoOverlay)에 둘 캐시 파일의 경로를 반환합니다."""
+    return os.path.join(os.path.dirname(get_config_path()), file_name)
+
+
+def load_json_cache(path, label, parse=None):
+    """
+    캐시 파일을 읽습니다.
+
+    Args:
+        path: 캐시 파일 경로 (None이면 읽지 않음)
+        label: 로그에 남길 캐시 이름
+        parse: 읽은 데이터를 변환할 함수 (변환 중 오류도 로드 실패로 처리)
+
+    Returns:
+        읽은(변환한) 값 - 파일이 없거나 읽기에 실패하면 None
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return parse(data) if parse is not None else data
+    except Exception as e:
+        logging.error(f"{label} 로드 실패: {e}")
+        return None
+
+
+def save_json_cache(path, data, label, **dump_kwargs):
+    """
+    캐시 파일을 저장합니다. 임시 파일에 쓴 뒤 교체하므로 저장 중에 종료되어도 기존 파일이 깨지지 않습니다.
+
+    Args:
+        path: 캐시 파일 경로 (None이면 저장하지 않음)
+        data: 저장할 데이터
+        label: 로그에 남길 캐시 이름
+        dump_kwargs: json.dump에 넘길 인자
+
+    Returns:
+        저장했으면 True
+    """
+    if not path:
+        return False
+    try:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, **dump_kwargs)
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        logging.error(f"{label} 저장 실패: {e}")
+        return False
+
+
+class SharedInstances:
+    """주소 등 키별로 하나씩만 만들어 공유하는 객체 모음 (get_* 함수용)"""
+
+    def __init__(self):
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, factory):
+        """
+        키에 해당하는 객체를 반환합니다. 없으면 factory()로 만들어 저장합니다.
+
+        Args:
+            key: 객체를 구분할 키
+            factory: 처음 요청될 때 객체를 만들 함수 (잠금 안에서 한 번만 호출)
+        """
+        with self._lock:
+            instance = self._instances.get(key)
+            if instance is None:
+                instance = self._instances[key] = factory()
+            return instance
+
+
 # 로거 초기화
 logger = setup_logging()
\ No newline at end of file
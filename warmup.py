@@ -0,0 +1,166 @@
+# warmup.py
+import concurrent.futures
+import logging
+import socket
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from fetch_common import REQUEST_TIMEOUT, resolve_endpoints
+from metrics import Metrics
+
+DNS_HIT_METRIC = "dns.cache_hits"
+DNS_MISS_METRIC = "dns.cache_misses"
+
+
+class DnsCache:
+    """
+    socket.getaddrinfo 결과를 ttl 동안 재사용하는 DNS 캐시.
+    install()하면 requests(urllib3)와 aiohttp가 모두 이 캐시를 거치므로, 시작할 때 미리 조회해 두면
+    첫 새로고침에서 DNS 조회를 기다리지 않습니다. 조회가 실패하면 만료된 값이라도 계속 사용합니다.
+    """
+
+    def __init__(self, ttl: float = 300):
+        """
+        Args:
+            ttl: 조회 결과를 재사용할 시간(초)
+        """
+        self.ttl = ttl
+        self._entries: Dict[tuple, Tuple[list, float]] = {}
+        self._lock = threading.Lock()
+        self._resolve = socket.getaddrinfo
+        self.installed = False
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        """socket.getaddrinfo와 같은 인자/반환값"""
+        key = (host, port, family, type, proto, flags)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[1] > now:
+            Metrics().incr(DNS_HIT_METRIC)
+            return list(entry[0])
+
+        Metrics().incr(DNS_MISS_METRIC)
+        try:
+            result = self._resolve(host, port, family, type, proto, flags)
+        except OSError as e:
+            if entry is None:
+                raise
+            logging.warning(f"{host} DNS 조회 실패, 이전 결과 사용: {e}")
+            return list(entry[0])
+        with self._lock:
+            self._entries[key] = (result, now + self.ttl)
+        return list(result)
+
+    def install(self) -> None:
+        """socket.getaddrinfo를 이 캐시로 바꿉니다."""
+        if not self.installed:
+            socket.getaddrinfo = self.getaddrinfo
+            self.installed = True
+
+
+dns_cache = DnsCache()
+
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+
+def shared_session(create: bool = False):
+    """
+    워밍업한 연결이 들어 있는 공용 requests 세션을 반환합니다.
+
+    Args:
+        create: 아직 없으면 새로 만들지 여부 (False면 워밍업 전에는 None)
+    """
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None and create:
+            from fetch_worker import make_pooled_session
+            _shared_session = make_pooled_session()
+        return _shared_session
+
+
+def upstream_hosts(endpoints: Optional[Dict[str, str]] = None, hedge: bool = False) -> List[str]:
+    """
+    공용 세션으로 워밍업할 업스트림 주소 목록 (중복 제거, 헤지를 켜면 바이낸스 미러 포함)
+    환율 API는 FxRateProvider가 자기 세션을 쓰므로 제외합니다. (환율을 미리 받는 요청이 그 세션의 연결을 엶)
+    """
+    endpoints = resolve_endpoints(endpoints)
+    hosts = [endpoints["binance"], endpoints["upbit"]]
+    if hedge:
+        from hedging import get_hedger
+        hedger = get_hedger(endpoints["binance"])
+        if hedger is not None:
+            hosts += hedger.hosts
+    return list(dict.fromkeys(hosts))
+
+
+def open_connection(sess, url: str, timeout: float = REQUEST_TIMEOUT) -> float:
+    """
+    주소에 HEAD 요청을 하나 보내 DNS 조회와 TCP(+TLS) 연결을 해 둡니다.
+    응답 상태 코드와 관계없이 keep-alive 연결이 세션의 연결 풀에 남아 첫 조회가 그대로 사용합니다.
+
+    Returns:
+        걸린 시간(초)
+    """
+    start = time.monotonic()
+    sess.head(url, timeout=timeout)
+    return time.monotonic() - start
+
+
+def warm_up(endpoints: Optional[Dict[str, str]] = None, hedge: bool = False) -> Dict[str, Optional[float]]:
+    """
+    바이낸스/업비트에 동시에 DNS 조회와 연결을 미리 해 두고, 첫 조회에 필요한
+    환율과 업비트 마켓 목록도 함께 받아 둡니다.
+
+    Args:
+        endpoints: 업스트림 주소 덮어쓰기
+        hedge: 바이낸스 미러 호스트도 워밍업할지 여부
+
+    Returns:
+        {주소: 걸린 시간(초) 또는 실패 시 None}
+    """
+    from fx_provider import get_fx_provider
+    from upbit_markets import get_upbit_catalog
+
+    start = time.monotonic()
+    endpoints = resolve_endpoints(endpoints)
+    dns_cache.install()
+    sess = shared_session(create=True)
+    hosts = upstream_hosts(endpoints, hedge)
+    timings: Dict[str, Optional[float]] = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(hosts) + 2) as executor:
+        futures = {executor.submit(open_connection, sess, host): host for host in hosts}
+        # 첫 조회에서 어차피 기다려야 하는 요청들 - 연결과 동시에 받아 둠
+        fx_provider = get_fx_provider(endpoints["fx"])
+        if not fx_provider.is_fresh():
+            executor.submit(fx_provider.get_rate)
+        executor.submit(get_upbit_catalog(endpoints["upbit"]).refresh, sess, endpoints["upbit"])
+        for future in concurrent.futures.as_completed(futures):
+            host = futures[future]
+            try:
+                timings[host] = future.result()
+            except Exception as e:
+                timings[host] = None
+                logging.warning(f"{host} 연결 워밍업 실패: {e}")
+
+    elapsed = time.monotonic() - start
+    Metrics().set_gauge("warmup.duration", round(elapsed, 3))
+    logging.info(f"연결 워밍업 완료 ({elapsed:.2f}초): "
+                 + ", ".join(f"{h} {t * 1000:.0f}ms" if t is not None else f"{h} 실패" for h, t in timings.items()))
+    return timings
+
+
+def start_warmup(endpoints: Optional[Dict[str, str]] = None) -> threading.Thread:
+    """설정을 읽어 백그라운드 스레드에서 warm_up()을 실행합니다. (창을 만드는 동안 호출)"""
+    from config_manager import ConfigManager
+    config = ConfigManager()
+    dns_cache.ttl = config.get("dns_ttl", 300)
+    dns_cache.install()
+    # 워밍업이 끝나기 전에 시작된 조회도 같은 연결 풀을 쓰도록 세션은 먼저 만들어 둠
+    shared_session(create=True)
+    thread = threading.Thread(target=warm_up, args=(endpoints, config.get("hedge_binance", False)),
+                              name="warmup", daemon=True)
+    thread.start()
+    return thread